@@ -5,27 +5,276 @@ This module provides REST API endpoints for the text analysis workflow.
 Designed to be deployed on Render.com and accessed by the frontend.
 """
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import contextvars
+import hmac
+import itertools
+import json
+from contextlib import asynccontextmanager
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Literal, Optional, Set
 import logging
 import sys
 import os
+import time
 from pathlib import Path
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-# from src.graph.workflow import run_workflow  # Import later to avoid startup issues
-# from src.utils.helpers import validate_input  # Import later to avoid startup issues
+# Cheap imports only: src.utils does not pull in langgraph/langchain.
+# The workflow module (~1.5s to import) is loaded by the lifespan preload
+# or, when preloading is disabled, on the first request.
+from src.config.models import MODEL_PRESETS, get_provider, list_providers
+from src.config.routing import (
+    AUTO,
+    LATENCY,
+    QUALITY_TIERS,
+    cascade_models,
+    route,
+    routable_models,
+)
+from src.graph.state import AnalysisResult
+from src.utils.breaker import CircuitOpenError, breaker_states
+from src.utils.cache import cache_key, get_or_compute, get_result_cache, is_inflight
+from src.utils.concurrency import limiter_snapshots
+from src.utils.deadline import Deadline, RequestCancelled, deadline_scope
+from src.utils.priority import (
+    BACKGROUND,
+    BATCH,
+    INTERACTIVE,
+    parse_priority,
+    priority_scope,
+)
+from src.utils.profiling import collapsed_stacks, get_profile_store, profile_scope
+from src.utils.helpers import validate_input
+from src.utils.history import get_history_store, record_analysis
+from src.utils.log import (
+    configure_logging,
+    current_request_id,
+    record,
+    request_context,
+    valid_request_id,
+)
+from src.utils.metrics import flush as flush_metrics
+from src.utils.metrics import get_metrics_dir
+from src.utils.metrics import render as render_metrics
+from src.utils.serialization import dumps
+from src.utils.speculation import (
+    SPECULATION_HITS,
+    SPECULATION_RESULTS,
+    SPECULATIONS,
+    get_speculations,
+    speculation_timeout,
+)
+from src.utils.tracing import SERVER, span
+from src.utils.transfer import CompressionMiddleware, etag_matches, make_etag
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Set PRELOAD_WORKFLOW=false to skip the warm-up (e.g. with --reload in dev)
+PRELOAD_WORKFLOW = os.environ.get("PRELOAD_WORKFLOW", "true").lower() == "true"
+
+# Longest a request may run; callers can ask for less with X-Request-Timeout
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", "120"))
+# Analyses one WebSocket session may have in flight
+SESSION_MAX_INFLIGHT = int(os.environ.get("SESSION_MAX_INFLIGHT", "4"))
+# Seconds a closing session waits for its cancelled analyses to stop
+SESSION_CLOSE_TIMEOUT = 5.0
+
+_run_workflow = None
+_run_digest = None
+_session_module = None
+
+
+def get_run_workflow():
+    """
+    Return run_workflow, importing the workflow module on first use
+
+    The reference is cached so the request path does not repeat the
+    import machinery after the first call.
+    """
+    global _run_workflow
+    if _run_workflow is None:
+        from src.graph.workflow import run_workflow
+
+        _run_workflow = run_workflow
+    return _run_workflow
+
+
+def get_run_digest():
+    """Return run_digest, importing the workflow module on first use"""
+    global _run_digest
+    if _run_digest is None:
+        from src.graph.workflow import run_digest
+
+        _run_digest = run_digest
+    return _run_digest
+
+
+def get_session_module():
+    """Return src.graph.session, importing the workflow stack on first use"""
+    global _session_module
+    if _session_module is None:
+        from src.graph import session
+
+        _session_module = session
+    return _session_module
+
+
+def preload_workflow() -> float:
+    """
+    Import the workflow stack and compile one graph to warm it up
+
+    Returns:
+        Seconds spent warming up
+    """
+    start = time.perf_counter()
+    get_run_workflow()
+    from src.graph.workflow import create_workflow
+
+    # The first compile builds langgraph's channel and schema machinery
+    create_workflow(use_checkpointer=False)
+    return time.perf_counter() - start
+
+
+async def publish_metrics(interval: float = 1.0):
+    """Write this worker's metric snapshot to METRICS_DIR periodically"""
+    while True:
+        await asyncio.sleep(interval)
+        flush_metrics(min_interval=0.0)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Warm the worker before it accepts traffic
+
+    Uvicorn does not route requests to a worker until startup completes,
+    so the import and first-compile cost is paid here instead of by the
+    first user. In multi-worker mode the worker also publishes its
+    metrics for /metrics on the other workers.
+    """
+    if PRELOAD_WORKFLOW:
+        elapsed = preload_workflow()
+        logger.info("Workflow preloaded in %.2fs", elapsed)
+
+    publisher = None
+    if get_metrics_dir():
+        flush_metrics(min_interval=0.0)
+        publisher = asyncio.create_task(publish_metrics())
+    yield
+    get_history_store().close()
+    if publisher:
+        publisher.cancel()
+        flush_metrics(min_interval=0.0)
+
+
+def request_timeout(http_request: Request) -> float:
+    """Seconds allowed for a request: X-Request-Timeout, capped by REQUEST_TIMEOUT"""
+    try:
+        requested = float(http_request.headers.get("x-request-timeout", "inf"))
+    except ValueError:
+        requested = float("inf")
+    return max(0.0, min(requested, REQUEST_TIMEOUT))
+
+
+def request_priority(
+    http_request: Request, requested: Optional[str], default: str
+) -> str:
+    """
+    Priority class of a request: the body field, else X-Priority, else default
+
+    Raises:
+        HTTPException: If the X-Priority header names an unknown class
+    """
+    if requested:
+        return requested
+    header = http_request.headers.get("x-priority")
+    if not header:
+        return default
+    try:
+        return parse_priority(header)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def is_admin(http_request: Request) -> bool:
+    """
+    Whether the request carries the admin token (X-Admin-Token)
+
+    Always False when ADMIN_TOKEN is unset, which disables the admin
+    endpoints and request profiling.
+    """
+    expected = os.environ.get("ADMIN_TOKEN", "")
+    given = http_request.headers.get("x-admin-token", "")
+    return bool(expected) and hmac.compare_digest(given, expected)
+
+
+def require_admin(http_request: Request) -> None:
+    """
+    Raises:
+        HTTPException: 403 without a valid admin token
+    """
+    if not is_admin(http_request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+async def watch_disconnect(http_request: Request, deadline: Deadline) -> None:
+    """
+    Cancel the deadline as soon as the client goes away
+
+    The body has already been read, so the next ASGI message is the
+    disconnect. Request.is_disconnected() cannot be used: its
+    non-blocking receive never sees the message behind the
+    @app.middleware("http") wrapper.
+    """
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            deadline.cancel("disconnect")
+            return
+
+
+@asynccontextmanager
+async def cancellable(http_request: Request):
+    """
+    Run the block under a deadline for this request
+
+    The deadline expires after request_timeout() seconds and is cancelled
+    when the client disconnects (e.g. the frontend proxy's own timeout
+    fired). Work started in the threadpool inherits it, so nodes and LLM
+    generations stop instead of running to completion for nobody.
+    """
+    deadline = Deadline(request_timeout(http_request))
+    watcher = asyncio.create_task(watch_disconnect(http_request, deadline))
+    try:
+        with deadline_scope(deadline=deadline):
+            yield deadline
+    finally:
+        watcher.cancel()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when available"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Text Analysis API",
@@ -33,6 +282,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Configure CORS - Allow frontend to access the API
@@ -45,10 +296,74 @@ app.add_middleware(
         "https://*.vercel.app",  # All Vercel preview deployments
     ],
     allow_credentials=True,
-    allow_methods=["GET", "POST"],
+    allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID", "X-Profile-ID"],
 )
 
+# gzip (or brotli, with the brotli package) for responses above the threshold
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("COMPRESSION_MIN_SIZE", "500")),
+)
+
+
+@app.middleware("http")
+async def request_logging_middleware(request: Request, call_next):
+    """
+    Bind a correlation ID to API requests and emit one summary record each
+
+    The ID is taken from the X-Request-ID header when the caller (e.g. the
+    frontend proxy) sends one, and is echoed back in the response.
+
+    With an X-Profile header and the admin token, the request runs under
+    the sampling profiler (src/utils/profiling.py); the profile is then
+    available from /api/admin/profiles/<X-Profile-ID>.
+
+    With tracing on, the request is a server span joining the caller's
+    trace (traceparent header, sent by the frontend proxy).
+    """
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+
+    profile = request.headers.get("x-profile", "").lower() in ("1", "true", "on")
+    if profile and not is_admin(request):
+        return JSONResponse(
+            status_code=403, content={"detail": "Profiling needs the admin token"}
+        )
+
+    # Unsafe caller IDs (too long, or breaking log lines) are replaced
+    request_id = valid_request_id(request.headers.get("x-request-id"))
+    with (
+        request_context(
+            request_id=request_id, method=request.method, path=request.url.path
+        ) as request_log,
+        span(
+            f"{request.method} {request.url.path}",
+            SERVER,
+            request.headers.get("traceparent"),
+        ) as server_span,
+    ):
+        server_span.set_attribute("http.request.method", request.method)
+        server_span.set_attribute("url.path", request.url.path)
+        server_span.set_attribute("request.id", request_log.request_id)
+        if server_span.trace_id:
+            record(trace_id=server_span.trace_id)
+        if profile:
+            name = f"{request.method} {request.url.path} {request_log.request_id}"
+            with profile_scope(name) as profiled:
+                response = await call_next(request)
+            record(profile_id=profiled.profile_id)
+            response.headers["X-Profile-ID"] = profiled.profile_id
+        else:
+            response = await call_next(request)
+        record(status=response.status_code)
+        server_span.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code >= 500:
+            server_span.set_error(f"HTTP {response.status_code}")
+    response.headers["X-Request-ID"] = request_log.request_id
+    return response
+
 
 # Request/Response models
 class TextAnalysisRequest(BaseModel):
@@ -59,19 +374,139 @@ class TextAnalysisRequest(BaseModel):
     )
     model_name: Optional[str] = Field(
         default="qwen2.5-coder:0.5b",
-        description="Ollama model name to use for analysis",
+        description="Ollama model name to use for analysis, or 'auto' to let "
+        "the router pick the smallest adequate model",
+    )
+    quality: Optional[Literal["basic", "standard", "high"]] = Field(
+        default=None,
+        description="Minimum quality tier of the model chosen for "
+        "model_name='auto' (defaults to basic)",
+    )
+    cascade: bool = Field(
+        default=False,
+        description="Run the smallest CASCADE_MODELS model first and escalate "
+        "to larger ones only when its answer fails a quality gate "
+        "(model_name is ignored)",
+    )
+    provider: Optional[str] = Field(
+        default=None,
+        description="Model provider: ollama, mock or llamacpp (defaults to LLM_PROVIDER)",
+    )
+    preset: Optional[Literal["creative", "balanced", "precise", "deterministic"]] = (
+        Field(
+            default=None,
+            description="Sampling preset; its per-task generation profiles "
+            "(e.g. longer creative summaries) replace the defaults",
+        )
+    )
+    extractive_ratio: Optional[float] = Field(
+        default=None,
+        ge=0.05,
+        le=1.0,
+        description="Condense the input to this fraction of its tokens before "
+        "the LLM sees it (lower is faster, higher keeps more content)",
+    )
+    extractive_max_tokens: Optional[int] = Field(
+        default=None,
+        ge=16,
+        description="Absolute token budget for the extractive condensation",
+    )
+    sentiment_strategy: Optional[Literal["llm", "lexicon", "hybrid"]] = Field(
+        default=None,
+        description="llm, lexicon (local classifier) or hybrid (lexicon, "
+        "escalating low-confidence results to the LLM)",
+    )
+    echo_input: bool = Field(
+        default=True,
+        description="Include input_text in the response (disable to halve the "
+        "response size for large inputs)",
+    )
+    priority: Optional[Literal["interactive", "batch", "background"]] = Field(
+        default=None,
+        description="Scheduling class for the model calls (defaults to the "
+        "X-Priority header or interactive)",
+    )
+
+
+class SpeculationRequest(TextAnalysisRequest):
+    """Request model for a speculative analysis"""
+
+    speculation_id: str = Field(
+        ...,
+        pattern=r"^[A-Za-z0-9_-]{1,64}$",
+        description="ID of the client (e.g. a browser tab); a new text from "
+        "the same client cancels its previous speculation",
     )
 
 
 class TextAnalysisResponse(BaseModel):
     """Response model for text analysis"""
 
-    input_text: str
+    input_text: Optional[str] = None
     word_count: int
     character_count: int
     summary: str
     sentiment: str
     model_used: str
+    provider_used: str
+    prompt_stats: Optional[dict] = None
+    sentiment_source: str
+    sentiment_confidence: Optional[float] = None
+    cached: bool = False
+    degraded: bool = False
+    degraded_reason: Optional[str] = None
+    routing: Optional[dict] = None
+    cascade: Optional[dict] = None
+    success: bool = True
+
+
+class DigestRequest(BaseModel):
+    """Request model for a multi-document digest"""
+
+    documents: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="The texts to digest (each at most 10000 characters)",
+    )
+    model_name: Optional[str] = Field(
+        default="qwen2.5-coder:0.5b",
+        description="Ollama model name to use for analysis",
+    )
+    provider: Optional[str] = Field(
+        default=None,
+        description="Model provider: ollama, mock or llamacpp (defaults to LLM_PROVIDER)",
+    )
+    extractive_ratio: Optional[float] = Field(
+        default=None,
+        ge=0.05,
+        le=1.0,
+        description="Condense each document to this fraction of its tokens",
+    )
+    sentiment_strategy: Optional[Literal["llm", "lexicon", "hybrid"]] = Field(
+        default=None,
+        description="llm, lexicon or hybrid, applied to every document",
+    )
+    max_clusters: int = Field(
+        default=8, ge=1, le=32, description="Upper bound on topic clusters"
+    )
+    priority: Optional[Literal["interactive", "batch", "background"]] = Field(
+        default=None,
+        description="Scheduling class for the model calls (defaults to the "
+        "X-Priority header or batch)",
+    )
+
+
+class DigestResponse(BaseModel):
+    """Response model for a multi-document digest"""
+
+    documents: List[dict]
+    clusters: List[dict]
+    overall_summary: str
+    sentiment_distribution: Dict[str, int]
+    model_used: str
+    provider_used: str
+    degraded: bool = False
     success: bool = True
 
 
@@ -80,6 +515,7 @@ class HealthResponse(BaseModel):
 
     status: str
     message: str
+    breakers: Dict[str, dict] = {}
 
 
 class ErrorResponse(BaseModel):
@@ -102,72 +538,696 @@ async def root():
     }
 
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
     Health check endpoint for monitoring
+
+    Reports the circuit breaker of every model backend used so far. The
+    status is 'degraded' while a breaker is not closed; the API itself
+    still answers (HTTP 200), so the instance is not restarted for an
+    outage of the model server.
+    """
+    breakers = breaker_states()
+    if any(breaker["state"] != "closed" for breaker in breakers.values()):
+        return {
+            "status": "degraded",
+            "message": "Model backend unavailable: "
+            + ", ".join(name for name, b in breakers.items() if b["state"] != "closed"),
+            "breakers": breakers,
+        }
+    return {"status": "healthy", "message": "API is operational", "breakers": breakers}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics in text exposition format
+    """
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/api/concurrency")
+async def concurrency_limits():
+    """
+    Adaptive LLM concurrency limit per model (this worker process)
+
+    Each entry reports the current limit, calls in flight, the number of
+    speed samples and the short/long-term generation speeds (tokens/s).
+    /metrics has the same limits summed over all workers.
+    """
+    return {"pid": os.getpid(), "models": limiter_snapshots()}
+
+
+def analysis_params(request: TextAnalysisRequest, http_request: Request):
+    """
+    Workflow parameters of an analysis request, also its cache key fields
+
+    Resolves the provider and, for model_name='auto', the model, so that
+    /api/speculate and /api/analyze derive the same key for the same
+    input.
+
+    Returns:
+        Tuple of (params, routing decision or None)
+
+    Raises:
+        HTTPException: 400 for invalid input or an unknown provider
     """
-    return {"status": "healthy", "message": "API is operational"}
+    is_valid, error_message = validate_input(request.text)
+    if not is_valid:
+        logger.warning("Invalid input: %s", error_message)
+        raise HTTPException(status_code=400, detail=error_message)
+
+    try:
+        provider = get_provider(request.provider)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if not provider.is_available():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Provider '{provider.name}' is not available on this server",
+        )
+
+    model_name, routing = request.model_name, None
+    if request.cascade:
+        model_name = None
+    elif model_name == AUTO:
+        try:
+            routing = route(
+                request.text, request.quality, request_timeout(http_request)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        model_name = routing["model"]
+        record(routed_model=model_name, route_reason=routing["reason"])
+
+    params = {
+        "input_text": request.text,
+        "model_name": model_name,
+        "provider": provider.name,
+        "extractive_ratio": request.extractive_ratio,
+        "extractive_max_tokens": request.extractive_max_tokens,
+        "sentiment_strategy": request.sentiment_strategy
+        or os.environ.get("SENTIMENT_STRATEGY", "llm"),
+    }
+    if request.cascade:
+        params["cascade_models"] = cascade_models()
+    if request.preset:
+        params["preset"] = request.preset
+    return params, routing
+
+
+def analysis_job(params: dict, source: Optional[str] = "api"):
+    """
+    Function running the workflow for params, for get_or_compute
+
+    Args:
+        params: Workflow parameters (see analysis_params)
+        source: History source of the result; None to leave it out of
+            the history (speculative runs nobody asked for yet)
+    """
+    run_workflow = get_run_workflow()
+
+    def compute():
+        state = run_workflow(thread_id=None, **params)
+        result = AnalysisResult.from_state(state).to_dict()
+        if source is not None:
+            model = (
+                result["cascade"]["model"]
+                if result["cascade"]
+                else params["model_name"]
+            )
+            record_analysis(
+                params["input_text"], result, model, params["provider"], source
+            )
+        return result
 
+    return compute
 
-@app.post("/api/analyze")
-async def analyze_text(request: TextAnalysisRequest):
+
+def cacheable_result(value: dict) -> bool:
+    return AnalysisResult(**value).cacheable
+
+
+@app.post(
+    "/api/analyze",
+    responses={200: {"model": TextAnalysisResponse}, 304: {"description": "Unchanged"}},
+)
+async def analyze_text(request: TextAnalysisRequest, http_request: Request):
     """
     Analyze text and return summary with sentiment
 
     Args:
         request: TextAnalysisRequest with text and optional model_name
 
+    The response carries an ETag derived from the analysis content.
+    A client repeating the request with If-None-Match set to that tag
+    gets 304 Not Modified without a body.
+
+    The analysis stops when the client disconnects or the request
+    timeout (X-Request-Timeout, capped by REQUEST_TIMEOUT) passes; the
+    latter is answered with 504.
+
+    While the model backend's circuit breaker is open the request fails
+    in milliseconds with 503 and Retry-After, unless DEGRADED_MODE=extractive,
+    in which case an extractive summary with lexicon sentiment is
+    returned with degraded=true.
+
+    Model calls wait for a slot in the request's priority class: the
+    priority field, else the X-Priority header, else interactive.
+
+    With model_name='auto' the model is chosen by src/config/routing.py
+    and the decision is returned in the routing field. With cascade=true
+    the models of the cascade are tried from the smallest, and the
+    cascade field reports the attempts and the estimated time saved.
+
     Returns:
-        TextAnalysisResponse with analysis results
+        TextAnalysisResponse fields, serialized directly (the payload is
+        built here, so FastAPI's re-validation and encoding are skipped)
 
     Raises:
         HTTPException: If validation or processing fails
     """
     try:
-        logger.info("Received analysis request for %d characters", len(request.text))
-
-        # Validate input
-        from src.utils.helpers import validate_input
+        priority = request_priority(http_request, request.priority, INTERACTIVE)
+        record(
+            input_chars=len(request.text), model=request.model_name, priority=priority
+        )
 
-        is_valid, error_message = validate_input(request.text)
-        if not is_valid:
-            logger.warning("Invalid input: %s", error_message)
-            raise HTTPException(status_code=400, detail=error_message)
+        params, routing = analysis_params(request, http_request)
+        model_name = params["model_name"]
 
-        # Run workflow
-        from src.graph.workflow import run_workflow
+        # Identical requests are served from the result cache, and
+        # concurrent ones (in any worker) share a single workflow run.
+        # The workflow blocks, so it runs in the threadpool to keep the
+        # event loop free.
+        key = cache_key(**params)
+        async with cancellable(http_request):
+            with priority_scope(priority):
+                cached, cache_outcome = await run_in_threadpool(
+                    get_or_compute,
+                    key,
+                    analysis_job(params),
+                    cacheable=cacheable_result,
+                )
+        record(cache=cache_outcome)
+        result = AnalysisResult(**cached)
+        if result.cascade:
+            model_name = result.cascade["model"]
+        if cache_outcome != "miss" and get_speculations().take(key):
+            # Typed-ahead result: it was not recorded when computed
+            SPECULATION_HITS.inc(outcome=cache_outcome)
+            record(speculated=True)
+            record_analysis(request.text, cached, model_name, params["provider"], "api")
 
-        logger.info("Running workflow with model: %s", request.model_name)
-        result = run_workflow(
-            input_text=request.text,
-            model_name=request.model_name,
-            thread_id=None,  # Each request is independent
+        # The tag covers the request parameters, the analysis and whether
+        # the input is echoed, but not volatile fields such as "cached"
+        etag = make_etag(
+            key.encode("ascii"), dumps(cached), b"echo" if request.echo_input else b""
         )
+        if etag_matches(http_request.headers.get("if-none-match"), etag):
+            record(not_modified=True)
+            return Response(status_code=304, headers={"ETag": etag})
 
         # Prepare response
-        response = {
-            "input_text": result["input_text"],
-            "word_count": result["word_count"],
-            "character_count": len(request.text),
-            "summary": result["summary"],
-            "sentiment": result["sentiment"],
-            "model_used": request.model_name,
-            "success": True,
-        }
+        response = {"input_text": request.text} if request.echo_input else {}
+        response.update(
+            word_count=result.word_count,
+            character_count=len(request.text),
+            summary=result.summary,
+            sentiment=result.sentiment,
+            model_used=model_name,
+            provider_used=params["provider"],
+            prompt_stats=result.prompt_stats,
+            sentiment_source=result.sentiment_source,
+            sentiment_confidence=result.sentiment_confidence,
+            cached=cache_outcome != "miss",
+            degraded=result.degraded is not None,
+            degraded_reason=result.degraded,
+            success=True,
+        )
+        if routing is not None:
+            response["routing"] = routing
+        if result.cascade:
+            response["cascade"] = result.cascade
+
+        return FastJSONResponse(response, headers={"ETag": etag})
+
+    except (HTTPException, RequestCancelled, CircuitOpenError):
+        raise
+    except Exception as e:
+        logger.error("Error processing request: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=500, detail="Internal server error: %s" % str(e)
+        )
+
+
+# Running speculations, referenced so they are not garbage collected
+_speculation_tasks = set()
+
+
+async def run_speculation(
+    client_id: str, key: str, params: dict, deadline: Deadline, request_id: str
+) -> None:
+    """Compute a speculative analysis into the result cache"""
+    with (
+        request_context(request_id=request_id, speculative=True),
+        deadline_scope(deadline=deadline),
+        priority_scope(BACKGROUND),
+    ):
+        try:
+            _, outcome = await run_in_threadpool(
+                get_or_compute,
+                key,
+                analysis_job(params, source=None),
+                cacheable=cacheable_result,
+            )
+            record(cache=outcome)
+            SPECULATION_RESULTS.inc(result="completed")
+        except RequestCancelled:
+            SPECULATION_RESULTS.inc(result="cancelled")
+        except Exception as e:  # pylint: disable=broad-except
+            # Nobody waits for the result; /api/analyze reports the error
+            logger.warning("Speculative analysis failed: %s", e)
+            record(error=type(e).__name__)
+            SPECULATION_RESULTS.inc(result="failed")
+        finally:
+            get_speculations().end(client_id, deadline)
+
+
+@app.post("/api/speculate", status_code=202)
+async def speculate(request: SpeculationRequest, http_request: Request):
+    """
+    Start analyzing a text the user has not submitted yet
+
+    The web UI calls this while the user is typing. The analysis runs in
+    the background, in the background priority class, into the result
+    cache, so the /api/analyze request that follows for the same text
+    and options finds it finished or joins it. The answer does not wait
+    for the analysis.
+
+    A new text from the same speculation_id cancels the previous
+    speculation; sending the same text again does nothing.
+
+    Returns:
+        status: 'started', 'cached' (already analyzed), 'in_flight'
+        (already being analyzed) or 'skipped' (too many speculations
+        running)
+    """
+    params, _ = analysis_params(request, http_request)
+    key = cache_key(**params)
+    speculations = get_speculations()
+    if speculations.supersede(request.speculation_id, key) or is_inflight(key):
+        status = "in_flight"
+    elif get_result_cache().get(key) is not None:
+        status = "cached"
+    else:
+        deadline = speculations.begin(
+            request.speculation_id, key, speculation_timeout()
+        )
+        if deadline is None:
+            status = "skipped"
+        else:
+            status = "started"
+            # A fresh context: the speculation outlives this request, and
+            # gets its own request summary and deadline
+            task = asyncio.create_task(
+                run_speculation(
+                    request.speculation_id,
+                    key,
+                    params,
+                    deadline,
+                    current_request_id(),
+                ),
+                context=contextvars.Context(),
+            )
+            _speculation_tasks.add(task)
+            task.add_done_callback(_speculation_tasks.discard)
+    SPECULATIONS.inc(outcome=status)
+    record(speculation=status)
+    return {"status": status}
+
+
+@app.delete("/api/speculate/{speculation_id}")
+async def cancel_speculation(speculation_id: str):
+    """
+    Cancel the running speculation of a client (e.g. its text was cleared)
+
+    Returns:
+        cancelled: Whether a speculation was running
+    """
+    return {"cancelled": get_speculations().cancel(speculation_id)}
+
+
+@app.post("/api/digest", responses={200: {"model": DigestResponse}})
+async def digest_documents(request: DigestRequest, http_request: Request):
+    """
+    Digest several documents: per-document analyses, topic clusters with
+    a summary each, an overall summary and the sentiment distribution
+
+    Documents are analyzed in parallel and share the /api/analyze result
+    cache, so documents analyzed before are not sent to the model again.
+
+    Its model calls run in the batch priority class unless the priority
+    field or the X-Priority header says otherwise, so a digest does not
+    hold up interactive analyses.
+
+    Raises:
+        HTTPException: If validation or processing fails
+    """
+    try:
+        priority = request_priority(http_request, request.priority, BATCH)
+        record(
+            documents=len(request.documents),
+            model=request.model_name,
+            priority=priority,
+        )
+
+        for index, text in enumerate(request.documents):
+            is_valid, error_message = validate_input(text)
+            if not is_valid:
+                raise HTTPException(
+                    status_code=400, detail=f"Document {index}: {error_message}"
+                )
+        if request.model_name == AUTO:
+            # One model serves every branch and the cluster summaries
+            raise HTTPException(
+                status_code=400,
+                detail="model_name 'auto' is only supported by /api/analyze",
+            )
 
-        logger.info("Analysis completed successfully")
-        return response
+        try:
+            provider = get_provider(request.provider)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        if not provider.is_available():
+            raise HTTPException(
+                status_code=400,
+                detail=f"Provider '{provider.name}' is not available on this server",
+            )
 
-    except HTTPException:
+        run_digest = get_run_digest()
+        async with cancellable(http_request):
+            digest = await run_in_threadpool(
+                run_digest,
+                request.documents,
+                model_name=request.model_name,
+                provider=provider.name,
+                sentiment_strategy=request.sentiment_strategy,
+                extractive_ratio=request.extractive_ratio,
+                max_clusters=request.max_clusters,
+                priority=priority,
+            )
+        digest.update(
+            model_used=request.model_name, provider_used=provider.name, success=True
+        )
+        return FastJSONResponse(digest)
+
+    except (HTTPException, RequestCancelled, CircuitOpenError):
         raise
     except Exception as e:
-        logger.error("Error processing request: %s", str(e), exc_info=True)
+        logger.error("Error processing digest: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500, detail="Internal server error: %s" % str(e)
         )
 
 
+@app.websocket("/api/session/{thread_id}")
+async def analysis_session(
+    websocket: WebSocket,
+    thread_id: str,
+    model_name: str = "qwen2.5-coder:0.5b",
+    provider: Optional[str] = None,
+    sentiment_strategy: Optional[Literal["llm", "lexicon", "hybrid"]] = None,
+    extractive_ratio: Optional[float] = Query(default=None, ge=0.05, le=1.0),
+    extractive_max_tokens: Optional[int] = Query(default=None, ge=16),
+):
+    """
+    Analysis session for one thread over a WebSocket
+
+    The compiled workflow and the model client are created once, when
+    the connection opens, and reused by every analysis sent on it; runs
+    are checkpointed in the thread. Messages are JSON:
+
+    Client:
+        {"type": "analyze", "id": "a1", "text": "...", "priority": "batch",
+         "timeout": 30}  (id, priority and timeout are optional)
+        {"type": "cancel", "id": "a1"}
+
+    Server:
+        {"type": "ready", "thread_id", "model", "provider"}
+        {"type": "node", "id", "node", "update"}  when a node finishes
+        {"type": "token", "id", "task", "text"}   as the model generates
+        {"type": "result", "id", ...analysis fields..., "duration_ms"}
+        {"type": "error", "id", "status", "detail"}
+        {"type": "cancelled", "id"}
+
+    Up to SESSION_MAX_INFLIGHT analyses run at once; events of different
+    analyses interleave and carry their id. Analyses still running when
+    the connection closes are cancelled.
+    """
+    await websocket.accept()
+    try:
+        if model_name == AUTO:
+            # The session keeps one model for all its texts
+            raise ValueError("Sessions need a model name; 'auto' is not supported")
+        provider_name = get_provider(provider).name
+        if not get_provider(provider_name).is_available():
+            raise ValueError(f"Provider '{provider_name}' is not available")
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "status": 400, "detail": str(e)})
+        await websocket.close(code=1008)
+        return
+
+    session_module = get_session_module()
+    session = await run_in_threadpool(
+        session_module.AnalysisSession,
+        thread_id,
+        model_name=model_name,
+        provider=provider_name,
+        sentiment_strategy=sentiment_strategy
+        or os.environ.get("SENTIMENT_STRATEGY", "llm"),
+        extractive_ratio=extractive_ratio,
+        extractive_max_tokens=extractive_max_tokens,
+    )
+    session_module.SESSIONS.inc()
+    loop = asyncio.get_running_loop()
+    # One writer: events come from the graph threads and the run tasks
+    outbox: asyncio.Queue = asyncio.Queue()
+    runs: Dict[str, Deadline] = {}
+    # The event loop only keeps weak references to tasks
+    tasks: Set[asyncio.Task] = set()
+    ids = itertools.count(1)
+
+    async def send_events():
+        while True:
+            event = await outbox.get()
+            await websocket.send_text(dumps(event).decode("utf-8"))
+
+    async def analyze(run_id: str, text: str, deadline: Deadline, priority: str):
+        def emit(event):
+            loop.call_soon_threadsafe(outbox.put_nowait, {"id": run_id, **event})
+
+        start = time.perf_counter()
+        # Replaced by every handled outcome; a task cancelled by the loop
+        # leaves through the finally clause without sending anything
+        event = {"type": "cancelled", "id": run_id}
+        try:
+            result = await run_in_threadpool(
+                session.run, text, emit, deadline, priority
+            )
+            record_analysis(
+                text, result.to_dict(), model_name, provider_name, "session"
+            )
+            event = {"type": "result", "id": run_id, **result.to_dict()}
+            event.update(
+                degraded=result.degraded is not None,
+                degraded_reason=result.degraded,
+                duration_ms=round((time.perf_counter() - start) * 1000, 1),
+            )
+        except RequestCancelled as e:
+            if e.reason == "deadline":
+                event = {"type": "error", "id": run_id, "status": 504, "detail": str(e)}
+            else:
+                event = {"type": "cancelled", "id": run_id}
+        except CircuitOpenError as e:
+            event = {"type": "error", "id": run_id, "status": 503, "detail": str(e)}
+        except Exception as e:
+            logger.error("Error in session analysis: %s", e, exc_info=True)
+            event = {"type": "error", "id": run_id, "status": 500, "detail": str(e)}
+        finally:
+            runs.pop(run_id, None)
+        outbox.put_nowait(event)
+
+    def start(message) -> None:
+        """Start an analysis; raises HTTPException if it is not accepted"""
+        run_id = str(message.get("id") or next(ids))
+        if run_id in runs:
+            raise HTTPException(409, f"Analysis '{run_id}' is already running")
+        if len(runs) >= SESSION_MAX_INFLIGHT:
+            raise HTTPException(
+                429, f"At most {SESSION_MAX_INFLIGHT} analyses may run at once"
+            )
+        text = message.get("text")
+        is_valid, error = validate_input(text if isinstance(text, str) else "")
+        if not is_valid:
+            raise HTTPException(400, error)
+        try:
+            priority = parse_priority(message.get("priority") or INTERACTIVE)
+            timeout = min(
+                float(message.get("timeout", REQUEST_TIMEOUT)), REQUEST_TIMEOUT
+            )
+        except (TypeError, ValueError) as e:
+            raise HTTPException(400, str(e)) from e
+        runs[run_id] = Deadline(max(0.0, timeout))
+        task = asyncio.create_task(analyze(run_id, text, runs[run_id], priority))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    await websocket.send_json(
+        {
+            "type": "ready",
+            "thread_id": thread_id,
+            "model": model_name,
+            "provider": provider_name,
+        }
+    )
+    sender = asyncio.create_task(send_events())
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict):
+                    raise ValueError("Messages must be JSON objects")
+            except ValueError as e:
+                outbox.put_nowait({"type": "error", "status": 400, "detail": str(e)})
+                continue
+            kind = message.get("type")
+            try:
+                if kind == "analyze":
+                    start(message)
+                elif kind == "cancel":
+                    deadline = runs.get(str(message.get("id")))
+                    if deadline is not None:
+                        deadline.cancel("cancelled")
+                else:
+                    raise HTTPException(400, f"Unknown message type '{kind}'")
+            except HTTPException as e:
+                outbox.put_nowait(
+                    {
+                        "type": "error",
+                        "id": message.get("id"),
+                        "status": e.status_code,
+                        "detail": e.detail,
+                    }
+                )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for deadline in list(runs.values()):
+            deadline.cancel("disconnect")
+        if tasks:
+            # The cancelled runs stop at their next deadline check
+            _, pending = await asyncio.wait(tasks, timeout=SESSION_CLOSE_TIMEOUT)
+            for task in pending:
+                task.cancel()
+        sender.cancel()
+        session_module.SESSIONS.dec()
+
+
+@app.get("/api/history")
+async def analysis_history(
+    model: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    content_hash: Optional[str] = Query(
+        default=None, description="SHA-256 (hex) of the analyzed text"
+    ),
+    source: Optional[Literal["api", "digest", "cli", "session"]] = None,
+    since: Optional[float] = Query(default=None, description="Unix timestamp"),
+    until: Optional[float] = Query(default=None, description="Unix timestamp"),
+    cursor: Optional[int] = Query(
+        default=None, description="next_cursor of the previous page"
+    ),
+    limit: int = Query(default=50, ge=1, le=200),
+    include_text: bool = False,
+):
+    """
+    Past analyses, newest first
+
+    Filters combine; pages continue with the previous page's next_cursor
+    (None on the last page). Entries carry the stored analysis fields, so
+    an earlier result can be reused without running the model again.
+    Entries are written in the background and appear shortly after the
+    analysis finishes.
+    """
+    return await run_in_threadpool(
+        get_history_store().query,
+        model=model,
+        sentiment=sentiment,
+        content_hash=content_hash,
+        source=source,
+        since=since,
+        until=until,
+        before=cursor,
+        limit=limit,
+        include_text=include_text,
+    )
+
+
+@app.get("/api/history/{entry_id}")
+async def analysis_history_entry(entry_id: int):
+    """
+    One past analysis, including its input text
+
+    Raises:
+        HTTPException: 404 if there is no such entry
+    """
+    entry = await run_in_threadpool(get_history_store().get, entry_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="History entry not found")
+    return entry
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(http_request: Request):
+    """
+    Retained request profiles, newest first (needs X-Admin-Token)
+
+    Raises:
+        HTTPException: 403 without the admin token
+    """
+    require_admin(http_request)
+    return {"profiles": await run_in_threadpool(get_profile_store().list)}
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    http_request: Request,
+    format: Literal["speedscope", "collapsed"] = "speedscope",
+):
+    """
+    One request profile (needs X-Admin-Token)
+
+    The default format opens in https://www.speedscope.app; 'collapsed'
+    is the input of flamegraph.pl.
+
+    Raises:
+        HTTPException: 403 without the admin token, 404 if the profile is
+            unknown or no longer retained
+    """
+    require_admin(http_request)
+    profile = await run_in_threadpool(get_profile_store().get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed_stacks(profile))
+    return profile
+
+
 @app.get("/api/models")
 async def list_models():
     """
@@ -186,25 +1246,93 @@ async def list_models():
         "mistral",
         "codellama",
     ]
-    return {"models": models, "default": "qwen2.5-coder:0.5b"}
+    return {
+        "models": [AUTO] + models,
+        "default": "qwen2.5-coder:0.5b",
+        "providers": list_providers(),
+        "default_provider": get_provider().name,
+        "quality_tiers": list(QUALITY_TIERS),
+        "presets": list(MODEL_PRESETS),
+    }
+
+
+@app.get("/api/routing")
+async def routing_profiles():
+    """
+    Models model_name='auto' may choose (this worker process)
+
+    Each entry has the model's declared capability profile and its
+    measured slowdown: the moving average of measured over declared call
+    time, which scales its latency estimate.
+    """
+    measured = LATENCY.snapshot()
+    return {
+        "pid": os.getpid(),
+        "models": [
+            {
+                **profile.to_dict(),
+                **measured.get(profile.name, {"slowdown": 1.0, "samples": 0}),
+            }
+            for profile in routable_models()
+        ],
+    }
 
 
 # Error handlers
+@app.exception_handler(RequestCancelled)
+async def cancelled_handler(request, exc: RequestCancelled):
+    """Answer abandoned work: 504 after the deadline, 499 on disconnect"""
+    logger.info("%s", exc)
+    if exc.reason == "deadline":
+        return JSONResponse(
+            status_code=504,
+            content={
+                "success": False,
+                "error": "Request timeout",
+                "detail": "The analysis did not finish within the request timeout.",
+            },
+        )
+    # Nobody is listening; 499 is what nginx logs for a closed client
+    return Response(status_code=499)
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request, exc: CircuitOpenError):
+    """Fail fast while the model backend is known to be down"""
+    record(circuit_open=exc.name)
+    return JSONResponse(
+        status_code=503,
+        content={
+            "success": False,
+            "error": "Model backend unavailable",
+            "detail": str(exc),
+        },
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
     """Handle 404 errors"""
-    return {"success": False, "error": "Endpoint not found", "detail": str(exc)}
+    detail = getattr(exc, "detail", None) or str(exc)
+    return JSONResponse(
+        status_code=404,
+        content={"success": False, "error": "Not found", "detail": detail},
+    )
 
 
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     """Handle 500 errors"""
     logger.error("Internal server error: %s", str(exc), exc_info=True)
-    return {
-        "success": False,
-        "error": "Internal server error",
-        "detail": "An unexpected error occurred. Please try again later.",
-    }
+    return JSONResponse(
+        status_code=500,
+        content={
+            "success": False,
+            "error": "Internal server error",
+            "detail": "An unexpected error occurred. Please try again later.",
+        },
+    )
 
 
 # Run with: uvicorn api:app --reload --host 0.0.0.0 --port 8000
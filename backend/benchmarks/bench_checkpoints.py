@@ -0,0 +1,127 @@
+"""
+Checkpoint write/read cost and memory per thread
+
+Runs the workflow (mock provider, extractive stage on) several times in
+each of a number of threads with a persistent checkpointer, once with
+LangGraph's plain MemorySaver and once per blob store compression (see
+src/graph/checkpoint.py), and reports:
+
+- write: mean time of the checkpointer's put/put_writes calls
+- read: mean time to load a thread's full history (get_state_history)
+- memory: bytes held by the checkpointer (checkpoints, channel values,
+  pending writes and blobs) per thread
+
+Every run of a thread analyzes the same input, as when a conversation
+re-analyzes a document; different threads use different inputs.
+
+Usage:
+    python benchmarks/bench_checkpoints.py
+    python benchmarks/bench_checkpoints.py --chars 2000 --threads 50 --runs 5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("HISTORY_STORE", "off")
+
+from bench_serialization import DATA_DIR, deep_size  # noqa: E402
+
+from src.graph.workflow import create_workflow  # noqa: E402
+from src.utils.blobs import zstandard  # noqa: E402
+
+
+class Timed:
+    """Wraps checkpointer methods, summing the time spent in them"""
+
+    def __init__(self, saver, names):
+        self.seconds = 0.0
+        self.calls = 0
+        for name in names:
+            setattr(saver, name, self.wrap(getattr(saver, name)))
+
+    def wrap(self, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.calls += 1
+
+        return timed
+
+
+def run(mode: str, texts, runs: int) -> dict:
+    """One configuration; returns its report row"""
+    os.environ["CHECKPOINT_BLOBS"] = "off" if mode == "plain" else "on"
+    os.environ["CHECKPOINT_COMPRESSION"] = "" if mode == "plain" else mode
+    workflow = create_workflow(
+        model_name="bench", provider="mock", extractive_ratio=0.3
+    )
+    saver = workflow.checkpointer
+    writes = Timed(saver, ["put", "put_writes"])
+
+    for _ in range(runs):
+        for index, text in enumerate(texts):
+            config = {"configurable": {"thread_id": f"thread-{index}"}}
+            # Synchronous checkpoints, so the writes are timed on this thread
+            workflow.invoke({"input_text": text}, config=config, durability="sync")
+
+    start = time.perf_counter()
+    checkpoints = 0
+    for index in range(len(texts)):
+        config = {"configurable": {"thread_id": f"thread-{index}"}}
+        checkpoints += len(list(workflow.get_state_history(config)))
+    read = (time.perf_counter() - start) / len(texts)
+
+    memory = deep_size([saver.storage, saver.writes, saver.blobs])
+    store = getattr(saver.serde, "store", None)
+    if store is not None:
+        memory += store.stats()["memory_bytes"]
+    return {
+        "mode": mode,
+        "write_us": writes.seconds / writes.calls * 1e6,
+        "read_ms": read * 1000,
+        "per_thread": memory / len(texts),
+        "checkpoints": checkpoints / len(texts),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Checkpoint benchmark")
+    parser.add_argument("--chars", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3, help="runs per thread")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    samples = " ".join(
+        p.read_text(encoding="utf-8").strip()
+        for p in sorted(DATA_DIR.glob("sample*.txt"))
+    )
+    texts = []
+    for index in range(args.threads):
+        text = f"Report {index}. " + samples * (args.chars // len(samples) + 1)
+        texts.append(text[: args.chars])
+
+    modes = ["plain", "zlib"] + (["zstd"] if zstandard is not None else [])
+    print(f"{args.threads} threads x {args.runs} runs, {args.chars} character inputs")
+    print(
+        f"{'mode':>6} {'write/call':>11} {'history read':>13} "
+        f"{'memory/thread':>14} {'checkpoints':>12}"
+    )
+    for mode in modes:
+        row = run(mode, texts, args.runs)
+        print(
+            f"{row['mode']:>6} {row['write_us']:9.0f}µs {row['read_ms']:11.2f}ms "
+            f"{row['per_thread'] / 1024:12.1f}KB {row['checkpoints']:12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
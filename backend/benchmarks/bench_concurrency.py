@@ -0,0 +1,169 @@
+"""
+Adaptive LLM concurrency against a simulated Ollama
+
+The simulated server generates at ``--speed`` tokens/s per request while
+at most ``--saturation`` requests run. Beyond that the host is saturated:
+total throughput stays flat and every request slows down in proportion,
+as with a real model server once its parallel slots or cores are used up.
+Midway through, the saturation point drops (``--saturation-after``) to
+show the limiter backing off, e.g. when another model is loaded.
+
+``--clients`` threads call nodes.generate in a loop, under each mode:
+
+- unlimited: every client generates at once
+- fixed:     LLM_CONCURRENCY set to the initial saturation point
+- adaptive:  the gradient limiter
+
+The report covers throughput, per-call latency and the limit over time.
+With adaptive limits, throughput stays at the unlimited level while the
+latency stays near the unloaded one.
+
+Usage:
+    python benchmarks/bench_concurrency.py
+    python benchmarks/bench_concurrency.py --saturation 8 --clients 32
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage  # noqa: E402
+
+from src.graph.nodes import generate  # noqa: E402
+from src.utils.concurrency import AdaptiveLimiter  # noqa: E402
+
+
+class SimulatedOllama:
+    """Chat model whose per-request speed drops past a saturation point"""
+
+    def __init__(self, speed: float, saturation: int, tokens: int, step: float = 0.005):
+        self.speed = speed
+        self.saturation = saturation
+        self.tokens = tokens
+        self.step = step
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, messages):
+        with self.lock:
+            self.active += 1
+        generated = 0.0
+        try:
+            while generated < self.tokens:
+                time.sleep(self.step)
+                share = min(1.0, self.saturation / self.active)
+                generated += self.speed * share * self.step
+        finally:
+            with self.lock:
+                self.active -= 1
+        return AIMessage(
+            content="token " * self.tokens,
+            response_metadata={"done_reason": "stop"},
+            usage_metadata={
+                "input_tokens": 0,
+                "output_tokens": self.tokens,
+                "total_tokens": self.tokens,
+            },
+        )
+
+
+def run(mode: str, args) -> list:
+    """Drive one mode; returns one row per phase"""
+    model = SimulatedOllama(args.speed, args.saturation, args.tokens)
+    limiter = None
+    if mode == "fixed":
+        limiter = AdaptiveLimiter(
+            "sim-fixed", initial_limit=args.saturation, fixed=True
+        )
+    elif mode == "adaptive":
+        limiter = AdaptiveLimiter("sim-adaptive", initial_limit=2)
+
+    stop = threading.Event()
+    calls = []  # (finished_at, latency)
+    calls_lock = threading.Lock()
+
+    def client():
+        while not stop.is_set():
+            start = time.perf_counter()
+            generate(model, [], "summary", limiter)
+            end = time.perf_counter()
+            with calls_lock:
+                calls.append((end, end - start))
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    limits = []
+    phases = [(args.saturation, args.duration), (args.saturation_after, args.duration)]
+    boundaries = []
+    for saturation, duration in phases:
+        model.saturation = saturation
+        phase_start = time.perf_counter()
+        while time.perf_counter() - phase_start < duration:
+            time.sleep(0.25)
+            limits.append(limiter.limit if limiter else float(args.clients))
+        boundaries.append((phase_start, time.perf_counter(), saturation, len(limits)))
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    rows = []
+    previous_index = 0
+    for phase_start, phase_end, saturation, index in boundaries:
+        # Skip the first third of each phase while the limit settles
+        settled = phase_start + (phase_end - phase_start) / 3
+        latencies = [lat for end, lat in calls if settled <= end < phase_end]
+        phase_limits = limits[previous_index + (index - previous_index) // 3 : index]
+        previous_index = index
+        rows.append(
+            {
+                "mode": mode,
+                "saturation": saturation,
+                "throughput": len(latencies) * args.tokens / (phase_end - settled),
+                "latency": statistics.median(latencies) if latencies else 0.0,
+                "limit": statistics.mean(phase_limits),
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Adaptive concurrency benchmark")
+    parser.add_argument("--speed", type=float, default=400.0, help="tokens/s")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens per call")
+    parser.add_argument("--saturation", type=int, default=6)
+    parser.add_argument("--saturation-after", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=24)
+    parser.add_argument("--duration", type=float, default=10.0, help="per phase")
+    args = parser.parse_args()
+
+    unloaded = args.tokens / args.speed
+    print("=" * 72)
+    print(
+        f"Simulated Ollama: {args.speed:.0f} tok/s per request up to "
+        f"{args.saturation} then {args.saturation_after} parallel; "
+        f"{args.clients} clients; unloaded call {unloaded * 1e3:.0f}ms"
+    )
+    print("=" * 72)
+    print(
+        f"{'mode':<10} {'saturation':>10} {'tok/s':>9} {'p50 latency':>12} "
+        f"{'avg limit':>10}"
+    )
+    for mode in ("unlimited", "fixed", "adaptive"):
+        for row in run(mode, args):
+            print(
+                f"{row['mode']:<10} {row['saturation']:>10} "
+                f"{row['throughput']:9.0f} {row['latency'] * 1e3:10.0f}ms "
+                f"{row['limit']:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
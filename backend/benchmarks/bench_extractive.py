@@ -0,0 +1,101 @@
+"""
+Extractive stage quality/latency tradeoff
+
+For a range of extractive ratios, reports on the sample inputs:
+
+- prompt tokens sent to the LLM (estimate) and the shrink factor
+- time spent condensing
+- key-term coverage: share of the document's top TF-IDF terms that
+  survive in the condensed text (a cheap quality proxy)
+- optionally, end-to-end summarizer latency with a real provider
+
+Usage:
+    python benchmarks/bench_extractive.py
+    python benchmarks/bench_extractive.py --method tfidf --repeat 8
+    python benchmarks/bench_extractive.py --provider ollama --model qwen2.5-coder:0.5b
+"""
+
+import argparse
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.extractive import STOPWORDS, condense  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+RATIOS = (1.0, 0.8, 0.6, 0.4, 0.2)
+
+
+def key_terms(text: str, count: int = 20) -> set:
+    """Most frequent content words of a text"""
+    words = [
+        word
+        for word in re.findall(r"[a-z0-9][a-z0-9'-]*", text.lower())
+        if word not in STOPWORDS and len(word) > 2
+    ]
+    return {word for word, _ in Counter(words).most_common(count)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extractive stage benchmark")
+    parser.add_argument("--method", default="textrank", choices=["textrank", "tfidf"])
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Concatenate the samples this many times (near-duplicate sentences "
+        "are dropped by the extractive stage, so repeats inflate the shrink factor)",
+    )
+    parser.add_argument("--provider", default=None, help="Also time the summarizer")
+    parser.add_argument("--model", default="qwen2.5-coder:0.5b")
+    args = parser.parse_args()
+
+    samples = [
+        p.read_text(encoding="utf-8").strip()
+        for p in sorted(DATA_DIR.glob("sample*.txt"))
+    ]
+    document = " ".join(samples * args.repeat)
+    terms = key_terms(document)
+
+    print("=" * 78)
+    print(
+        f"Extractive tradeoff ({args.method}): {len(document)} characters, "
+        f"{len(terms)} key terms"
+    )
+    print("=" * 78)
+    header = (
+        f"{'ratio':>6} {'tokens':>8} {'shrink':>7} {'condense':>10} {'coverage':>9}"
+    )
+    if args.provider:
+        header += f" {'llm':>9}"
+    print(header)
+
+    for ratio in RATIOS:
+        start = time.perf_counter()
+        result = condense(document, ratio=ratio, method=args.method)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        coverage = len(terms & key_terms(result["text"], count=1000)) / len(terms)
+        line = (
+            f"{ratio:6.1f} {result['condensed_tokens']:8d} "
+            f"{result['original_tokens'] / result['condensed_tokens']:6.1f}x "
+            f"{elapsed_ms:8.2f}ms {coverage:8.0%}"
+        )
+        if args.provider:
+            from src.graph.nodes import summarizer
+
+            start = time.perf_counter()
+            summarizer(
+                {"input_text": document, "condensed_text": result["text"]},
+                model_name=args.model,
+                provider=args.provider,
+            )
+            line += f" {time.perf_counter() - start:8.2f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Per-request logging overhead benchmark
+
+Compares the logging cost of one analysis request:
+
+- legacy:     the statements the nodes and workflow used to emit
+              (banners and eagerly formatted f-strings, ~30 INFO lines)
+- structured: the calls the nodes and run_workflow make now (correlation
+              ID, sampled DEBUG details, one summary record)
+
+Both are replayed in isolation into an in-memory stream so the numbers
+are not drowned by graph execution. Log volume is also measured end to
+end by running the real workflow with an instant model stub.
+
+Usage:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --iterations 500 --level WARNING
+"""
+
+import argparse
+import io
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.graph import nodes  # noqa: E402
+from src.graph.workflow import run_workflow  # noqa: E402
+from src.utils.log import (  # noqa: E402
+    RequestContextFilter,
+    record,
+    request_context,
+    timed,
+    verbose,
+)
+
+
+class InstantModel:
+    """Model stub that answers immediately"""
+
+    class Response:
+        def __init__(self, content):
+            self.content = content
+
+    def invoke(self, messages):
+        if "sentiment" in messages[0].content:
+            return self.Response("positive")
+        return self.Response("A short summary of the text. " * 4)
+
+
+def legacy_logging(logger: logging.Logger, text: str, summary: str) -> None:
+    """Replay of the pre-refactor log statements for one request"""
+    word_count = len(text.split())
+    logger.info("=" * 70)
+    logger.info("Running Workflow")
+    logger.info("=" * 70)
+    logger.info(f"Input text length: {len(text)} characters")
+    logger.info("=" * 70)
+    logger.info("Building LangGraph Workflow")
+    logger.info("=" * 70)
+    logger.info(f"Model: {'llama3.2'}")
+    logger.info(f"Checkpointer: {'Disabled'}")
+    logger.info("Initializing StateGraph with TextAnalysisState schema")
+    logger.info("Adding nodes:")
+    logger.info("  - input_processor: Calculates word count from input text")
+    logger.info(f"  - summarizer: Generates summary and sentiment using {'llama3.2'}")
+    logger.info("Defining edges:")
+    logger.info("  START -> input_processor")
+    logger.info("  input_processor -> summarizer")
+    logger.info("  summarizer -> END")
+    logger.info("Compiling graph without checkpointer")
+    logger.info("=" * 70)
+    logger.info("Workflow created successfully!")
+    logger.info("=" * 70)
+    logger.info("No thread_id provided - running without checkpointer")
+    logger.info("Invoking workflow...")
+    logger.info("=" * 60)
+    logger.info("NODE 1: Input Processor - Starting")
+    logger.info("=" * 60)
+    logger.info(f"Input text length: {len(text)} characters")
+    logger.info(f"Word count calculated: {word_count} words")
+    logger.info(f"First 100 characters: {text[:100]}...")
+    logger.info("=" * 60)
+    logger.info("NODE 1: Input Processor - Completed")
+    logger.info("=" * 60)
+    logger.info("=" * 60)
+    logger.info("NODE 2: Summarizer - Starting")
+    logger.info("=" * 60)
+    logger.info(f"Processing text with {word_count} words")
+    logger.info(f"Using model: {'llama3.2'}")
+    logger.info("Initializing LLM model...")
+    logger.info("Generating summary...")
+    logger.info(f"Summary generated: {len(summary)} characters")
+    logger.info(f"Summary preview: {summary[:100]}...")
+    logger.info("Analyzing sentiment...")
+    logger.info(f"Sentiment detected: {'positive'}")
+    logger.info("=" * 60)
+    logger.info("NODE 2: Summarizer - Completed")
+    logger.info("=" * 60)
+    logger.info("=" * 70)
+    logger.info("Workflow completed successfully!")
+    logger.info("=" * 70)
+
+
+def structured_logging(logger: logging.Logger, text: str, summary: str) -> None:
+    """Replay of the logging calls one request makes after the refactor"""
+    word_count = len(text.split())
+    with request_context(thread_id=None):
+        with timed("compile"):
+            logger.debug("Compiled workflow (model=%s, checkpointer=%s)", "x", False)
+        with timed("workflow"):
+            verbose(
+                logger,
+                "input_processor: %d characters, %d words, preview=%.100r",
+                len(text),
+                word_count,
+                text,
+            )
+            record(input_chars=len(text), word_count=word_count)
+            verbose(logger, "summarizer: %d words with model %s", word_count, "x")
+            record(model="llama3.2")
+            with timed("model_init"):
+                pass
+            with timed("summary"):
+                pass
+            verbose(logger, "summary: %d characters, preview=%.100r", 0, summary)
+            record(summary_chars=len(summary))
+            with timed("sentiment"):
+                pass
+            record(sentiment="positive")
+
+
+def configure(level: str) -> io.StringIO:
+    """Route all records to an in-memory stream at the given level"""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.addFilter(RequestContextFilter())
+    handler.setFormatter(
+        logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+        )
+    )
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+    return stream
+
+
+def timed_runs(func, iterations: int, repeats: int = 5) -> float:
+    """Microseconds per call, best of several batches to filter out noise"""
+    func()  # warm-up
+    batch = max(1, iterations // repeats)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        best = min(best, (time.perf_counter() - start) / batch)
+    return best * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--level", default="INFO")
+    args = parser.parse_args()
+
+    nodes.get_model = lambda **kwargs: InstantModel()
+    text = (Path(__file__).resolve().parent.parent / "data" / "sample2.txt").read_text(
+        encoding="utf-8"
+    )
+    large_text = (text + " ") * max(1, 10000 // max(len(text), 1))
+    legacy_logger = logging.getLogger("src.graph.legacy")
+    summary = InstantModel().invoke([type("M", (), {"content": ""})()]).content
+
+    print("=" * 70)
+    print(f"Logging overhead per request (level={args.level}, n={args.iterations})")
+    print("=" * 70)
+
+    for label, sample in (("sample2.txt", text), ("10KB input", large_text)):
+        configure(args.level)
+        legacy = timed_runs(
+            lambda: legacy_logging(legacy_logger, sample, summary), args.iterations
+        )
+        structured = timed_runs(
+            lambda: structured_logging(nodes.logger, sample, summary), args.iterations
+        )
+
+        stream = configure(args.level)
+        legacy_logging(legacy_logger, sample, summary)
+        legacy_bytes = len(stream.getvalue())
+
+        stream = configure(args.level)
+        run_workflow(sample)
+        structured_bytes = len(stream.getvalue())
+
+        print(f"\n{label} ({len(sample)} characters)")
+        print(
+            f"  legacy     : {legacy:8.1f} us/request  {legacy_bytes:6d} bytes/request"
+        )
+        print(
+            f"  structured : {structured:8.1f} us/request"
+            f"  {structured_bytes:6d} bytes/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
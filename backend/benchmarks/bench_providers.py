@@ -0,0 +1,101 @@
+"""
+Head-to-head latency benchmark of model providers
+
+Runs the summarizer node (summary + sentiment calls) over the sample
+inputs in data/ with each provider and reports model setup time and
+per-request latency percentiles.
+
+Usage:
+    python benchmarks/bench_providers.py
+    python benchmarks/bench_providers.py --providers ollama llamacpp \\
+        --model qwen2.5-coder:0.5b --iterations 5
+
+The llamacpp provider needs llama-cpp-python and a GGUF file in
+LLAMACPP_MODEL_DIR; unavailable providers are skipped.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.models import ModelConfig, PROVIDERS  # noqa: E402
+from src.graph import nodes  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def bench_provider(name: str, model_name: str, texts, iterations: int) -> dict:
+    """Time model creation and summarizer calls for one provider"""
+    provider = PROVIDERS[name]
+    config = ModelConfig(model_name=model_name, provider=name)
+
+    start = time.perf_counter()
+    model = provider.create(config, probe=True)
+    setup = time.perf_counter() - start
+
+    # Reuse the created model so setup is not counted per request
+    original_get_model = nodes.get_model
+    nodes.get_model = lambda **kwargs: model
+    latencies = []
+    try:
+        for _ in range(iterations):
+            for text in texts:
+                start = time.perf_counter()
+                nodes.summarizer({"input_text": text, "word_count": len(text.split())})
+                latencies.append(time.perf_counter() - start)
+    finally:
+        nodes.get_model = original_get_model
+
+    return {
+        "setup_s": setup,
+        "mean_s": statistics.mean(latencies),
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "requests": len(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Model provider benchmark")
+    parser.add_argument("--providers", nargs="+", default=list(PROVIDERS.keys()))
+    parser.add_argument("--model", default="qwen2.5-coder:0.5b")
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = [
+        path.read_text(encoding="utf-8").strip()
+        for path in sorted(DATA_DIR.glob("sample*.txt"))
+    ]
+
+    print("=" * 70)
+    print(f"Provider benchmark: model={args.model}, {len(texts)} samples")
+    print("=" * 70)
+    print(f"{'provider':<10} {'setup':>9} {'mean':>9} {'p50':>9} {'p95':>9} {'n':>5}")
+    for name in args.providers:
+        if name not in PROVIDERS or not PROVIDERS[name].is_available():
+            print(f"{name:<10} skipped (not available)")
+            continue
+        try:
+            result = bench_provider(name, args.model, texts, args.iterations)
+        except ValueError as e:
+            print(f"{name:<10} skipped ({e})")
+            continue
+        print(
+            f"{name:<10} {result['setup_s']:8.3f}s {result['mean_s']:8.3f}s "
+            f"{result['p50_s']:8.3f}s {result['p95_s']:8.3f}s {result['requests']:5d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Sentiment strategy accuracy and latency report
+
+Runs every sentiment strategy (llm, lexicon, hybrid) over the labeled
+fixture set in data/sentiment_fixtures.jsonl and reports accuracy,
+mean/p95 latency per item and how often the LLM was consulted.
+
+Usage:
+    python benchmarks/bench_sentiment.py                       # LLM via Ollama
+    python benchmarks/bench_sentiment.py --provider mock
+    SENTIMENT_CONFIDENCE_THRESHOLD=0.6 python benchmarks/bench_sentiment.py
+
+The default ollama provider needs a running Ollama server; the benchmark
+exits early when it is unreachable. Use --provider mock to run offline.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.models import get_model  # noqa: E402
+from src.graph.nodes import decide_sentiment  # noqa: E402
+from src.utils.sentiment import SENTIMENT_STRATEGIES  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent.parent / "data" / "sentiment_fixtures.jsonl"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sentiment strategy benchmark")
+    parser.add_argument("--provider", default=None)
+    parser.add_argument("--model", default="qwen2.5-coder:0.5b")
+    parser.add_argument("--strategies", nargs="+", default=list(SENTIMENT_STRATEGIES))
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = [json.loads(line) for line in f if line.strip()]
+    try:
+        # Lexicon-only runs never call the model
+        model = get_model(
+            args.model,
+            provider=args.provider,
+            task="sentiment",
+            probe=args.strategies != ["lexicon"],
+        )
+    except ConnectionError as e:
+        sys.exit(f"{e}\nStart Ollama or use --provider mock.")
+
+    print("=" * 78)
+    print(f"Sentiment strategies on {len(fixtures)} labeled fixtures")
+    print(f"Label distribution: {dict(Counter(item['label'] for item in fixtures))}")
+    print("=" * 78)
+    print(f"{'strategy':<9} {'accuracy':>9} {'mean':>11} {'p95':>11} {'llm calls':>10}")
+
+    for strategy in args.strategies:
+        correct = 0
+        llm_calls = 0
+        latencies = []
+        for item in fixtures:
+            start = time.perf_counter()
+            label, source, _ = decide_sentiment(
+                model, item["text"], item["text"], strategy
+            )
+            latencies.append(time.perf_counter() - start)
+            correct += label == item["label"]
+            llm_calls += source == "llm"
+
+        latencies.sort()
+        p95 = latencies[max(0, round(0.95 * len(latencies)) - 1)]
+        print(
+            f"{strategy:<9} {correct / len(fixtures):8.0%} "
+            f"{statistics.mean(latencies) * 1e3:9.3f}ms {p95 * 1e3:9.3f}ms "
+            f"{llm_calls / len(fixtures):9.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
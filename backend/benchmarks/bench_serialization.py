@@ -0,0 +1,147 @@
+"""
+Response serialization cost
+
+Compares, for a 10KB input, the previous response path against the
+current one:
+
+- before: plain dict returned from the endpoint, encoded by FastAPI's
+  jsonable_encoder and rendered with the stdlib json module, always
+  echoing input_text
+- after:  payload rendered directly by FastJSONResponse (orjson when
+  installed), with and without echo_input
+
+Also reports the in-memory size of a cached result: the full workflow
+state dict that used to be kept versus the slotted AnalysisResult.
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --chars 2000 --iterations 20000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from src.graph.state import AnalysisResult  # noqa: E402
+from src.utils.serialization import JSON_BACKEND, dumps  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def deep_size(obj) -> int:
+    """Approximate memory of an object and what it references"""
+    seen = set()
+
+    def size(item) -> int:
+        if id(item) in seen:
+            return 0
+        seen.add(id(item))
+        total = sys.getsizeof(item)
+        if isinstance(item, dict):
+            total += sum(size(key) + size(value) for key, value in item.items())
+        elif isinstance(item, (list, tuple)):
+            total += sum(size(value) for value in item)
+        elif hasattr(item, "__slots__"):
+            total += sum(size(getattr(item, name)) for name in item.__slots__)
+        return total
+
+    return size(obj)
+
+
+def best_of(function, iterations: int, repeats: int = 5) -> float:
+    """Best mean seconds per call over several batches"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serialization benchmark")
+    parser.add_argument("--chars", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    samples = " ".join(
+        p.read_text(encoding="utf-8").strip()
+        for p in sorted(DATA_DIR.glob("sample*.txt"))
+    )
+    text = (samples * (args.chars // len(samples) + 1))[: args.chars]
+    state = {
+        "input_text": text,
+        "word_count": len(text.split()),
+        "condensed_text": text[: len(text) // 3],
+        "prompt_stats": {
+            "method": "textrank",
+            "ratio": 0.3,
+            "original_tokens": len(text) // 4,
+            "condensed_tokens": len(text) // 12,
+            "sentences_kept": 12,
+            "sentences_total": 40,
+            "compression": 0.333,
+        },
+        "summary": "A concise summary of the text in two or three sentences. " * 3,
+        "sentiment": "positive",
+        "sentiment_source": "lexicon",
+        "sentiment_confidence": 0.91,
+    }
+    result = AnalysisResult.from_state(state)
+    extra = {
+        "character_count": len(text),
+        "model_used": "qwen2.5-coder:0.5b",
+        "provider_used": "ollama",
+        "cached": False,
+        "success": True,
+    }
+
+    def before():
+        payload = {
+            "input_text": state["input_text"],
+            **{
+                k: v
+                for k, v in state.items()
+                if k not in ("input_text", "condensed_text")
+            },
+            **extra,
+        }
+        return JSONResponse(jsonable_encoder(payload)).body
+
+    def after(echo: bool):
+        def render():
+            payload = {"input_text": text} if echo else {}
+            payload.update(result.to_dict(), **extra)
+            return dumps(payload)
+
+        return render
+
+    print("=" * 78)
+    print(f"Response serialization, {len(text)} character input ({JSON_BACKEND})")
+    print("=" * 78)
+    print(f"{'path':<26} {'time':>10} {'bytes':>8}")
+    rows = [
+        ("before (encoder + json)", before),
+        ("after, echo_input=true", after(True)),
+        ("after, echo_input=false", after(False)),
+    ]
+    for name, function in rows:
+        seconds = best_of(function, args.iterations)
+        print(f"{name:<26} {seconds * 1e6:8.1f}us {len(function()):8d}")
+
+    print()
+    print(
+        f"Cached result: state dict {deep_size(state):,} B -> "
+        f"AnalysisResult {deep_size(result):,} B"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Bytes on the wire for /api/analyze responses
+
+Runs every sample input through the API (mock provider, in-process test
+client) and reports the response body size:
+
+- identity:   uncompressed with the echoed input (previous behaviour)
+- gzip / br:  compressed by CompressionMiddleware (br needs brotli)
+- no echo:    echo_input=false and compressed, as the frontend proxy asks
+- revalidate: the same request repeated with If-None-Match (304)
+
+Usage:
+    python benchmarks/bench_wire.py
+    python benchmarks/bench_wire.py --repeat 4   # larger inputs
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("PRELOAD_WORKFLOW", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+from src.utils.transfer import SUPPORTED_ENCODINGS  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def body_size(response) -> int:
+    """Size of the body as sent (before the client decompresses it)"""
+    return int(response.headers.get("content-length", len(response.content)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Response bytes benchmark")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat each sample")
+    args = parser.parse_args()
+
+    samples = [
+        (path.name, " ".join([path.read_text(encoding="utf-8").strip()] * args.repeat))
+        for path in sorted(DATA_DIR.glob("sample*.txt"))
+    ]
+    columns = ["identity", *SUPPORTED_ENCODINGS, "no echo", "revalidate"]
+    totals = dict.fromkeys(columns, 0)
+
+    print("=" * 78)
+    print(f"Response bytes per sample ({', '.join(SUPPORTED_ENCODINGS)} available)")
+    print("=" * 78)
+    print(f"{'sample':<13} {'input':>7} " + " ".join(f"{c:>10}" for c in columns))
+
+    with TestClient(api.app) as client:
+
+        def analyze(encoding="identity", echo=True, etag=None):
+            headers = {"Accept-Encoding": encoding}
+            if etag:
+                headers["If-None-Match"] = etag
+            return client.post(
+                "/api/analyze",
+                json={"text": text[:10000], "provider": "mock", "echo_input": echo},
+                headers=headers,
+            )
+
+        for name, text in samples:
+            identity = analyze()
+            sizes = {"identity": body_size(identity)}
+            for encoding in SUPPORTED_ENCODINGS:
+                sizes[encoding] = body_size(analyze(encoding))
+            best = SUPPORTED_ENCODINGS[0]
+            sizes["no echo"] = body_size(analyze(best, echo=False))
+            repeat = analyze(
+                best, echo=False, etag=analyze(best, echo=False).headers["etag"]
+            )
+            assert repeat.status_code == 304
+            sizes["revalidate"] = body_size(repeat)
+
+            for column in columns:
+                totals[column] += sizes[column]
+            print(
+                f"{name:<13} {len(text[:10000]):7d} "
+                + " ".join(f"{sizes[c]:10d}" for c in columns)
+            )
+
+    print("-" * 78)
+    print(f"{'total':<13} {'':>7} " + " ".join(f"{totals[c]:10d}" for c in columns))
+    print(
+        f"{'vs identity':<13} {'':>7} "
+        + " ".join(f"{totals[c] / totals['identity']:10.0%}" for c in columns)
+    )
+
+
+if __name__ == "__main__":
+    main()
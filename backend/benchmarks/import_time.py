@@ -0,0 +1,137 @@
+"""
+Import-time report for the backend
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter,
+parses the per-module timings and prints:
+
+- the total cumulative import time of the target module
+- the slowest modules by cumulative time
+- self time grouped by top-level package
+
+The best of several runs is reported to filter out disk-cache noise.
+With --budget-ms the script exits with status 1 when the import is over
+budget, so it can be used as a CI gate.
+
+Usage:
+    python benchmarks/import_time.py                      # api.py (cold start)
+    python benchmarks/import_time.py --module src.graph.workflow
+    python benchmarks/import_time.py --budget-ms 900 --runs 5
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Budgets (ms) for the modules we care about. api must stay cheap because it
+# is imported before the worker can answer /health; the workflow stack is
+# paid once per worker by the lifespan preload.
+DEFAULT_BUDGETS_MS = {
+    "api": 900,
+    "src.utils.helpers": 50,
+    "src.config.models": 50,
+    "src.graph.workflow": 2500,
+}
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Import a module in a fresh interpreter and parse -X importtime output
+
+    Args:
+        module: Dotted module name to import
+
+    Returns:
+        List of (module_name, self_us, cumulative_us, depth) tuples
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            depth = (len(indent) - 1) // 2
+            rows.append((name, int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def total_ms(rows: List[Tuple[str, int, int, int]], module: str) -> float:
+    """Cumulative import time of the target module in milliseconds"""
+    for name, _, cumulative_us, _ in rows:
+        if name == module:
+            return cumulative_us / 1000
+    # The module was already imported by site/startup: sum top-level entries
+    return sum(cum for _, _, cum, depth in rows if depth == 0) / 1000
+
+
+def by_package(rows: List[Tuple[str, int, int, int]]) -> Dict[str, float]:
+    """Self time grouped by top-level package, in milliseconds"""
+    totals: Dict[str, float] = defaultdict(float)
+    for name, self_us, _, _ in rows:
+        totals[name.split(".")[0]] += self_us / 1000
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="api", help="Module to import")
+    parser.add_argument("--runs", type=int, default=3, help="Runs (best is kept)")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="Fail when over this budget (defaults to the per-module budget)",
+    )
+    args = parser.parse_args()
+
+    best_rows: List[Tuple[str, int, int, int]] = []
+    best_total = float("inf")
+    for _ in range(args.runs):
+        rows = measure(args.module)
+        total = total_ms(rows, args.module)
+        if total < best_total:
+            best_rows, best_total = rows, total
+
+    print("=" * 70)
+    print(f"Import time for '{args.module}' (best of {args.runs}): {best_total:.1f} ms")
+    print("=" * 70)
+
+    print(f"\nSlowest modules by cumulative time (top {args.top}):")
+    slowest = sorted(best_rows, key=lambda row: row[2], reverse=True)
+    for name, self_us, cumulative_us, _ in slowest[: args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f})  {name}")
+
+    print(f"\nSelf time by top-level package (top {args.top}):")
+    for package, ms in list(by_package(best_rows).items())[: args.top]:
+        print(f"  {ms:9.1f} ms  {package}")
+
+    budget = args.budget_ms
+    if budget is None:
+        budget = DEFAULT_BUDGETS_MS.get(args.module)
+    if budget is not None:
+        status = "OK" if best_total <= budget else "OVER BUDGET"
+        print(f"\nBudget: {budget:.0f} ms -> {status}")
+        if best_total > budget:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Load generator for the full frontend -> backend -> model server chain
+
+Starts the simulated Ollama (benchmarks/sim_ollama.py), the API pointed
+at it and the Flask frontend pointed at the API, then drives
+/api/analyze on the frontend (or, with ``--target backend``, on the API
+directly) at increasing load levels:
+
+- closed loop (``--mode closed``): each level is a number of users that
+  send a request, wait for the answer (plus ``--think-time``) and send
+  the next one; throughput is bounded by the system, like a fixed pool
+  of clients
+- open loop (``--mode open``): each level is an arrival rate in
+  requests/s with Poisson arrivals that do not wait for earlier answers,
+  like independent users; past capacity the queue and the latency grow
+  without bound, which a closed loop hides
+
+Every request uses a distinct text, so caches do not help. For each
+level the report shows offered load, completed requests/s, errors and
+latency percentiles, i.e. the latency/throughput curve; ``--csv``
+writes the same rows for plotting.
+
+``--bulk-users N`` adds N closed-loop clients that call the API directly
+in the ``--bulk-priority`` class (batch by default) during every level,
+like a bulk import competing with the web UI; the report adds their
+requests/s.
+
+Options not listed in ``--help`` are passed to the simulator (see
+``python benchmarks/sim_ollama.py --help``), e.g. ``--slots 2`` or
+``--gen-rate 25``.
+
+Usage:
+    python benchmarks/load_generator.py
+    python benchmarks/load_generator.py --mode open --levels 0.2 0.5 1 2
+    python benchmarks/load_generator.py --levels 1 4 16 --slots 8 --csv out.csv
+    python benchmarks/load_generator.py --levels 1 --bulk-users 8
+    python benchmarks/load_generator.py --no-spawn --url http://localhost:5000
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from load_test import load_sentences, make_text
+from sim_ollama import parser as sim_parser
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FRONTEND_DIR = BACKEND_DIR.parent / "frontend"
+
+
+def spawn(command, cwd, env, health_url, timeout=60.0) -> subprocess.Popen:
+    """Start a process and wait until its health URL answers"""
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{command[1]} exited with {process.returncode}")
+        try:
+            if httpx.get(health_url, timeout=1).is_success:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{command[1]} did not start")
+
+
+def start_stack(args, sim_args):
+    """Simulator, API and frontend; returns (processes, url to drive, API url)"""
+    sim_port, api_port, web_port = args.port, args.port + 1, args.port + 2
+    processes = [
+        spawn(
+            [sys.executable, "benchmarks/sim_ollama.py", "--port", str(sim_port)]
+            + sim_args,
+            BACKEND_DIR,
+            {},
+            f"http://127.0.0.1:{sim_port}/api/version",
+        )
+    ]
+    processes.append(
+        spawn(
+            [
+                sys.executable,
+                "src/main.py",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(api_port),
+                "--workers",
+                str(args.workers),
+            ],
+            BACKEND_DIR,
+            {
+                "LLM_PROVIDER": "ollama",
+                "OLLAMA_HOST": f"http://127.0.0.1:{sim_port}",
+                "RESULT_CACHE": "off",
+                "HISTORY_STORE": "off",
+                "METRICS_DIR": tempfile.mkdtemp(prefix="load-generator-metrics-"),
+                "LOG_LEVEL": "WARNING",
+                "REQUEST_TIMEOUT": str(args.timeout),
+            },
+            f"http://127.0.0.1:{api_port}/health",
+        )
+    )
+    api_url = f"http://127.0.0.1:{api_port}"
+    if args.target == "backend":
+        return processes, api_url, api_url
+    processes.append(
+        spawn(
+            [sys.executable, "app.py"],
+            FRONTEND_DIR,
+            {
+                "PORT": str(web_port),
+                "API_BASE_URL": f"http://127.0.0.1:{api_port}",
+                "BACKEND_TIMEOUT": str(args.timeout),
+            },
+            f"http://127.0.0.1:{web_port}/health",
+        )
+    )
+    return processes, f"http://127.0.0.1:{web_port}", api_url
+
+
+class Recorder:
+    """Outcome of every request sent during one level"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.sent = 0
+        self.first_sent = None
+        self.last_done = None
+
+    async def send(self, client: httpx.AsyncClient, url: str, payload: dict):
+        self.sent += 1
+        start = time.perf_counter()
+        if self.first_sent is None:
+            self.first_sent = start
+        try:
+            response = await client.post(url, json=payload)
+            # Failed analyses are answered with 200 and sentiment 'error'
+            ok = (
+                response.status_code == 200
+                and response.json().get("sentiment") != "error"
+            )
+        except (httpx.HTTPError, ValueError):
+            ok = False
+        end = time.perf_counter()
+        self.last_done = max(self.last_done or end, end)
+        if ok:
+            self.latencies.append(end - start)
+        else:
+            self.errors += 1
+
+    def row(self, mode: str, level: float) -> dict:
+        latencies = sorted(self.latencies)
+        elapsed = (self.last_done or 0) - (self.first_sent or 0)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+        return {
+            "mode": mode,
+            "level": level,
+            "sent": self.sent,
+            "ok": len(latencies),
+            "errors": self.errors,
+            "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "mean": statistics.mean(latencies) if latencies else 0.0,
+        }
+
+
+async def closed_loop(client, url, payloads, users, duration, think_time):
+    """``users`` clients sending back to back for ``duration`` seconds"""
+    recorder = Recorder()
+    stop = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < stop:
+            await recorder.send(client, url, next(payloads))
+            if think_time:
+                await asyncio.sleep(random.expovariate(1 / think_time))
+
+    await asyncio.gather(*(user() for _ in range(int(users))))
+    return recorder
+
+
+async def open_loop(client, url, payloads, rate, duration, seed):
+    """Poisson arrivals at ``rate`` requests/s for ``duration`` seconds"""
+    recorder = Recorder()
+    rng = random.Random(seed)
+    stop = time.perf_counter() + duration
+    tasks = []
+    while time.perf_counter() < stop:
+        tasks.append(asyncio.create_task(recorder.send(client, url, next(payloads))))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return recorder
+
+
+def payload_stream(args, backend: bool, priority=None, first_seed=0):
+    """Endless distinct request bodies"""
+    sentences = load_sentences()
+    seed = first_seed
+    while True:
+        seed += 1
+        payload = {
+            "text": make_text(sentences, args.words, seed),
+            "model_name": args.model,
+        }
+        if backend:
+            payload["echo_input"] = False
+        if priority:
+            payload["priority"] = priority
+        yield payload
+
+
+async def drive(args, url: str, api_url: str) -> list:
+    """Run every level; returns one report row per level"""
+    payloads = payload_stream(args, args.target == "backend")
+    # Distinct from the measured texts, so neither warms the other's cache
+    bulk_payloads = payload_stream(args, True, args.bulk_priority, 10**6)
+    endpoint = f"{url}/api/analyze"
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+    rows = []
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        # The first request pays for the model load
+        start = time.perf_counter()
+        await client.post(endpoint, json=next(payloads))
+        print(f"cold start: {time.perf_counter() - start:.2f}s")
+        print(
+            f"{'level':>8} {'sent':>6} {'ok':>6} {'err':>5} {'req/s':>7} "
+            f"{'p50':>8} {'p95':>8} {'p99':>8}"
+            + (f" {'bulk/s':>7}" if args.bulk_users else "")
+        )
+        for index, level in enumerate(args.levels):
+            if args.mode == "closed":
+                measured = closed_loop(
+                    client, endpoint, payloads, level, args.duration, args.think_time
+                )
+            else:
+                measured = open_loop(
+                    client, endpoint, payloads, level, args.duration, index
+                )
+            bulk = closed_loop(
+                client,
+                f"{api_url}/api/analyze",
+                bulk_payloads,
+                args.bulk_users,
+                args.duration,
+                0.0,
+            )
+            recorder, bulk_recorder = await asyncio.gather(measured, bulk)
+            row = recorder.row(args.mode, level)
+            bulk_row = bulk_recorder.row("bulk", args.bulk_users)
+            row.update(bulk_ok=bulk_row["ok"], bulk_throughput=bulk_row["throughput"])
+            rows.append(row)
+            print(
+                f"{level:8g} {row['sent']:6d} {row['ok']:6d} {row['errors']:5d} "
+                f"{row['throughput']:7.2f} {row['p50']:7.2f}s {row['p95']:7.2f}s "
+                f"{row['p99']:7.2f}s"
+                + (f" {row['bulk_throughput']:7.2f}" if args.bulk_users else "")
+            )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load generator")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument(
+        "--levels",
+        type=float,
+        nargs="+",
+        default=None,
+        help="users (closed loop) or requests/s (open loop)",
+    )
+    parser.add_argument("--duration", type=float, default=20.0, help="per level")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds")
+    parser.add_argument("--target", choices=["frontend", "backend"], default="frontend")
+    parser.add_argument("--workers", type=int, default=1, help="API workers")
+    parser.add_argument("--words", type=int, default=150, help="words per text")
+    parser.add_argument("--model", default="qwen2.5-coder:0.5b")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--port", type=int, default=11500, help="first of 3 ports")
+    parser.add_argument("--csv", help="write the rows to this file")
+    parser.add_argument(
+        "--no-spawn", action="store_true", help="drive an already running --url"
+    )
+    parser.add_argument("--url", help="frontend or API base URL with --no-spawn")
+    parser.add_argument(
+        "--bulk-users", type=int, default=0, help="bulk clients alongside each level"
+    )
+    parser.add_argument(
+        "--bulk-priority",
+        choices=["interactive", "batch", "background"],
+        default="batch",
+    )
+    parser.add_argument("--api-url", help="API base URL for bulk clients (--no-spawn)")
+    args, sim_args = parser.parse_known_args()
+    sim = sim_parser().parse_args(sim_args)
+    if args.levels is None:
+        args.levels = [1, 2, 4, 8] if args.mode == "closed" else [0.25, 0.5, 1, 2]
+    if args.no_spawn and not args.url:
+        parser.error("--no-spawn needs --url")
+    if (
+        args.no_spawn
+        and args.bulk_users
+        and not (args.api_url or args.target == "backend")
+    ):
+        parser.error("--bulk-users with --no-spawn needs --api-url")
+
+    print("=" * 72)
+    print(
+        f"{args.mode} loop against the {args.target}, {args.duration:g}s per level; "
+        f"simulator: {sim.slots} slots, {sim.gen_rate:g} tok/s, "
+        f"saturation {sim.saturation}"
+    )
+    print("=" * 72)
+
+    processes = []
+    try:
+        if args.no_spawn:
+            url = args.url.rstrip("/")
+            api_url = (args.api_url or url).rstrip("/")
+        else:
+            processes, url, api_url = start_stack(args, sim_args)
+        rows = asyncio.run(drive(args, url, api_url))
+        if not args.no_spawn:
+            stats = httpx.get(f"http://127.0.0.1:{args.port}/sim/stats").json()
+            print(f"simulator: {stats}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"wrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Multi-worker load test
+
+Starts the API with 1, 2, 4... worker processes (``src/main.py
+--workers N``) and drives it with concurrent /api/analyze requests using
+the mock provider, so only the CPU-bound parts are measured: request
+handling, graph execution, extractive condensation and lexicon
+sentiment. Reports throughput, latency and scaling relative to one
+worker.
+
+A second phase (``--duplicates``) sends identical texts concurrently and
+reads /metrics, checking that the shared cache and cross-worker
+coalescing ran each distinct text once and that /metrics aggregates all
+workers.
+
+Usage:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --workers 1 2 4 8 --requests 400
+    python benchmarks/load_test.py --workers 4 --duplicates
+
+Scaling is bounded by the number of CPU cores on the host.
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BACKEND_DIR / "data"
+
+
+def load_sentences():
+    """Sentences of the sample inputs, used to build distinct texts"""
+    text = " ".join(
+        p.read_text(encoding="utf-8").strip()
+        for p in sorted(DATA_DIR.glob("sample*.txt"))
+    )
+    return re.split(r"(?<=[.!?])\s+", text)
+
+
+def make_text(sentences, words: int, seed: int) -> str:
+    """A shuffled text of about ``words`` words, unique per seed"""
+    rng = random.Random(seed)
+    picked = []
+    count = 0
+    while count < words:
+        sentence = rng.choice(sentences)
+        picked.append(sentence)
+        count += len(sentence.split())
+    return f"Report {seed}. " + " ".join(picked)
+
+
+def start_server(workers: int, port: int, cache: str) -> subprocess.Popen:
+    """Start the API and wait until every worker answers"""
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "mock",
+        "RESULT_CACHE": cache,
+        "RESULT_CACHE_PATH": os.path.join(
+            tempfile.mkdtemp(prefix="load-test-"), "cache.sqlite3"
+        ),
+        "METRICS_DIR": tempfile.mkdtemp(prefix="load-test-metrics-"),
+        "LOG_LEVEL": "WARNING",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "src/main.py", "--port", str(port), "--workers", str(workers)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).is_success:
+                # Workers preload the workflow before accepting requests
+                time.sleep(1.0 + 0.5 * workers)
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+
+def run_load(port: int, texts, concurrency: int, extractive_ratio: float):
+    """Send one request per text; returns (elapsed_seconds, latencies)"""
+    url = f"http://127.0.0.1:{port}/api/analyze"
+    latencies = []
+
+    with httpx.Client(
+        timeout=120, limits=httpx.Limits(max_connections=concurrency)
+    ) as client:
+
+        def send(text):
+            start = time.perf_counter()
+            response = client.post(
+                url,
+                json={
+                    "text": text,
+                    "provider": "mock",
+                    "extractive_ratio": extractive_ratio,
+                    "sentiment_strategy": "lexicon",
+                },
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(send, texts))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def cache_outcomes(port: int) -> dict:
+    """result_cache_requests_total by outcome, aggregated over workers"""
+    text = httpx.get(f"http://127.0.0.1:{port}/metrics").text
+    return {
+        outcome: float(value)
+        for outcome, value in re.findall(
+            r'result_cache_requests_total\{outcome="(\w+)"\} (\S+)', text
+        )
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Multi-worker load test")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--words", type=int, default=1500, help="Words per text")
+    parser.add_argument("--extractive-ratio", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Also check cache/coalescing with identical concurrent requests",
+    )
+    args = parser.parse_args()
+
+    sentences = load_sentences()
+    concurrency = args.concurrency or 2 * max(args.workers)
+    texts = [make_text(sentences, args.words, seed) for seed in range(args.requests)]
+    warmup = [make_text(sentences, args.words, -seed) for seed in range(1, 17)]
+
+    print("=" * 78)
+    print(
+        f"Load test: {args.requests} requests x {args.words} words, "
+        f"concurrency {concurrency}, {os.cpu_count()} CPU cores"
+    )
+    print("=" * 78)
+    print(
+        f"{'workers':>7} {'req/s':>8} {'p50':>9} {'p95':>9} {'scaling':>8} {'eff':>5}"
+    )
+
+    baseline = None
+    for workers in args.workers:
+        process = start_server(workers, args.port, cache="off")
+        try:
+            run_load(args.port, warmup, concurrency, args.extractive_ratio)
+            elapsed, latencies = run_load(
+                args.port, texts, concurrency, args.extractive_ratio
+            )
+        finally:
+            process.terminate()
+            process.wait()
+
+        throughput = len(texts) / elapsed
+        baseline = baseline or throughput / workers
+        latencies.sort()
+        scaling = throughput / baseline
+        print(
+            f"{workers:7d} {throughput:8.1f} "
+            f"{statistics.median(latencies) * 1e3:7.1f}ms "
+            f"{latencies[int(0.95 * (len(latencies) - 1))] * 1e3:7.1f}ms "
+            f"{scaling:7.2f}x {scaling / workers:5.0%}"
+        )
+
+    if args.duplicates:
+        workers = max(args.workers)
+        distinct = 8
+        duplicated = [texts[index % distinct] for index in range(args.requests)]
+        random.Random(0).shuffle(duplicated)
+        process = start_server(workers, args.port, cache="sqlite")
+        try:
+            run_load(args.port, duplicated, concurrency, args.extractive_ratio)
+            # Workers publish their metrics once per second
+            time.sleep(1.5)
+            outcomes = cache_outcomes(args.port)
+        finally:
+            process.terminate()
+            process.wait()
+        print()
+        print(
+            f"Duplicates ({workers} workers, {distinct} distinct texts, "
+            f"{args.requests} requests): {outcomes}"
+        )
+        print(
+            f"  workflow runs: {int(outcomes.get('miss', 0))} "
+            f"(expected {distinct}), requests counted: "
+            f"{int(sum(outcomes.values()))} (expected {args.requests})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Simulated Ollama server for load tests
+
+Implements the endpoints ChatOllama and the backend use (``/api/chat``
+with and without streaming, ``/api/tags``, ``/api/show``, ``/api/ps``,
+``/api/version``) with timing that follows a real Ollama server:
+
+- a model is loaded on first use, which takes ``--load-delay`` seconds;
+  at most ``--max-loaded`` models stay loaded, and a model idle for
+  ``--keep-alive`` seconds is unloaded (OLLAMA_MAX_LOADED_MODELS,
+  OLLAMA_KEEP_ALIVE)
+- each model runs ``--slots`` requests at once and queues the rest;
+  beyond ``--max-queue`` waiting requests the server answers 503
+  (OLLAMA_NUM_PARALLEL, OLLAMA_MAX_QUEUE)
+- the prompt is evaluated at ``--prompt-rate`` tokens/s and the answer
+  generated at ``--gen-rate`` tokens/s while at most ``--saturation``
+  requests compute; past that, all running requests share the compute
+  and slow down in proportion, as on a saturated GPU or CPU
+
+``--stall-probability`` of the requests stall for ``--stall-seconds``
+before their first token (a stuck slot or a slow host), the tail that
+hedged requests address.
+
+Answers are filler text of up to ``--tokens`` tokens (capped by the
+request's num_predict). Requests with a JSON schema enum as ``format``
+(the sentiment task) get one of the enum values. ``GET /sim/stats``
+reports queue and load counters.
+
+Usage:
+    python benchmarks/sim_ollama.py --port 11435
+    python benchmarks/sim_ollama.py --slots 2 --gen-rate 25 --load-delay 3
+    OLLAMA_HOST=http://127.0.0.1:11435 python src/main.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+# Compute is handed out in ticks; chunks carry the tokens of one tick
+TICK = 0.02
+CHARS_PER_TOKEN = 4
+WORDS = (
+    "the report describes results across several teams and highlights "
+    "progress risks costs and next steps for the coming quarter while "
+    "noting feedback from customers partners and internal reviews"
+).split()
+
+
+class ModelState:
+    """A model known to the simulator: loaded or not, with its slots"""
+
+    def __init__(self, name: str, slots: int):
+        self.name = name
+        self.slots = asyncio.Semaphore(slots)
+        self.loaded = False
+        self.load_lock = asyncio.Lock()
+        self.running = 0
+        self.last_used = 0.0
+
+
+class Simulator:
+    """Timing model shared by every request"""
+
+    def __init__(self, args):
+        self.prompt_rate = args.prompt_rate
+        self.gen_rate = args.gen_rate
+        self.slots = args.slots
+        self.saturation = args.saturation
+        self.load_delay = args.load_delay
+        self.max_loaded = args.max_loaded
+        self.keep_alive = args.keep_alive
+        self.max_queue = args.max_queue
+        self.tokens = args.tokens
+        self.stall_probability = args.stall_probability
+        self.stall_seconds = args.stall_seconds
+        self.model_names = args.models
+        self.models: Dict[str, ModelState] = {}
+        self.computing = 0
+        self.waiting = 0
+        self.stats = {
+            "requests": 0,
+            "rejected": 0,
+            "cancelled": 0,
+            "stalled": 0,
+            "loads": 0,
+            "unloads": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    def model(self, name: str) -> ModelState:
+        if name not in self.models:
+            self.models[name] = ModelState(name, self.slots)
+        return self.models[name]
+
+    def share(self) -> float:
+        """Fraction of full speed each computing request gets"""
+        return min(1.0, self.saturation / max(1, self.computing))
+
+    async def ensure_loaded(self, model: ModelState) -> float:
+        """Load the model if needed; returns the seconds spent loading"""
+        now = time.monotonic()
+        for other in self.models.values():
+            if (
+                other.loaded
+                and other.running == 0
+                and now - other.last_used > self.keep_alive
+            ):
+                other.loaded = False
+                self.stats["unloads"] += 1
+        if model.loaded:
+            return 0.0
+        async with model.load_lock:
+            if model.loaded:
+                return 0.0
+            start = time.monotonic()
+            # Make room: wait for the least recently used model to go idle
+            while sum(m.loaded for m in self.models.values()) >= self.max_loaded:
+                idle = [m for m in self.models.values() if m.loaded and not m.running]
+                if idle:
+                    victim = min(idle, key=lambda m: m.last_used)
+                    victim.loaded = False
+                    self.stats["unloads"] += 1
+                else:
+                    await asyncio.sleep(TICK)
+            await asyncio.sleep(self.load_delay)
+            model.loaded = True
+            self.stats["loads"] += 1
+            return time.monotonic() - start
+
+    async def compute(self, tokens: float, rate: float) -> float:
+        """Spend the time for ``tokens`` at ``rate`` tokens/s under sharing"""
+        start = time.monotonic()
+        done = 0.0
+        while done < tokens:
+            await asyncio.sleep(TICK)
+            done += rate * self.share() * TICK
+        return time.monotonic() - start
+
+
+def prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough token count of the prompt"""
+    chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return max(1, chars // CHARS_PER_TOKEN)
+
+
+def answer_tokens(body: Dict[str, Any], limit: int) -> List[str]:
+    """The answer as a list of tokens"""
+    messages = body.get("messages", [])
+    seed = hashlib.sha256(json.dumps(messages).encode("utf-8")).digest()
+    output_format = body.get("format")
+    if isinstance(output_format, dict) and "enum" in output_format:
+        choices = output_format["enum"]
+        return [json.dumps(choices[seed[0] % len(choices)])]
+    if output_format == "json":
+        return ["{}"]
+    num_predict = (body.get("options") or {}).get("num_predict")
+    count = min(limit, num_predict) if num_predict and num_predict > 0 else limit
+    return [
+        ("" if index == 0 else " ") + WORDS[(seed[index % 32] + index) % len(WORDS)]
+        for index in range(count)
+    ]
+
+
+def chunk(model: str, content: str, **fields) -> bytes:
+    """One NDJSON line of a chat response"""
+    message = {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": False,
+        **fields,
+    }
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+def build_app(simulator: Simulator) -> Starlette:
+    """Starlette app serving the Ollama API subset"""
+
+    async def chat(request: Request):
+        body = await request.json()
+        name = body.get("model", "")
+        model = simulator.model(name)
+        if simulator.waiting >= simulator.max_queue:
+            simulator.stats["rejected"] += 1
+            return JSONResponse(
+                {"error": "server busy, please try again. maximum pending requests"},
+                status_code=503,
+            )
+        simulator.stats["requests"] += 1
+        tokens = answer_tokens(body, simulator.tokens)
+        n_prompt = prompt_tokens(body.get("messages", []))
+        num_predict = (body.get("options") or {}).get("num_predict")
+
+        async def run() -> AsyncIterator[bytes]:
+            started = time.monotonic()
+            simulator.waiting += 1
+            queued = True
+            acquired = False
+            try:
+                load_seconds = await simulator.ensure_loaded(model)
+                await model.slots.acquire()
+                acquired = True
+                simulator.waiting -= 1
+                queued = False
+                model.running += 1
+                simulator.computing += 1
+
+                if random.random() < simulator.stall_probability:
+                    simulator.stats["stalled"] += 1
+                    await asyncio.sleep(simulator.stall_seconds)
+                prompt_seconds = await simulator.compute(
+                    n_prompt, simulator.prompt_rate
+                )
+                simulator.stats["prompt_tokens"] += n_prompt
+                eval_start = time.monotonic()
+                done = 0.0
+                sent = 0
+                while sent < len(tokens):
+                    await asyncio.sleep(TICK)
+                    done += simulator.gen_rate * simulator.share() * TICK
+                    upto = min(len(tokens), int(done))
+                    if upto > sent:
+                        yield chunk(name, "".join(tokens[sent:upto]))
+                        simulator.stats["output_tokens"] += upto - sent
+                        sent = upto
+                eval_seconds = time.monotonic() - eval_start
+                yield chunk(
+                    name,
+                    "",
+                    done=True,
+                    done_reason="length" if len(tokens) == num_predict else "stop",
+                    total_duration=int((time.monotonic() - started) * 1e9),
+                    load_duration=int(load_seconds * 1e9),
+                    prompt_eval_count=n_prompt,
+                    prompt_eval_duration=int(prompt_seconds * 1e9),
+                    eval_count=len(tokens),
+                    eval_duration=int(eval_seconds * 1e9),
+                )
+            except asyncio.CancelledError:
+                # The client closed the connection (e.g. a cancelled request)
+                simulator.stats["cancelled"] += 1
+                raise
+            finally:
+                if queued:
+                    simulator.waiting -= 1
+                if acquired:
+                    model.running -= 1
+                    simulator.computing -= 1
+                    model.last_used = time.monotonic()
+                    model.slots.release()
+
+        if body.get("stream", True):
+            return StreamingResponse(run(), media_type="application/x-ndjson")
+
+        content = []
+        final: Optional[Dict[str, Any]] = None
+        async for line in run():
+            message = json.loads(line)
+            content.append(message["message"]["content"])
+            final = message
+        final["message"]["content"] = "".join(content)
+        return JSONResponse(final)
+
+    def describe(name: str) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "model": name,
+            "modified_at": "2024-01-01T00:00:00Z",
+            "size": 400_000_000,
+            "digest": hashlib.sha256(name.encode("utf-8")).hexdigest(),
+            "details": {
+                "format": "gguf",
+                "family": "simulated",
+                "parameter_size": "0.5B",
+                "quantization_level": "Q4_K_M",
+            },
+        }
+
+    async def tags(request: Request):
+        return JSONResponse({"models": [describe(n) for n in simulator.model_names]})
+
+    async def show(request: Request):
+        body = await request.json()
+        name = body.get("model") or body.get("name", "")
+        return JSONResponse(
+            {"modelfile": "", "parameters": "", "details": describe(name)["details"]}
+        )
+
+    async def ps(request: Request):
+        loaded = [m.name for m in simulator.models.values() if m.loaded]
+        return JSONResponse({"models": [describe(n) for n in loaded]})
+
+    async def version(request: Request):
+        return JSONResponse({"version": "0.0.0-sim"})
+
+    async def root(request: Request):
+        return PlainTextResponse("Ollama is running")
+
+    async def stats(request: Request):
+        return JSONResponse(
+            {
+                **simulator.stats,
+                "computing": simulator.computing,
+                "waiting": simulator.waiting,
+                "loaded": [m.name for m in simulator.models.values() if m.loaded],
+            }
+        )
+
+    return Starlette(
+        routes=[
+            Route("/", root),
+            Route("/api/chat", chat, methods=["POST"]),
+            Route("/api/tags", tags),
+            Route("/api/show", show, methods=["POST"]),
+            Route("/api/ps", ps),
+            Route("/api/version", version),
+            Route("/sim/stats", stats),
+        ]
+    )
+
+
+def parser() -> argparse.ArgumentParser:
+    """Command line options, shared with the load generator"""
+    parser = argparse.ArgumentParser(description="Simulated Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--prompt-rate", type=float, default=500.0, help="tokens/s")
+    parser.add_argument("--gen-rate", type=float, default=40.0, help="tokens/s")
+    parser.add_argument("--slots", type=int, default=4, help="parallel per model")
+    parser.add_argument(
+        "--saturation", type=int, default=2, help="requests computing at full speed"
+    )
+    parser.add_argument("--load-delay", type=float, default=2.0, help="seconds")
+    parser.add_argument("--max-loaded", type=int, default=1)
+    parser.add_argument("--keep-alive", type=float, default=300.0, help="seconds")
+    parser.add_argument("--max-queue", type=int, default=512)
+    parser.add_argument("--tokens", type=int, default=60, help="answer length")
+    parser.add_argument("--stall-probability", type=float, default=0.0)
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument(
+        "--models", nargs="+", default=["qwen2.5-coder:0.5b", "llama3.2"]
+    )
+    return parser
+
+
+def main() -> None:
+    args = parser().parse_args()
+    print(
+        f"Simulated Ollama on http://{args.host}:{args.port}: "
+        f"{args.slots} slots, {args.gen_rate:.0f} tok/s, "
+        f"saturation {args.saturation}, load {args.load_delay}s"
+    )
+    uvicorn.run(
+        build_app(Simulator(args)),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
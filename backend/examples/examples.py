@@ -11,6 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from src.graph.workflow import create_workflow, run_workflow
 from src.config.models import get_model_from_preset
 from src.utils.helpers import print_result
+from src.utils.log import configure_logging
 
 
 def example_basic_usage():
@@ -163,6 +164,8 @@ def example_direct_node_usage():
 
 
 if __name__ == "__main__":
+    configure_logging()
+
     print("\n" + "=" * 70)
     print("LangGraph Workflow Examples")
     print("=" * 70)
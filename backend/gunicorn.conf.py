@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for the multi-worker deployment
+
+Run with: gunicorn api:app -c gunicorn.conf.py
+
+Gunicorn manages uvicorn workers (restarts, graceful reloads with HUP).
+As with ``python src/main.py --workers N``, the workers share the SQLite
+result cache and aggregate metrics through METRICS_DIR.
+"""
+
+import os
+import tempfile
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+# uvicorn_worker.UvicornWorker with the uvicorn-worker package
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+# LLM calls can take a while on CPU-only hosts
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+os.environ.setdefault("RESULT_CACHE", "sqlite")
+os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "text-analysis-metrics")
+)
+
+
+def on_starting(server):
+    """Clear metric snapshots left by a previous run"""
+    from src.utils.metrics import reset_metrics_dir
+
+    reset_metrics_dir(os.environ["METRICS_DIR"])
@@ -3,21 +3,29 @@ Main entry point for the LangGraph Text Analysis Workflow
 
 This script demonstrates how to use the workflow with various
 input texts and configuration options.
+
+Usage:
+    python main.py             # analyze data/sample2.txt
+    python main.py --profile   # ... under the sampling profiler
 """
 
 import sys
+from contextlib import nullcontext
 from pathlib import Path
-import textwrap
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
+from src.config.models import get_provider
+from src.graph.state import AnalysisResult
 from src.graph.workflow import run_workflow, stream_workflow
 from src.utils.helpers import (
     validate_input,
     print_result,
-    format_result,
 )
+from src.utils.history import get_history_store, record_analysis
+from src.utils.log import configure_logging
+from src.utils.profiling import profile_scope
 
 
 def load_sample_inputs():
@@ -35,6 +43,9 @@ def load_sample_inputs():
 
 
 if __name__ == "__main__":
+    configure_logging()
+    profile = "--profile" in sys.argv[1:]
+
     # Config for file name
     config_file_name = "sample2.txt"
     
@@ -57,33 +68,29 @@ if __name__ == "__main__":
     # Run workflow
     try:
         print(f"\n🚀 Running workflow with model: qwen2.5-coder:0.5b\n")
-        result = run_workflow(
-            input_text=input_text, model_name="qwen2.5-coder:0.5b", thread_id="demo"
-        )
+        with profile_scope("cli") if profile else nullcontext() as profiled:
+            result = run_workflow(
+                input_text=input_text, model_name="qwen2.5-coder:0.5b", thread_id="demo"
+            )
+        if profiled:
+            print(f"\n🔥 Profile ({profiled.duration:.1f}s): {profiled.path}")
+            print("   Open it in https://www.speedscope.app")
         
         # Display results
         print_result(result)
         
-        # Append to results.txt at the top
-        results_file = Path(__file__).parent / "results.txt"
-        new_entry = (
-            "######################\n"
-            "[Our Input]\n"
-            f"{textwrap.fill(input_text, width=80)}\n"
-            "--------\n"
-            "[OUTPUT]\n"
-            f"{format_result(result)}\n\n"
+        # Keep the analysis in the history store (see /api/history)
+        store = get_history_store()
+        record_analysis(
+            input_text,
+            AnalysisResult.from_state(result).to_dict(),
+            "qwen2.5-coder:0.5b",
+            get_provider().name,
+            source="cli",
         )
-        
-        # Read existing content
-        existing_content = ""
-        if results_file.exists():
-            with open(results_file, "r", encoding="utf-8") as f:
-                existing_content = f.read()
-        
-        # Write new entry + existing content
-        with open(results_file, "w", encoding="utf-8") as f:
-            f.write(new_entry + existing_content)
+        store.flush()
+        if store.name != "off":
+            print(f"\n🗂️  Saved to analysis history: {store.path}")
         
         print("\n✅ Workflow completed successfully!\n")
         
@@ -2,6 +2,20 @@
 Configuration package for model setup and parameters
 """
 
-from .models import get_model, ModelConfig
+from .models import (
+    get_model,
+    get_provider,
+    configure_for_task,
+    GenerationProfile,
+    ModelConfig,
+    ModelProvider,
+)
 
-__all__ = ["get_model", "ModelConfig"]
+__all__ = [
+    "get_model",
+    "get_provider",
+    "configure_for_task",
+    "GenerationProfile",
+    "ModelConfig",
+    "ModelProvider",
+]
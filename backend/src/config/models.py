@@ -2,14 +2,32 @@
 Model configuration and initialization
 
 This module provides a centralized way to configure and initialize
-Ollama models with different parameters.
+models with different parameters. Models are created by a provider:
+
+- ollama:   ChatOllama talking to an Ollama server over HTTP (default)
+- mock:     deterministic canned responses, no server needed
+- llamacpp: in-process GGUF inference through llama-cpp-python, no
+            network hop (optional dependency)
+
+The provider is chosen per call (``get_model(..., provider="mock")``) and
+defaults to the LLM_PROVIDER environment variable.
+
+Each task also has a generation profile (output token cap, stop
+sequences, optional constrained output format) so short answers such as
+a sentiment label stop after a handful of tokens instead of rambling.
 """
 
 # pylint: disable=import-error
 
+import copy
+import glob
 import os
-from typing import Optional
-from langchain_ollama import ChatOllama
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    from langchain_ollama import ChatOllama
 
 
 class MockChatOllama:
@@ -32,6 +50,63 @@ class MockChatOllama:
             return type("Response", (), {"content": "Mock response"})()
 
 
+class GenerationProfile:
+    """Per-task generation limits applied on top of a ModelConfig"""
+
+    def __init__(
+        self,
+        num_predict: Optional[int] = None,
+        stop: Optional[List[str]] = None,
+        output_format: Optional[Union[str, Dict[str, Any]]] = None,
+        temperature: Optional[float] = None,
+    ):
+        """
+        Initialize a generation profile
+
+        Args:
+            num_predict: Maximum number of tokens to generate (None for no cap)
+            stop: Sequences that end generation early
+            output_format: Constrained output, either 'json' or a JSON schema
+                (Ollama structured outputs, llama.cpp grammar)
+            temperature: Temperature override for the task
+        """
+        self.num_predict = num_predict
+        self.stop = stop
+        self.output_format = output_format
+        self.temperature = temperature
+
+    def to_dict(self) -> dict:
+        """Convert profile to dictionary"""
+        return {
+            "num_predict": self.num_predict,
+            "stop": self.stop,
+            "output_format": self.output_format,
+            "temperature": self.temperature,
+        }
+
+
+# The sentiment answer is constrained to one JSON string from this enum
+SENTIMENT_SCHEMA = {
+    "type": "string",
+    "enum": ["positive", "negative", "neutral", "mixed"],
+}
+
+GENERATION_PROFILES: Dict[str, GenerationProfile] = {
+    "default": GenerationProfile(),
+    # 2-3 sentences; stop if the model starts echoing the prompt template
+    "summary": GenerationProfile(num_predict=200, stop=["\n\nText", "\n\nSummary:"]),
+    # Digest paragraphs combine several summaries
+    "digest": GenerationProfile(num_predict=320, stop=["\n\nSummaries"]),
+    # '"positive"' is 3-4 tokens for common tokenizers
+    "sentiment": GenerationProfile(
+        num_predict=8,
+        stop=["\n"],
+        output_format=SENTIMENT_SCHEMA,
+        temperature=0.0,
+    ),
+}
+
+
 class ModelConfig:
     """Configuration class for Ollama models"""
 
@@ -43,6 +118,11 @@ class ModelConfig:
         num_ctx: int = 2048,
         top_p: float = 0.9,
         top_k: int = 40,
+        provider: Optional[str] = None,
+        num_predict: Optional[int] = None,
+        stop: Optional[List[str]] = None,
+        output_format: Optional[Union[str, Dict[str, Any]]] = None,
+        profiles: Optional[Dict[str, GenerationProfile]] = None,
     ):
         """
         Initialize model configuration
@@ -54,7 +134,13 @@ class ModelConfig:
             num_ctx: Context window size
             top_p: Nucleus sampling parameter
             top_k: Top-k sampling parameter
+            provider: Provider name (defaults to LLM_PROVIDER env var or ollama)
+            num_predict: Maximum number of tokens to generate
+            stop: Sequences that end generation early
+            output_format: Constrained output ('json' or a JSON schema)
+            profiles: Per-task GenerationProfile overrides of GENERATION_PROFILES
         """
+        self.provider = provider or os.getenv("LLM_PROVIDER", "ollama")
         self.model_name = model_name
         self.temperature = temperature
         # Use OLLAMA_HOST from Railway environment, fallback to localhost for dev
@@ -64,6 +150,31 @@ class ModelConfig:
         self.num_ctx = num_ctx
         self.top_p = top_p
         self.top_k = top_k
+        self.num_predict = num_predict
+        self.stop = stop
+        self.output_format = output_format
+        self.profiles = {**GENERATION_PROFILES, **(profiles or {})}
+
+    def get_profile(self, task: str) -> GenerationProfile:
+        """Generation profile for a task ('default' for unknown tasks)"""
+        return self.profiles.get(task, self.profiles["default"])
+
+    def for_task(self, task: str) -> "ModelConfig":
+        """
+        Copy of this configuration with a task's generation profile applied
+
+        Example:
+            >>> ModelConfig().for_task("sentiment").num_predict
+            8
+        """
+        profile = self.get_profile(task)
+        config = copy.copy(self)
+        config.num_predict = profile.num_predict
+        config.stop = profile.stop
+        config.output_format = profile.output_format
+        if profile.temperature is not None:
+            config.temperature = profile.temperature
+        return config
 
     def to_dict(self) -> dict:
         """Convert config to dictionary"""
@@ -74,51 +185,450 @@ class ModelConfig:
             "num_ctx": self.num_ctx,
             "top_p": self.top_p,
             "top_k": self.top_k,
+            "provider": self.provider,
+            "num_predict": self.num_predict,
+            "stop": self.stop,
+            "output_format": self.output_format,
         }
 
 
+class ModelProvider:
+    """
+    Base class for LLM backends
+
+    A provider turns a ModelConfig into a chat model object exposing
+    ``invoke(messages)`` that returns a message with a ``content`` string.
+    """
+
+    name = "base"
+    supports_replicas = False
+
+    def is_available(self) -> bool:
+        """Whether the provider can be used in this environment"""
+        return True
+
+    def create(self, config: ModelConfig, probe: bool = False):
+        """
+        Create a chat model for the given configuration
+
+        Args:
+            config: Model configuration
+            probe: Verify the backend responds before returning the model
+                (raises ConnectionError when it does not)
+
+        Returns:
+            Chat model instance
+        """
+        raise NotImplementedError
+
+    def configure(self, model, config: ModelConfig):
+        """
+        Return a model applying the generation settings of ``config``
+
+        Used to derive per-task models (see ModelConfig.for_task) from an
+        already created and probed model without creating a new client.
+        Providers without generation controls return the model unchanged.
+        """
+        return model
+
+    def replicate(self, model, base_url: str):
+        """
+        Return the same model (settings included) served by another replica
+
+        Only called for providers with ``supports_replicas`` set.
+        """
+        raise NotImplementedError
+
+
+class OllamaProvider(ModelProvider):
+    """ChatOllama over HTTP"""
+
+    name = "ollama"
+    supports_replicas = True
+
+    def create(self, config: ModelConfig, probe: bool = False):
+        # Imported here: langchain_ollama adds ~0.4s on top of langchain_core
+        # and is not needed by callers that only read ModelConfig or presets
+        from langchain_ollama import ChatOllama
+
+        model = ChatOllama(
+            model=config.model_name,
+            temperature=config.temperature,
+            base_url=config.base_url,
+            num_ctx=config.num_ctx,
+            num_predict=config.num_predict,
+            stop=config.stop,
+            # Empty string for regular text generation, 'json' or a JSON schema
+            format=config.output_format or "",
+        )
+        if probe:
+            # Fails loudly: silently answering with canned text would pass
+            # fake summaries off as real ones
+            try:
+                model.invoke([{"role": "user", "content": "test"}])
+            except Exception as e:
+                raise ConnectionError(
+                    f"Ollama is not reachable at {config.base_url}: {e}"
+                ) from e
+        return model
+
+    def replicate(self, model, base_url: str):
+        from langchain_ollama import ChatOllama
+
+        # A copy would keep the HTTP clients bound to the original host
+        settings = {name: getattr(model, name) for name in model.model_fields_set}
+        settings["base_url"] = base_url
+        return ChatOllama(**settings)
+
+    def configure(self, model, config: ModelConfig):
+        return model.model_copy(
+            update={
+                "temperature": config.temperature,
+                "num_predict": config.num_predict,
+                "stop": config.stop,
+                "format": config.output_format or "",
+            }
+        )
+
+
+class MockProvider(ModelProvider):
+    """Deterministic canned responses for tests and benchmarks"""
+
+    name = "mock"
+
+    def create(self, config: ModelConfig, probe: bool = False):
+        return MockChatOllama()
+
+
+class LlamaCppChatModel:
+    """
+    Minimal chat model running a GGUF file in-process with llama-cpp-python
+
+    A llama.cpp context is not thread-safe, so calls on the same loaded
+    model are serialized.
+    """
+
+    def __init__(self, llm, lock: threading.Lock, config: ModelConfig):
+        self.llm = llm
+        self.lock = lock
+        self.config = config
+
+    @staticmethod
+    def _to_dicts(messages) -> List[Dict[str, str]]:
+        roles = {"human": "user", "ai": "assistant", "system": "system"}
+        converted = []
+        for message in messages:
+            if isinstance(message, dict):
+                converted.append(message)
+            else:
+                role = roles.get(message.type, "user")
+                converted.append({"role": role, "content": message.content})
+        return converted
+
+    def _options(self) -> Dict[str, Any]:
+        options = {
+            "temperature": self.config.temperature,
+            "top_p": self.config.top_p,
+            "top_k": self.config.top_k,
+        }
+        if self.config.num_predict is not None:
+            options["max_tokens"] = self.config.num_predict
+        if self.config.stop:
+            options["stop"] = self.config.stop
+        if isinstance(self.config.output_format, dict):
+            options["response_format"] = {
+                "type": "json_object",
+                "schema": self.config.output_format,
+            }
+        elif self.config.output_format == "json":
+            options["response_format"] = {"type": "json_object"}
+        return options
+
+    def invoke(self, messages):
+        from langchain_core.messages import AIMessage
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        with self.lock:
+            completion = self.llm.create_chat_completion(
+                messages=self._to_dicts(messages), **self._options()
+            )
+        usage = completion.get("usage") or {}
+        choice = completion["choices"][0]
+        return AIMessage(
+            content=choice["message"]["content"] or "",
+            response_metadata={"done_reason": choice.get("finish_reason")},
+            usage_metadata={
+                "input_tokens": usage.get("prompt_tokens", 0),
+                "output_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+        )
+
+    def stream(self, messages):
+        """
+        Yield the answer token by token
+
+        Closing the generator early stops the generation and releases the
+        model for the next caller.
+        """
+        from langchain_core.messages import AIMessageChunk
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        with self.lock:
+            chunks = self.llm.create_chat_completion(
+                messages=self._to_dicts(messages), stream=True, **self._options()
+            )
+            try:
+                for chunk in chunks:
+                    choice = chunk["choices"][0]
+                    finish = choice.get("finish_reason")
+                    yield AIMessageChunk(
+                        content=choice["delta"].get("content") or "",
+                        response_metadata={"done_reason": finish} if finish else {},
+                    )
+            finally:
+                chunks.close()
+
+
+class LlamaCppProvider(ModelProvider):
+    """
+    In-process CPU inference from GGUF files
+
+    Model names are resolved to files as follows:
+    - a name ending in ``.gguf`` is used as a path
+    - otherwise ``LLAMACPP_MODEL_DIR`` is searched for ``<name>*.gguf`` with
+      ``:`` replaced by ``-`` (``qwen2.5-coder:0.5b`` ->
+      ``qwen2.5-coder-0.5b-instruct-q4_k_m.gguf``)
+
+    Loaded models are cached per file, since loading takes seconds.
+    """
+
+    name = "llamacpp"
+
+    def __init__(self):
+        self._models: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        try:
+            import llama_cpp  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def resolve_path(model_name: str) -> str:
+        """Find the GGUF file for a model name"""
+        if model_name.endswith(".gguf"):
+            return model_name
+        model_dir = os.getenv("LLAMACPP_MODEL_DIR", "models")
+        pattern = model_name.replace(":", "-") + "*.gguf"
+        matches = sorted(glob.glob(os.path.join(model_dir, pattern)))
+        if not matches:
+            raise ValueError(
+                f"No GGUF file matching {pattern} in {model_dir} "
+                "(set LLAMACPP_MODEL_DIR)"
+            )
+        return matches[0]
+
+    def create(self, config: ModelConfig, probe: bool = False):
+        try:
+            from llama_cpp import Llama
+        except ImportError as e:
+            raise ValueError(
+                "The llamacpp provider requires llama-cpp-python "
+                "(pip install llama-cpp-python)"
+            ) from e
+
+        path = self.resolve_path(config.model_name)
+        key = (path, config.num_ctx)
+        with self._lock:
+            if key not in self._models:
+                llm = Llama(
+                    model_path=path,
+                    n_ctx=config.num_ctx,
+                    n_threads=int(os.getenv("LLAMACPP_THREADS", "0")) or None,
+                    verbose=False,
+                )
+                self._models[key] = (llm, threading.Lock())
+            llm, lock = self._models[key]
+        return LlamaCppChatModel(llm, lock, config)
+
+    def configure(self, model, config: ModelConfig):
+        if not isinstance(model, LlamaCppChatModel):
+            return model
+        return LlamaCppChatModel(model.llm, model.lock, config)
+
+
+PROVIDERS: Dict[str, ModelProvider] = {
+    provider.name: provider
+    for provider in (OllamaProvider(), MockProvider(), LlamaCppProvider())
+}
+
+
+def register_provider(provider: ModelProvider) -> None:
+    """
+    Register (or replace) a provider under its name
+
+    Example:
+        >>> register_provider(MyVllmProvider())
+    """
+    PROVIDERS[provider.name] = provider
+
+
+def get_provider(name: Optional[str] = None) -> ModelProvider:
+    """
+    Look up a provider by name
+
+    Args:
+        name: Provider name (defaults to LLM_PROVIDER env var or ollama)
+
+    Returns:
+        The registered provider
+    """
+    name = name or os.getenv("LLM_PROVIDER", "ollama")
+    if name not in PROVIDERS:
+        raise ValueError(
+            f"Unknown provider: {name}. Available providers: {list(PROVIDERS.keys())}"
+        )
+    return PROVIDERS[name]
+
+
+def list_providers() -> List[str]:
+    """Names of providers usable in this environment"""
+    return [name for name, provider in PROVIDERS.items() if provider.is_available()]
+
+
 def get_model(
-    model_name: Optional[str] = None, temperature: float = 0.7, **kwargs
-) -> ChatOllama:
+    model_name: Optional[str] = None,
+    temperature: float = 0.7,
+    provider: Optional[str] = None,
+    task: Optional[str] = None,
+    probe: bool = False,
+    **kwargs,
+) -> "ChatOllama":
     """
-    Get a configured ChatOllama instance
+    Get a configured chat model instance
 
     This is the main function to get a model instance. It supports
-    passing a model name and configuration parameters.
+    passing a model name, a provider and configuration parameters.
 
     Args:
-        model_name: Name of the Ollama model (defaults to env var or llama3.2)
+        model_name: Name of the model (defaults to env var or llama3.2)
         temperature: Sampling temperature
+        provider: Provider name ('ollama', 'mock', 'llamacpp')
+        task: Apply this task's generation profile ('summary', 'sentiment')
+        probe: Send a test prompt first and raise ConnectionError if the
+            backend does not answer. Off by default: request paths rely on
+            the circuit breaker around generate() instead of paying for a
+            probe on every call
         **kwargs: Additional parameters for ModelConfig
 
     Returns:
-        Configured ChatOllama instance
+        Configured chat model instance
 
     Example:
         >>> model = get_model("llama3.2", temperature=0.5)
+        >>> model = get_model("qwen2.5-coder:0.5b", provider="llamacpp")
+        >>> model = get_model("llama3.2", task="sentiment")
         >>> model = get_model()  # Uses default configuration
     """
     if model_name is None:
         model_name = os.getenv("DEFAULT_MODEL", "llama3.2")
 
-    config = ModelConfig(model_name=model_name, temperature=temperature, **kwargs)
+    config = ModelConfig(
+        model_name=model_name, temperature=temperature, provider=provider, **kwargs
+    )
+    if task:
+        config = config.for_task(task)
+    return get_provider(config.provider).create(config, probe=probe)
 
-    # Try to use Ollama, but fall back to mock if not available
-    try:
-        model = ChatOllama(
-            model=config.model_name,
-            temperature=config.temperature,
-            base_url=config.base_url,
-            num_ctx=config.num_ctx,
-            # Additional Ollama-specific parameters
-            format="",  # Empty string for regular text generation
+
+def configure_for_task(model, config: ModelConfig, task: str):
+    """
+    Derive a model for a task from an existing model
+
+    Applies the task's generation profile without creating (or probing)
+    a new backend connection, so one model can serve several tasks.
+
+    Args:
+        model: Model returned by get_model
+        config: Configuration the model was created with
+        task: Task name ('summary', 'sentiment')
+
+    Returns:
+        Chat model applying the task's num_predict, stop and output format
+
+    Example:
+        >>> config = ModelConfig("llama3.2")
+        >>> model = get_provider(config.provider).create(config, probe=True)
+        >>> sentiment_model = configure_for_task(model, config, "sentiment")
+    """
+    config = config.for_task(task)
+    return get_provider(config.provider).configure(model, config)
+
+
+def get_replicas() -> List[str]:
+    """Base URLs of the Ollama replicas (OLLAMA_REPLICAS, comma separated)"""
+    return [
+        url.strip().rstrip("/")
+        for url in os.getenv("OLLAMA_REPLICAS", "").split(",")
+        if url.strip()
+    ]
+
+
+_replica_models: "OrderedDict[tuple, Any]" = OrderedDict()
+_replica_models_lock = threading.Lock()
+REPLICA_MODEL_CACHE_SIZE = 64
+
+
+def replica_models(model, provider: Optional[str] = None) -> List[Callable[[], Any]]:
+    """
+    Factories for a model on every other replica (see get_replicas)
+
+    Creating a client takes ~80ms, so replicas are created on first use
+    (when a call is actually hedged) and cached per replica and settings.
+
+    Args:
+        model: Model on the primary replica, carrying its task's settings
+        provider: Provider name (defaults to LLM_PROVIDER or ollama)
+
+    Returns:
+        One factory per replica other than the model's own; empty when the
+        provider has no replicas
+    """
+    backend = get_provider(provider)
+    if not backend.supports_replicas:
+        return []
+    own_url = (getattr(model, "base_url", None) or "").rstrip("/")
+    settings = repr(
+        sorted(
+            (name, getattr(model, name))
+            for name in getattr(model, "model_fields_set", ())
+            if name != "base_url"
         )
-        # Test if Ollama is running by trying a simple invoke
-        model.invoke([{"role": "user", "content": "test"}])
-        return model
-    except Exception as e:
-        print(f"Ollama not available, using mock model. Error: {str(e)}")
-        return MockChatOllama()
+    )
+
+    def factory(url: str) -> Callable[[], Any]:
+        def create():
+            key = (backend.name, url, settings)
+            with _replica_models_lock:
+                replica = _replica_models.get(key)
+                if replica is not None:
+                    _replica_models.move_to_end(key)
+                    return replica
+            replica = backend.replicate(model, url)
+            with _replica_models_lock:
+                _replica_models[key] = replica
+                while len(_replica_models) > REPLICA_MODEL_CACHE_SIZE:
+                    _replica_models.popitem(last=False)
+            return replica
+
+        return create
+
+    return [factory(url) for url in get_replicas() if url != own_url]
 
 
 # Predefined model configurations for different use cases
@@ -127,6 +637,7 @@ MODEL_PRESETS = {
         model_name="llama3.2",
         temperature=0.9,
         top_p=0.95,
+        profiles={"summary": GenerationProfile(num_predict=320)},
     ),
     "balanced": ModelConfig(
         model_name="llama3.2",
@@ -142,22 +653,32 @@ MODEL_PRESETS = {
         model_name="llama3.2",
         temperature=0.0,
         top_p=1.0,
+        profiles={
+            "summary": GenerationProfile(
+                num_predict=160, stop=["\n\n"], temperature=0.0
+            )
+        },
     ),
 }
 
 
-def get_model_from_preset(preset_name: str = "balanced") -> ChatOllama:
+def preset_config(
+    preset_name: str,
+    model_name: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> ModelConfig:
     """
-    Get a model using a predefined preset configuration
+    Configuration of a preset, optionally for another model or provider
 
-    Args:
-        preset_name: Name of the preset ('creative', 'balanced', 'precise', 'deterministic')
+    The preset's sampling settings and per-task generation profiles are
+    kept.
 
-    Returns:
-        Configured ChatOllama instance
+    Raises:
+        ValueError: If the preset is unknown
 
     Example:
-        >>> model = get_model_from_preset("creative")
+        >>> preset_config("creative", "llama3.2:1b").get_profile("summary").num_predict
+        320
     """
     if preset_name not in MODEL_PRESETS:
         raise ValueError(
@@ -165,11 +686,39 @@ def get_model_from_preset(preset_name: str = "balanced") -> ChatOllama:
             f"Available presets: {list(MODEL_PRESETS.keys())}"
         )
 
-    config = MODEL_PRESETS[preset_name]
-    return ChatOllama(
-        model=config.model_name,
-        temperature=config.temperature,
-        base_url=config.base_url,
-        num_ctx=config.num_ctx,
-        format="",
-    )
+    config = copy.copy(MODEL_PRESETS[preset_name])
+    if model_name:
+        config.model_name = model_name
+    if provider:
+        config.provider = provider
+    return config
+
+
+def get_model_from_preset(
+    preset_name: str = "balanced",
+    provider: Optional[str] = None,
+    task: Optional[str] = None,
+    model_name: Optional[str] = None,
+) -> "ChatOllama":
+    """
+    Get a model using a predefined preset configuration
+
+    Args:
+        preset_name: Name of the preset ('creative', 'balanced', 'precise', 'deterministic')
+        provider: Provider name (defaults to the preset's provider)
+        task: Apply this task's generation profile, including the preset's
+            own overrides (see configure_for_task)
+        model_name: Model to use instead of the preset's
+
+    Returns:
+        Configured chat model instance
+
+    Example:
+        >>> model = get_model_from_preset("creative")
+        >>> summary_model = get_model_from_preset("creative", task="summary")
+    """
+    config = preset_config(preset_name, model_name, provider)
+    model = get_provider(config.provider).create(config)
+    if task:
+        model = configure_for_task(model, config, task)
+    return model
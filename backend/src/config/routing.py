@@ -0,0 +1,318 @@
+"""
+Cost-aware model routing for model_name="auto"
+
+Each routable model has a declared capability profile: its size (the
+cost of a call), a quality tier, the longest input it summarizes well
+and its expected prompt and generation speeds. ``route()`` picks the
+smallest model that is adequate for the request:
+
+- its quality tier is at least the requested one ('basic', 'standard',
+  'high')
+- the input, in estimated tokens, is no longer than its
+  ``max_input_tokens``
+- its estimated latency fits the latency budget (ROUTER_LATENCY_BUDGET
+  seconds, capped by the request's own timeout)
+
+The latency estimate starts from the declared speeds and follows the
+measured ones: every model call reports its duration and token counts
+(``observe_call``, from generate()), and the ratio of measured to
+declared time is tracked as a moving average per model. Time spent
+loading the model into memory is not counted, and the average decays
+back towards the declared speed while a model goes unused, so a model
+skipped for being slow is tried again later. A model that is slower
+than declared (busy host) is skipped for the next larger one while the
+budget would be missed.
+
+When no adequate model fits the budget, the fastest adequate one is
+used; when no model is adequate (a very long input), the one with the
+longest ``max_input_tokens`` is. ROUTER_MODELS restricts routing to the
+models installed on the server.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.metrics import counter
+
+AUTO = "auto"
+
+# Quality tiers, lowest first
+QUALITY_TIERS = {"basic": 1, "standard": 2, "high": 3}
+DEFAULT_QUALITY = "basic"
+
+# Prompt template tokens of one call, and the calls of one analysis
+# (summary and sentiment, both reading the input)
+PROMPT_OVERHEAD_TOKENS = 60
+CALLS_PER_ANALYSIS = 2
+# Typical output of an analysis: a 2-3 sentence summary and a label
+EXPECTED_OUTPUT_TOKENS = 120
+
+# Weight of the newest sample in the slowdown moving average
+SLOWDOWN_ALPHA = 0.2
+# Seconds for a model's slowdown to move halfway back to 1.0 without calls
+SLOWDOWN_HALF_LIFE = 120.0
+# Bounds on a single sample's slowdown
+MIN_SLOWDOWN, MAX_SLOWDOWN = 0.2, 20.0
+
+ROUTES = counter(
+    "model_routes_total",
+    "Requests routed by model_name=auto, by chosen model, requested quality "
+    "tier and reason (smallest_adequate, fastest_adequate, longest_input)",
+    ["model", "quality", "reason"],
+)
+
+
+@dataclass(slots=True)
+class ModelProfile:
+    """
+    Declared capabilities of a routable model
+
+    Speeds are for the reference host (a 4-core CPU running Ollama); the
+    measured slowdown corrects them for the actual one.
+    """
+
+    name: str
+    params_b: float
+    quality: int
+    max_input_tokens: int
+    prefill_tps: float
+    decode_tps: float
+    overhead_seconds: float = 0.2
+
+    def declared_seconds(self, input_tokens: int, output_tokens: int) -> float:
+        """Expected time of a call on the reference host"""
+        return (
+            self.overhead_seconds
+            + input_tokens / self.prefill_tps
+            + output_tokens / self.decode_tps
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow dictionary of the fields"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+MODEL_PROFILES: Dict[str, ModelProfile] = {
+    profile.name: profile
+    for profile in (
+        ModelProfile("qwen2.5-coder:0.5b", 0.5, 1, 400, 450.0, 45.0),
+        ModelProfile("llama3.2:1b", 1.2, 2, 1000, 250.0, 25.0),
+        ModelProfile("llama3.2", 3.2, 3, 1800, 90.0, 11.0),
+        ModelProfile("llama3.2:3b", 3.2, 3, 1800, 90.0, 11.0),
+        ModelProfile("mistral", 7.2, 3, 1800, 40.0, 5.0),
+    )
+}
+
+
+def register_model_profile(profile: ModelProfile) -> None:
+    """
+    Declare (or replace) the profile of a routable model
+
+    Example:
+        >>> register_model_profile(ModelProfile("phi3:mini", 3.8, 3, 1800, 70, 9))
+    """
+    MODEL_PROFILES[profile.name] = profile
+
+
+def routable_models() -> List[ModelProfile]:
+    """Profiles of the models routing may choose (ROUTER_MODELS, else all)"""
+    names = [
+        name.strip()
+        for name in os.getenv("ROUTER_MODELS", "").split(",")
+        if name.strip()
+    ]
+    if not names:
+        return list(MODEL_PROFILES.values())
+    return [MODEL_PROFILES[name] for name in names if name in MODEL_PROFILES]
+
+
+class LatencyTracker:
+    """
+    Moving average of measured over declared call time, per model
+
+    The average starts from the declared speed (1.0) and decays back to
+    it with half_life seconds, since a model that routing skips for being
+    slow reports no new calls that could bring it back.
+    """
+
+    def __init__(
+        self, alpha: float = SLOWDOWN_ALPHA, half_life: float = SLOWDOWN_HALF_LIFE
+    ):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._slowdown: Dict[str, Tuple[float, float]] = {}
+        self._samples: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _current(self, name: str, now: float) -> float:
+        if name not in self._slowdown:
+            return 1.0
+        value, updated = self._slowdown[name]
+        return 1.0 + (value - 1.0) * 0.5 ** ((now - updated) / self.half_life)
+
+    def observe(
+        self,
+        profile: ModelProfile,
+        seconds: float,
+        input_tokens: int,
+        output_tokens: int,
+    ) -> None:
+        ratio = seconds / profile.declared_seconds(input_tokens, output_tokens)
+        ratio = min(MAX_SLOWDOWN, max(MIN_SLOWDOWN, ratio))
+        now = time.monotonic()
+        with self._lock:
+            current = self._current(profile.name, now)
+            self._slowdown[profile.name] = (
+                current + self.alpha * (ratio - current),
+                now,
+            )
+            self._samples[profile.name] = self._samples.get(profile.name, 0) + 1
+
+    def slowdown(self, name: str) -> float:
+        """Measured/declared time ratio (1.0 before the first call)"""
+        with self._lock:
+            return self._current(name, time.monotonic())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "slowdown": round(self._current(name, now), 3),
+                    "samples": self._samples[name],
+                }
+                for name in self._slowdown
+            }
+
+
+LATENCY = LatencyTracker()
+
+
+def observe_call(
+    model_name: Optional[str],
+    seconds: float,
+    usage: Dict[str, Any],
+    metadata: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Record a finished model call
+
+    Calls of models without a profile, or whose backend does not report
+    token counts (the mock), are ignored. Ollama's load_duration (in
+    nanoseconds, from the response metadata) is not counted: a cold load
+    says nothing about the model's speed once loaded.
+    """
+    profile = MODEL_PROFILES.get(model_name or "")
+    if profile is None or "input_tokens" not in usage:
+        return
+    load_duration = (metadata or {}).get("load_duration") or 0
+    seconds = max(0.0, seconds - load_duration / 1e9)
+    LATENCY.observe(
+        profile, seconds, usage["input_tokens"], usage.get("output_tokens", 0)
+    )
+
+
+def estimate_seconds(profile: ModelProfile, input_tokens: int) -> float:
+    """Expected duration of an analysis of input_tokens on this server"""
+    calls = CALLS_PER_ANALYSIS * profile.declared_seconds(
+        input_tokens + PROMPT_OVERHEAD_TOKENS, 0
+    )
+    declared = calls + EXPECTED_OUTPUT_TOKENS / profile.decode_tps
+    return declared * LATENCY.slowdown(profile.name)
+
+
+def cascade_models() -> List[str]:
+    """
+    Models of the cascade, smallest first (CASCADE_MODELS, comma-separated)
+
+    Defaults to the smallest model of each quality tier.
+    """
+    names = [
+        name.strip()
+        for name in os.getenv(
+            "CASCADE_MODELS", "qwen2.5-coder:0.5b,llama3.2:1b,llama3.2"
+        ).split(",")
+        if name.strip()
+    ]
+    if not names:
+        raise ValueError("CASCADE_MODELS names no model")
+    return names
+
+
+def latency_budget(timeout: Optional[float] = None) -> float:
+    """ROUTER_LATENCY_BUDGET seconds (default 30), capped by a request timeout"""
+    budget = float(os.getenv("ROUTER_LATENCY_BUDGET", "30"))
+    return budget if timeout is None else min(budget, timeout)
+
+
+def route(
+    text: str, quality: Optional[str] = None, timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Choose the model for an analysis of text
+
+    Args:
+        text: Text to analyze
+        quality: Minimum quality tier (defaults to 'basic')
+        timeout: Seconds the request may take (caps the latency budget)
+
+    Returns:
+        The decision: model, reason, quality, input_tokens,
+        estimated_seconds and budget_seconds
+
+    Raises:
+        ValueError: If the quality tier is unknown or no model is routable
+
+    Example:
+        >>> route("Short note about lunch.")["model"]
+        'qwen2.5-coder:0.5b'
+    """
+    # Imported here: extractive.py pulls in numpy
+    from ..utils.extractive import estimate_tokens
+
+    quality = quality or DEFAULT_QUALITY
+    if quality not in QUALITY_TIERS:
+        raise ValueError(
+            f"Unknown quality tier '{quality}' (expected one of "
+            f"{', '.join(QUALITY_TIERS)})"
+        )
+    models = [
+        profile
+        for profile in routable_models()
+        if profile.quality >= QUALITY_TIERS[quality]
+    ]
+    if not models:
+        raise ValueError(f"No routable model offers quality '{quality}'")
+
+    input_tokens = estimate_tokens(text)
+    budget = latency_budget(timeout)
+    estimates = {
+        profile.name: estimate_seconds(profile, input_tokens) for profile in models
+    }
+    adequate = sorted(
+        (profile for profile in models if input_tokens <= profile.max_input_tokens),
+        key=lambda profile: profile.params_b,
+    )
+    within_budget = [p for p in adequate if estimates[p.name] <= budget]
+    if within_budget:
+        chosen, reason = within_budget[0], "smallest_adequate"
+    elif adequate:
+        chosen = min(adequate, key=lambda profile: estimates[profile.name])
+        reason = "fastest_adequate"
+    else:
+        chosen = max(
+            models, key=lambda profile: (profile.max_input_tokens, -profile.params_b)
+        )
+        reason = "longest_input"
+    ROUTES.inc(model=chosen.name, quality=quality, reason=reason)
+    return {
+        "model": chosen.name,
+        "reason": reason,
+        "quality": quality,
+        "input_tokens": input_tokens,
+        "estimated_seconds": round(estimates[chosen.name], 2),
+        "budget_seconds": budget,
+    }
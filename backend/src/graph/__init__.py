@@ -2,7 +2,23 @@
 Graph package containing state, nodes, and workflow definitions
 """
 
-from .state import TextAnalysisState
-from .workflow import create_workflow
+from .state import AnalysisResult, DigestState, TextAnalysisState
 
-__all__ = ["TextAnalysisState", "create_workflow"]
+__all__ = [
+    "AnalysisResult",
+    "DigestState",
+    "TextAnalysisState",
+    "create_workflow",
+    "create_digest_workflow",
+]
+
+
+def __getattr__(name):
+    # Importing the workflow pulls in langgraph and langchain (~1.5s), so it
+    # is deferred until someone actually asks for it. Lightweight users such
+    # as src.utils.helpers only need the state schema.
+    if name in ("create_workflow", "create_digest_workflow"):
+        from . import workflow
+
+        return getattr(workflow, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
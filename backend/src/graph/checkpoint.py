@@ -0,0 +1,156 @@
+"""
+Checkpointer that keeps large state values out of checkpoints
+
+LangGraph's MemorySaver serializes every channel value a step writes,
+and keeps the pending writes of each step as well. A thread analyzing a
+10KB text therefore holds the input several times per run: in the
+``__start__`` input, in the ``input_text`` channel and in the step's
+writes, plus the condensed text the same way.
+
+``BlobSerializer`` wraps the checkpointer's serializer. Strings of at
+least ``min_size`` characters, top-level or inside dicts and lists, are
+put in a content-addressed ``BlobStore`` (src/utils/blobs.py) and the
+checkpoint keeps a reference, so every copy of a text across steps,
+runs and threads shares one compressed blob. Values without large
+strings are serialized exactly as before.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from ..utils.blobs import BlobStore
+
+BLOB_TYPE = "blob"
+# Prefix of the type of values holding blob references
+BLOB_REFS_PREFIX = "blobrefs+"
+_REF_KEY = "__blob__"
+# Recently offloaded strings whose key need not be hashed again
+KEY_CACHE_SIZE = 64
+
+
+class BlobSerializer:
+    """
+    Serializer moving large strings into a blob store
+
+    Args:
+        store: Where the strings go
+        inner: Serializer for everything else (JsonPlusSerializer)
+        min_size: Strings with at least this many characters are offloaded
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        inner: Optional[Any] = None,
+        min_size: int = 1024,
+    ):
+        self.store = store
+        self.inner = inner or JsonPlusSerializer()
+        self.min_size = min_size
+        self._keys: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+        self._keys_lock = threading.Lock()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if isinstance(obj, str):
+            if len(obj) >= self.min_size:
+                return BLOB_TYPE, self._put(obj).encode("ascii")
+            return self.inner.dumps_typed(obj)
+        if isinstance(obj, (dict, list, tuple)) and self._has_large(obj):
+            type_, data = self.inner.dumps_typed(self._offload(obj))
+            return BLOB_REFS_PREFIX + type_, data
+        return self.inner.dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_ == BLOB_TYPE:
+            return self.store.get(payload.decode("ascii")).decode("utf-8")
+        if type_.startswith(BLOB_REFS_PREFIX):
+            obj = self.inner.loads_typed((type_[len(BLOB_REFS_PREFIX) :], payload))
+            return self._restore(obj)
+        return self.inner.loads_typed(data)
+
+    def _put(self, text: str) -> str:
+        """
+        Store a string; returns its key
+
+        The same string object is usually written several times per step
+        (channel value, input, pending write), so the key of recently
+        stored objects is remembered instead of hashing them again.
+        """
+        with self._keys_lock:
+            cached = self._keys.get(id(text))
+            if cached is not None and cached[0] is text:
+                self._keys.move_to_end(id(text))
+                return cached[1]
+        key = self.store.put(text.encode("utf-8"))
+        with self._keys_lock:
+            # Holding the string keeps its id from being reused
+            self._keys[id(text)] = (text, key)
+            if len(self._keys) > KEY_CACHE_SIZE:
+                self._keys.popitem(last=False)
+        return key
+
+    def _has_large(self, obj: Any) -> bool:
+        """Whether obj holds a string to offload, without copying anything"""
+        # Iterative: this runs on every checkpoint and pending write
+        stack = [obj]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                if len(item) >= self.min_size:
+                    return True
+            elif isinstance(item, dict):
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple)):
+                stack.extend(item)
+        return False
+
+    def _offload(self, obj: Any) -> Any:
+        """Copy of obj with large strings replaced by references"""
+        if isinstance(obj, str):
+            if len(obj) >= self.min_size:
+                return {_REF_KEY: self._put(obj)}
+            return obj
+        if isinstance(obj, dict):
+            return {key: self._offload(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(self._offload(value) for value in obj)
+        return obj
+
+    def _restore(self, obj: Any) -> Any:
+        """Resolve the references _offload left"""
+        if isinstance(obj, dict):
+            if len(obj) == 1 and _REF_KEY in obj:
+                return self.store.get(obj[_REF_KEY]).decode("utf-8")
+            return {key: self._restore(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(self._restore(value) for value in obj)
+        return obj
+
+
+def create_checkpointer() -> MemorySaver:
+    """
+    In-memory checkpointer, storing large values as blobs unless disabled
+
+    Configured with CHECKPOINT_BLOBS (on/off), CHECKPOINT_BLOB_MIN_SIZE
+    (characters, default 1024), CHECKPOINT_COMPRESSION (zstd, zlib or
+    off; zstd when zstandard is installed), CHECKPOINT_BLOB_MEMORY (bytes
+    kept in memory, default 64MB) and CHECKPOINT_BLOB_DIR (spill
+    directory; unset keeps every blob in memory).
+    """
+    if os.getenv("CHECKPOINT_BLOBS", "on").lower() in ("off", "false", "0"):
+        return MemorySaver()
+    store = BlobStore(
+        compression=os.getenv("CHECKPOINT_COMPRESSION") or None,
+        max_memory=int(os.getenv("CHECKPOINT_BLOB_MEMORY", str(64 * 1024 * 1024))),
+        spill_dir=os.getenv("CHECKPOINT_BLOB_DIR") or None,
+    )
+    serde = BlobSerializer(
+        store, min_size=int(os.getenv("CHECKPOINT_BLOB_MIN_SIZE", "1024"))
+    )
+    return MemorySaver(serde=serde)
@@ -4,21 +4,278 @@ Node implementations for the LangGraph workflow
 This module contains the node functions that perform the actual
 processing in the workflow. Each node receives the current state
 and returns updates to it.
+
+Nodes check the request deadline (src/utils/deadline.py) before
+expensive steps, and LLM calls go through generate() so an abandoned
+request stops its in-flight generation. generate() also holds a slot of
+the model's adaptive concurrency limit (src/utils/concurrency.py).
 """
 
+import json
 import logging
-from typing import Dict, Any
-from langchain_core.messages import SystemMessage, HumanMessage
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
 
-from .state import TextAnalysisState
-from ..config.models import get_model
+from .state import AnalysisResult, DigestState, TextAnalysisState
+from ..config.models import (
+    MODEL_PRESETS,
+    ModelConfig,
+    configure_for_task,
+    get_model,
+    get_provider,
+    preset_config,
+    replica_models,
+)
+from ..config.routing import MODEL_PROFILES, estimate_seconds, observe_call
+from ..utils.breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_breaker,
+    is_backend_failure,
+)
+from ..utils.cache import cache_key, get_or_compute
+from ..utils.concurrency import AdaptiveLimiter, get_limiter
+from ..utils.deadline import check_deadline, current_deadline
+from ..utils.extractive import condense, estimate_tokens
+from ..utils.hedging import hedged, hedging_enabled
+from ..utils.history import record_analysis
+from ..utils.log import record, timed, verbose
+from ..utils.metrics import counter, histogram
+from ..utils.quality import check_quality
+from ..utils.topics import cluster_documents
+from ..utils.tracing import span
+from ..utils.sentiment import (
+    SENTIMENT_LABELS,
+    SENTIMENT_STRATEGIES,
+    classify_sentiment,
+    get_confidence_threshold,
+)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+EXTRACTIVE_TOKENS = counter(
+    "extractive_tokens_total",
+    "Estimated prompt tokens before (stage=input) and after (stage=output) "
+    "extractive condensation",
+    ["stage"],
+)
+EXTRACTIVE_COMPRESSION = histogram(
+    "extractive_compression_ratio",
+    "Condensed prompt tokens divided by original prompt tokens",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+SENTIMENT_DECISIONS = counter(
+    "sentiment_decisions_total",
+    "Sentiment labels by strategy and by who decided (lexicon or llm)",
+    ["strategy", "source"],
+)
+LLM_OUTPUT_TOKENS = histogram(
+    "llm_output_tokens",
+    "Tokens generated per LLM call by task",
+    ["task"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024),
+)
+LLM_GENERATIONS = counter(
+    "llm_generations_total",
+    "LLM calls by task and finish reason (stop, length, cancelled or unknown)",
+    ["task", "finish"],
 )
+
+DEGRADED_RESULTS = counter(
+    "degraded_results_total",
+    "Analyses produced without the LLM because the backend was unavailable",
+    ["reason"],
+)
+CASCADE_RUNS = counter(
+    "cascade_runs_total",
+    "Cascade analyses by the model whose answer was used and outcome "
+    "(accepted, exhausted or degraded)",
+    ["model", "outcome"],
+)
+CASCADE_ESCALATIONS = counter(
+    "cascade_escalations_total",
+    "Answers of a cascade model that failed a quality gate and were "
+    "escalated to the next model",
+    ["model"],
+)
+CASCADE_GATE_FAILURES = counter(
+    "cascade_gate_failures_total",
+    "Quality gate failures of cascade answers by model and gate",
+    ["model", "gate"],
+)
+CASCADE_SECONDS = counter(
+    "cascade_seconds_total",
+    "Time of cascade analyses (kind=actual) and the estimated time of the "
+    "largest cascade model on the same inputs (kind=largest_model)",
+    ["kind"],
+)
+
+# Shorter generations are not used as speed samples for the limiter
+MIN_SPEED_SAMPLE_TOKENS = 8
+# Token budget of the extractive summary used in degraded mode
+DEGRADED_SUMMARY_TOKENS = 80
+
 logger = logging.getLogger(__name__)
 
+# Receives (task, text) for every generated chunk, see listen_tokens
+_token_listener: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar(
+    "token_listener", default=None
+)
+
+
+@contextmanager
+def listen_tokens(listener: Callable[[str, str], None]) -> Iterator[None]:
+    """
+    Pass the text of every model generation in the block to listener
+
+    Generations are streamed while a listener is set, so it receives
+    (task, chunk) as the model produces them; models without streaming
+    (the mock) report their whole answer as one chunk. The listener runs
+    on the node's thread.
+
+    Example:
+        >>> with listen_tokens(lambda task, text: print(task, text)):
+        ...     workflow.invoke({"input_text": text})
+    """
+    token = _token_listener.set(listener)
+    try:
+        yield
+    finally:
+        _token_listener.reset(token)
+
+
+def observe_generation(task: str, response) -> None:
+    """
+    Record output token count and finish reason of an LLM response
+
+    Backends that do not report usage (the mock) count as finish=unknown.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    metadata = getattr(response, "response_metadata", None) or {}
+    finish = metadata.get("done_reason") or "unknown"
+    LLM_GENERATIONS.inc(task=task, finish=finish)
+    if "output_tokens" in usage:
+        LLM_OUTPUT_TOKENS.observe(usage["output_tokens"], task=task)
+        record(**{f"{task}_output_tokens": usage["output_tokens"]})
+    if finish == "length":
+        verbose(logger, "%s generation hit its num_predict cap", task)
+
+
+def generate(
+    model,
+    messages,
+    task: str,
+    limiter: Optional[AdaptiveLimiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+):
+    """
+    Invoke a chat model, aborting the generation if the request is cancelled
+
+    Under an active deadline the response is streamed and the deadline is
+    checked after every chunk. Leaving the stream early closes the
+    connection, so the server stops generating instead of finishing an
+    answer nobody will read. Models without streaming (the mock) are
+    invoked normally, with a check before the call.
+
+    With a limiter the call waits for a concurrency slot and reports its
+    generation speed, which the limiter adapts the model's limit to. With
+    a breaker the call is rejected at once while the backend is known to
+    be down, and its outcome feeds the breaker.
+
+    The call, including the wait for a slot, is traced as a 'chat' span
+    carrying the token counts.
+
+    Args:
+        model: Chat model (carrying the task's generation profile)
+        messages: Messages to send
+        task: Generation profile name, for metrics
+        limiter: The model's concurrency limiter (see get_limiter)
+        breaker: The backend's circuit breaker (see get_breaker)
+
+    Returns:
+        The model's response message
+
+    Raises:
+        RequestCancelled: If the deadline expires or the request is
+            cancelled while waiting or before the generation completes
+        CircuitOpenError: If the backend's breaker is open
+    """
+    # Hedged models wrap the primary replica's model
+    model_name = getattr(getattr(model, "primary", model), "model", None)
+    with span(f"chat {task}") as call_span:
+        call_span.set_attribute("gen_ai.operation.name", "chat")
+        call_span.set_attribute("gen_ai.request.model", model_name)
+        call_span.set_attribute("llm.task", task)
+        with breaker.call() if breaker is not None else nullcontext():
+            with limiter.acquire() if limiter is not None else nullcontext() as call:
+                start = time.perf_counter()
+                response = _generate(model, messages, task)
+                usage = getattr(response, "usage_metadata", None) or {}
+                metadata = getattr(response, "response_metadata", None) or {}
+                # Feeds the latency estimates of model_name=auto routing
+                observe_call(model_name, time.perf_counter() - start, usage, metadata)
+                if call is not None:
+                    amount = usage.get("output_tokens") or len(response.content)
+                    # Answers of a few tokens mostly measure prompt processing
+                    if amount >= MIN_SPEED_SAMPLE_TOKENS:
+                        call.observe(amount)
+        call_span.set_attribute("gen_ai.usage.input_tokens", usage.get("input_tokens"))
+        call_span.set_attribute(
+            "gen_ai.usage.output_tokens", usage.get("output_tokens")
+        )
+        call_span.set_attribute(
+            "gen_ai.response.finish_reason", metadata.get("done_reason")
+        )
+    observe_generation(task, response)
+    return response
+
+
+def _generate(model, messages, task: str):
+    """Invoke or stream one generation under the current deadline"""
+    deadline = current_deadline()
+    listener = _token_listener.get()
+    if (deadline is None and listener is None) or not hasattr(model, "stream"):
+        check_deadline(task)
+        response = model.invoke(messages)
+        if listener is not None and response.content:
+            listener(task, response.content)
+        return response
+
+    check_deadline(task)
+    response = None
+    stream = model.stream(messages)
+    try:
+        for chunk in stream:
+            response = chunk if response is None else response + chunk
+            if listener is not None and chunk.content:
+                listener(task, chunk.content)
+            if deadline is not None and deadline.reason is not None:
+                LLM_GENERATIONS.inc(task=task, finish="cancelled")
+                deadline.check(task)
+    finally:
+        stream.close()
+    return response if response is not None else AIMessage(content="")
+
+
+def parse_sentiment(content: str) -> str:
+    """
+    Normalize an LLM sentiment answer to a bare label
+
+    Accepts the JSON string produced under the sentiment output schema
+    ('"positive"') as well as free text ('Positive.', 'mixed - the ...').
+    """
+    answer = content.strip()
+    try:
+        decoded = json.loads(answer)
+    except ValueError:
+        decoded = None
+    if isinstance(decoded, str):
+        answer = decoded
+    words = answer.lower().split()
+    return words[0].strip("\"'.,!:;") if words else ""
+
 
 def input_processor(state: TextAnalysisState) -> Dict[str, Any]:
     """
@@ -33,10 +290,6 @@ def input_processor(state: TextAnalysisState) -> Dict[str, Any]:
     Returns:
         Dictionary with word_count update
     """
-    logger.info("=" * 60)
-    logger.info("NODE 1: Input Processor - Starting")
-    logger.info("=" * 60)
-
     input_text = state.get("input_text", "")
 
     if not input_text:
@@ -47,55 +300,250 @@ def input_processor(state: TextAnalysisState) -> Dict[str, Any]:
     words = input_text.split()
     word_count = len(words)
 
-    logger.info(f"Input text length: {len(input_text)} characters")
-    logger.info(f"Word count calculated: {word_count} words")
-    logger.info(f"First 100 characters: {input_text[:100]}...")
-
-    logger.info("=" * 60)
-    logger.info("NODE 1: Input Processor - Completed")
-    logger.info("=" * 60)
+    verbose(
+        logger,
+        "input_processor: %d characters, %d words, preview=%.100r",
+        len(input_text),
+        word_count,
+        input_text,
+    )
+    record(input_chars=len(input_text), word_count=word_count)
 
     return {"word_count": word_count}
 
 
+def extractive_condenser(
+    state: TextAnalysisState,
+    ratio: float = 0.5,
+    max_tokens: Optional[int] = None,
+    method: str = "textrank",
+) -> Dict[str, Any]:
+    """
+    Optional node: Condense the input before it reaches the LLM
+
+    Keeps the most central sentences (TF-IDF/TextRank scoring) up to a
+    token budget so the summary and sentiment prompts are shorter.
+
+    Args:
+        state: Current state containing input_text
+        ratio: Fraction of the original tokens to keep (quality/latency knob)
+        max_tokens: Optional absolute token budget
+        method: Sentence scoring method ('textrank' or 'tfidf')
+
+    Returns:
+        Dictionary with condensed_text and prompt_stats updates
+    """
+    input_text = state.get("input_text", "")
+    if not input_text:
+        return {"condensed_text": "", "prompt_stats": {}}
+
+    check_deadline("extractive")
+    with timed("extractive"):
+        result = condense(input_text, ratio=ratio, max_tokens=max_tokens, method=method)
+    condensed_text = result.pop("text")
+
+    EXTRACTIVE_TOKENS.inc(result["original_tokens"], stage="input")
+    EXTRACTIVE_TOKENS.inc(result["condensed_tokens"], stage="output")
+    EXTRACTIVE_COMPRESSION.observe(result["compression"])
+    record(
+        prompt_tokens_before=result["original_tokens"],
+        prompt_tokens_after=result["condensed_tokens"],
+    )
+    verbose(
+        logger,
+        "extractive: kept %d/%d sentences, %d -> %d tokens",
+        result["sentences_kept"],
+        result["sentences_total"],
+        result["original_tokens"],
+        result["condensed_tokens"],
+    )
+
+    return {"condensed_text": condensed_text, "prompt_stats": result}
+
+
+def llm_sentiment(
+    model,
+    text: str,
+    limiter: Optional[AdaptiveLimiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+) -> str:
+    """
+    Ask the LLM for a one-word sentiment label
+
+    The model should carry the 'sentiment' generation profile (see
+    configure_for_task) so the answer is capped at a few tokens.
+
+    Args:
+        model: Chat model to invoke
+        text: Text to classify
+        limiter: The model's concurrency limiter
+        breaker: The backend's circuit breaker
+
+    Returns:
+        One of SENTIMENT_LABELS ('neutral' when the answer is invalid)
+    """
+    sentiment_prompt = f"""Analyze the sentiment of the following text. 
+Respond with ONLY ONE WORD from these options: positive, negative, neutral, or mixed.
+
+Text:
+{text}
+
+Sentiment:"""
+
+    sentiment_messages = [
+        SystemMessage(
+            content="You are a sentiment analysis assistant. Respond with only one word: positive, negative, neutral, or mixed."
+        ),
+        HumanMessage(content=sentiment_prompt),
+    ]
+
+    sentiment_response = generate(
+        model, sentiment_messages, "sentiment", limiter, breaker
+    )
+    sentiment = parse_sentiment(sentiment_response.content)
+
+    # Validate sentiment response
+    if sentiment not in SENTIMENT_LABELS:
+        logger.warning("Invalid sentiment %.50r, defaulting to 'neutral'", sentiment)
+        sentiment = "neutral"
+    return sentiment
+
+
+def decide_sentiment(
+    model,
+    text: str,
+    llm_text: str,
+    strategy: str = "llm",
+    limiter: Optional[AdaptiveLimiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Tuple[str, str, Optional[float]]:
+    """
+    Label sentiment according to a strategy
+
+    Args:
+        model: Chat model used when the LLM decides
+        text: Full original text (read by the lexicon)
+        llm_text: Text sent to the LLM (may be the extractive condensation)
+        strategy: 'llm', 'lexicon' or 'hybrid'
+        limiter: The model's concurrency limiter
+        breaker: The backend's circuit breaker
+
+    Returns:
+        Tuple of (sentiment, source, lexicon_confidence) where source is
+        'lexicon' or 'llm'
+    """
+    confidence = None
+    if strategy in ("lexicon", "hybrid"):
+        # The lexicon is cheap enough to read the full original text
+        with timed("lexicon"):
+            label, confidence = classify_sentiment(text)
+        escalate = strategy == "hybrid" and (
+            label == "mixed" or confidence < get_confidence_threshold()
+        )
+        if not escalate:
+            return label, "lexicon", confidence
+
+    with timed("sentiment"):
+        return llm_sentiment(model, llm_text, limiter, breaker), "llm", confidence
+
+
 def summarizer(
-    state: TextAnalysisState, model_name: str = "llama3.2"
+    state: TextAnalysisState,
+    model_name: str = "llama3.2",
+    provider: Optional[str] = None,
+    sentiment_strategy: str = "llm",
+    chat_model=None,
+    preset: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Second node: Generate summary and sentiment analysis
 
     This node reads the input_text and word_count from state,
     then uses an LLM to generate both a summary and sentiment
-    analysis, returning both as state updates.
+    analysis, returning both as state updates. When the extractive
+    stage ran, its condensed_text is sent to the LLM instead.
+
+    Sentiment follows the strategy: 'llm' always asks the model,
+    'lexicon' uses the local classifier, and 'hybrid' uses the classifier
+    but escalates 'mixed' and low-confidence results to the model.
+
+    When the model backend is down (breaker open or a backend error) and
+    DEGRADED_MODE=extractive, the result is built without the LLM (see
+    degraded_analysis) and flagged in 'degraded'. Otherwise an open
+    breaker raises CircuitOpenError so the caller can fail fast.
 
     Args:
         state: Current state containing input_text and word_count
         model_name: Name of the Ollama model to use
+        provider: Model provider name (defaults to LLM_PROVIDER or ollama)
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        chat_model: Model to use instead of creating one with get_model
+            (a session's model, reused across its runs)
+        preset: MODEL_PRESETS entry whose sampling settings and per-task
+            generation profiles replace the defaults
 
     Returns:
         Dictionary with summary and sentiment updates
     """
-    logger.info("=" * 60)
-    logger.info("NODE 2: Summarizer - Starting")
-    logger.info("=" * 60)
-
     input_text = state.get("input_text", "")
     word_count = state.get("word_count", 0)
 
-    logger.info(f"Processing text with {word_count} words")
-    logger.info(f"Using model: {model_name}")
+    verbose(logger, "summarizer: %d words with model %s", word_count, model_name)
+    record(model=model_name, provider=provider)
 
     if not input_text:
         logger.warning("No input text to summarize")
         return {"summary": "No text provided", "sentiment": "neutral"}
 
+    # Prefer the extractive condensation when the optional stage ran
+    condensed_text = state.get("condensed_text")
+    if condensed_text:
+        input_text = condensed_text
+        word_count = len(condensed_text.split())
+
+    check_deadline("summarizer")
+    summary = None
     try:
-        # Get model instance
-        logger.info("Initializing LLM model...")
-        model = get_model(model_name=model_name, temperature=0.7)
+        # Get model instance, then derive per-task models carrying each
+        # task's generation profile (token cap, stop sequences, format)
+        provider_name = get_provider(provider).name
+        breaker = get_breaker(provider_name)
+        breaker.check()
+        with timed("model_init"):
+            if preset:
+                config = preset_config(preset, model_name, provider_name)
+            else:
+                config = ModelConfig(
+                    model_name=model_name, temperature=0.7, provider=provider
+                )
+            if chat_model is not None:
+                model = chat_model
+            elif preset:
+                model = get_provider(config.provider).create(config)
+            else:
+                model = get_model(
+                    model_name=model_name, temperature=0.7, provider=provider
+                )
+            summary_model = configure_for_task(model, config, "summary")
+            sentiment_model = configure_for_task(model, config, "sentiment")
+            limiter = get_limiter(provider_name, model_name)
+            if hedging_enabled():
+                # Slow calls are duplicated to another replica (OLLAMA_REPLICAS)
+                label = f"{provider_name}:{model_name}"
+                summary_model = hedged(
+                    summary_model,
+                    replica_models(summary_model, provider),
+                    label,
+                    "summary",
+                )
+                sentiment_model = hedged(
+                    sentiment_model,
+                    replica_models(sentiment_model, provider),
+                    label,
+                    "sentiment",
+                )
 
         # Generate summary
-        logger.info("Generating summary...")
         summary_prompt = f"""Summarize the following text in 2-3 sentences. Be concise and capture the main points.
 
 Text ({word_count} words):
@@ -110,67 +558,565 @@ Summary:"""
             HumanMessage(content=summary_prompt),
         ]
 
-        summary_response = model.invoke(summary_messages)
+        with timed("summary"):
+            summary_response = generate(
+                summary_model, summary_messages, "summary", limiter, breaker
+            )
         summary = summary_response.content.strip()
 
-        logger.info(f"Summary generated: {len(summary)} characters")
-        logger.info(f"Summary preview: {summary[:100]}...")
+        verbose(logger, "summary: %d characters, preview=%.100r", len(summary), summary)
+        record(summary_chars=len(summary))
 
         # Generate sentiment analysis
-        logger.info("Analyzing sentiment...")
-        sentiment_prompt = f"""Analyze the sentiment of the following text. 
-Respond with ONLY ONE WORD from these options: positive, negative, neutral, or mixed.
+        sentiment, sentiment_source, confidence = decide_sentiment(
+            sentiment_model,
+            state.get("input_text", ""),
+            input_text,
+            sentiment_strategy,
+            limiter,
+            breaker,
+        )
 
-Text:
-{input_text}
+        SENTIMENT_DECISIONS.inc(strategy=sentiment_strategy, source=sentiment_source)
+        record(sentiment=sentiment, sentiment_source=sentiment_source)
 
-Sentiment:"""
+        return {
+            "summary": summary,
+            "sentiment": sentiment,
+            "sentiment_source": sentiment_source,
+            "sentiment_confidence": confidence,
+        }
 
-        sentiment_messages = [
-            SystemMessage(
-                content="You are a sentiment analysis assistant. Respond with only one word: positive, negative, neutral, or mixed."
-            ),
-            HumanMessage(content=sentiment_prompt),
+    except CircuitOpenError:
+        if get_degraded_mode() == "extractive":
+            return degraded_analysis(state, "circuit_open", summary)
+        raise
+    except Exception as e:  # pylint: disable=broad-except
+        backend_failure = is_backend_failure(e)
+        if not backend_failure and not isinstance(e, (ValueError, TypeError)):
+            raise
+        if backend_failure and get_degraded_mode() == "extractive":
+            logger.warning("Model backend failed, degrading: %s", e)
+            return degraded_analysis(state, "backend_error", summary)
+        logger.error("Error in summarizer node: %s", e, exc_info=True)
+        record(sentiment="error")
+        return {"summary": f"Error generating summary: {str(e)}", "sentiment": "error"}
+
+
+def get_degraded_mode() -> str:
+    """What to do without a model backend: 'fail' (default) or 'extractive'"""
+    return os.getenv("DEGRADED_MODE", "fail").lower()
+
+
+def degraded_analysis(
+    state: TextAnalysisState, reason: str, summary: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Analysis without the LLM, for when the model backend is unavailable
+
+    The summary is the few most central sentences of the input (the
+    extractive stage with a small budget) and the sentiment comes from
+    the lexicon. A summary the LLM already produced is kept.
+
+    Args:
+        state: Current state containing input_text
+        reason: 'circuit_open' or 'backend_error', reported in 'degraded'
+        summary: LLM summary obtained before the failure, if any
+
+    Returns:
+        Dictionary with summary, sentiment and degraded updates
+    """
+    input_text = state.get("input_text", "")
+    if not summary:
+        with timed("degraded_summary"):
+            summary = condense(
+                input_text, ratio=1.0, max_tokens=DEGRADED_SUMMARY_TOKENS
+            )["text"]
+    sentiment, confidence = classify_sentiment(input_text)
+    DEGRADED_RESULTS.inc(reason=reason)
+    record(degraded=reason, sentiment=sentiment, sentiment_source="lexicon")
+    return {
+        "summary": summary,
+        "sentiment": sentiment,
+        "sentiment_source": "lexicon",
+        "sentiment_confidence": confidence,
+        "degraded": reason,
+    }
+
+
+def sentiment_distribution(sentiments: Iterable[str]) -> Dict[str, int]:
+    """Count sentiment labels, listing every label (errors only if present)"""
+    distribution = dict.fromkeys(SENTIMENT_LABELS, 0)
+    for sentiment in sentiments:
+        distribution[sentiment] = distribution.get(sentiment, 0) + 1
+    return distribution
+
+
+def analyze_document(
+    task: Dict[str, Any],
+    model_name: str = "llama3.2",
+    provider: Optional[str] = None,
+    sentiment_strategy: str = "llm",
+    extractive_ratio: Optional[float] = None,
+    extractive_max_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Digest branch: Analyze one document
+
+    Runs the single-document nodes (input_processor, the optional
+    extractive stage and summarizer) through the result cache, keyed
+    with the same parameters as /api/analyze, so documents analyzed
+    before, alone or in another digest, are not sent to the LLM again.
+
+    Args:
+        task: Send payload with the document 'index' and 'text'
+        model_name: Name of the Ollama model to use
+        provider: Resolved provider name
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        extractive_ratio: Enable the extractive stage with this ratio
+        extractive_max_tokens: Enable the extractive stage with this budget
+
+    Returns:
+        Dictionary appending one entry to document_results
+    """
+    text = task["text"]
+    params = {
+        "input_text": text,
+        "model_name": model_name,
+        "provider": provider,
+        "extractive_ratio": extractive_ratio,
+        "extractive_max_tokens": extractive_max_tokens,
+        "sentiment_strategy": sentiment_strategy,
+    }
+
+    def compute():
+        check_deadline("analyze_document")
+        state: Dict[str, Any] = {"input_text": text}
+        state.update(input_processor(state))
+        if extractive_ratio is not None or extractive_max_tokens is not None:
+            state.update(
+                extractive_condenser(
+                    state,
+                    ratio=1.0 if extractive_ratio is None else extractive_ratio,
+                    max_tokens=extractive_max_tokens,
+                    method=os.getenv("EXTRACTIVE_METHOD", "textrank"),
+                )
+            )
+        state.update(
+            summarizer(
+                state,
+                model_name=model_name,
+                provider=provider,
+                sentiment_strategy=sentiment_strategy,
+            )
+        )
+        result = AnalysisResult.from_state(state).to_dict()
+        record_analysis(text, result, model_name, provider, "digest")
+        return result
+
+    result, outcome = get_or_compute(
+        cache_key(**params),
+        compute,
+        cacheable=lambda value: AnalysisResult(**value).cacheable,
+    )
+    return {
+        "document_results": [
+            {"index": task["index"], **result, "cached": outcome != "miss"}
         ]
+    }
+
+
+def cluster_topics(
+    state: DigestState,
+    threshold: float = 0.1,
+    max_clusters: int = 8,
+) -> Dict[str, Any]:
+    """
+    Digest node: Group the documents by topic
+
+    Args:
+        state: Current state containing documents
+        threshold: Average cosine similarity needed to merge two clusters
+        max_clusters: Upper bound on the number of clusters
+
+    Returns:
+        Dictionary with clusters update
+    """
+    check_deadline("cluster_topics")
+    with timed("clustering"):
+        clusters = cluster_documents(
+            state.get("documents", []), threshold=threshold, max_clusters=max_clusters
+        )
+    record(documents=len(state.get("documents", [])), clusters=len(clusters))
+    return {"clusters": clusters}
+
+
+def llm_digest(
+    model_name: str,
+    provider: Optional[str],
+    summaries: List[str],
+    terms: Optional[List[str]] = None,
+) -> str:
+    """
+    Ask the LLM to merge several summaries into one
 
-        sentiment_response = model.invoke(sentiment_messages)
-        sentiment = sentiment_response.content.strip().lower()
+    Args:
+        model_name: Name of the Ollama model to use
+        provider: Model provider name
+        summaries: Summaries to merge
+        terms: Optional topic terms to focus on
 
-        # Validate sentiment response
-        valid_sentiments = ["positive", "negative", "neutral", "mixed"]
-        if sentiment not in valid_sentiments:
-            logger.warning(f"Invalid sentiment '{sentiment}', defaulting to 'neutral'")
-            sentiment = "neutral"
+    Returns:
+        Merged summary text
+    """
+    provider_name = get_provider(provider).name
+    breaker = get_breaker(provider_name)
+    breaker.check()
+    config = ModelConfig(model_name=model_name, temperature=0.7, provider=provider)
+    model = get_model(model_name=model_name, temperature=0.7, provider=provider)
+    model = configure_for_task(model, config, "digest")
+    limiter = get_limiter(provider_name, model_name)
 
-        logger.info(f"Sentiment detected: {sentiment}")
+    topic = f" about {', '.join(terms)}" if terms else ""
+    bullet_list = "\n".join(f"- {summary}" for summary in summaries)
+    digest_prompt = f"""Summarize the common points of the following {len(summaries)} document summaries{topic} in 3-4 sentences. Mention notable differences.
 
-        logger.info("=" * 60)
-        logger.info("NODE 2: Summarizer - Completed")
-        logger.info("=" * 60)
+Summaries:
+{bullet_list}
 
-        return {"summary": summary, "sentiment": sentiment}
+Digest:"""
 
-    except (ValueError, TypeError, ConnectionError, TimeoutError) as e:
-        logger.error("Error in summarizer node: %s", str(e), exc_info=True)
-        return {"summary": f"Error generating summary: {str(e)}", "sentiment": "error"}
+    messages = [
+        SystemMessage(
+            content="You are a helpful assistant that merges related summaries into a concise digest."
+        ),
+        HumanMessage(content=digest_prompt),
+    ]
+    with timed("digest"):
+        response = generate(model, messages, "digest", limiter, breaker)
+    return response.content.strip()
+
+
+def merge_summaries(
+    model_name: str,
+    provider: Optional[str],
+    summaries: List[str],
+    terms: Optional[List[str]] = None,
+) -> Tuple[str, Optional[str]]:
+    """
+    llm_digest with the summarizer's error handling and degraded mode
+
+    Returns:
+        Tuple of (merged summary, degraded reason or None)
+    """
+    try:
+        return llm_digest(model_name, provider, summaries, terms), None
+    except CircuitOpenError:
+        if get_degraded_mode() != "extractive":
+            raise
+        reason = "circuit_open"
+    except Exception as e:  # pylint: disable=broad-except
+        backend_failure = is_backend_failure(e)
+        if not backend_failure and not isinstance(e, (ValueError, TypeError)):
+            raise
+        if not backend_failure or get_degraded_mode() != "extractive":
+            logger.error("Error merging summaries: %s", e, exc_info=True)
+            return f"Error generating summary: {str(e)}", None
+        reason = "backend_error"
+
+    DEGRADED_RESULTS.inc(reason=reason)
+    record(degraded=reason)
+    merged = condense(
+        " ".join(summaries), ratio=1.0, max_tokens=DEGRADED_SUMMARY_TOKENS
+    )["text"]
+    return merged, reason
+
+
+def summarize_cluster(
+    task: Dict[str, Any],
+    model_name: str = "llama3.2",
+    provider: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Digest branch: Summarize one topic cluster
+
+    A single-document cluster reuses that document's summary; larger
+    clusters merge their document summaries with the LLM.
+
+    Args:
+        task: Send payload with the 'cluster' and its document 'results'
+        model_name: Name of the Ollama model to use
+        provider: Model provider name
+
+    Returns:
+        Dictionary appending one entry to cluster_summaries
+    """
+    cluster = task["cluster"]
+    results = task["results"]
+    if len(results) == 1:
+        summary, degraded = results[0]["summary"], results[0].get("degraded")
+    else:
+        summary, degraded = merge_summaries(
+            model_name,
+            provider,
+            [result["summary"] for result in results],
+            cluster["terms"],
+        )
+
+    return {
+        "cluster_summaries": [
+            {
+                **cluster,
+                "summary": summary,
+                "sentiment_distribution": sentiment_distribution(
+                    result["sentiment"] for result in results
+                ),
+                "degraded": degraded,
+            }
+        ]
+    }
+
+
+def overall_digest(
+    state: DigestState,
+    model_name: str = "llama3.2",
+    provider: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Digest node: Merge the cluster summaries into the overall digest
+
+    Args:
+        state: Current state containing cluster_summaries and
+            document_results
+        model_name: Name of the Ollama model to use
+        provider: Model provider name
+
+    Returns:
+        Dictionary with overall_summary, sentiment_distribution and
+        degraded updates
+    """
+    clusters = sorted(state.get("cluster_summaries", []), key=lambda c: c["id"])
+    distribution = sentiment_distribution(
+        result["sentiment"] for result in state.get("document_results", [])
+    )
+    if not clusters:
+        return {"overall_summary": "", "sentiment_distribution": distribution}
+    if len(clusters) == 1:
+        return {
+            "overall_summary": clusters[0]["summary"],
+            "sentiment_distribution": distribution,
+            "degraded": clusters[0]["degraded"],
+        }
+
+    overall, degraded = merge_summaries(
+        model_name, provider, [cluster["summary"] for cluster in clusters]
+    )
+    return {
+        "overall_summary": overall,
+        "sentiment_distribution": distribution,
+        "degraded": degraded,
+    }
 
 
 # Node function factories for dependency injection
-def create_summarizer_node(model_name: str = "llama3.2"):
+def create_extractive_node(
+    ratio: float = 0.5, max_tokens: Optional[int] = None, method: str = "textrank"
+):
+    """
+    Create an extractive condenser node with fixed settings
+
+    Args:
+        ratio: Fraction of the original tokens to keep
+        max_tokens: Optional absolute token budget
+        method: Sentence scoring method ('textrank' or 'tfidf')
+
+    Returns:
+        Node function configured with the settings
+    """
+
+    def node(state: TextAnalysisState) -> Dict[str, Any]:
+        return extractive_condenser(
+            state, ratio=ratio, max_tokens=max_tokens, method=method
+        )
+
+    return node
+
+
+def cascade_step(
+    state: TextAnalysisState,
+    models: List[str],
+    tier: int,
+    provider: Optional[str] = None,
+    sentiment_strategy: str = "llm",
+    preset: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One step of the model cascade: analyze with models[tier] and gate it
+
+    Runs the summarizer with the tier's model and checks its answer with
+    the cheap quality gates (src/utils/quality.py). The 'cascade' state
+    update says whether the answer is accepted or the next, larger model
+    has to try:
+
+    - outcome: 'accepted' (all gates passed), 'escalating', 'exhausted'
+      (the last model failed a gate; its answer is used anyway) or
+      'degraded' (no model backend, escalating would not help)
+    - model: Model of this step
+    - escalations: Models that failed before this one
+    - attempts: Model, failed gates and duration of each step so far
+    - saved_ms: Estimated time saved against running the largest model
+      directly (last step only; negative when escalations cost more)
+
+    Args:
+        state: Current state
+        models: Cascade models, smallest first
+        tier: Index of this step's model
+        provider: Model provider name
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        preset: MODEL_PRESETS entry applied to every model
+
+    Returns:
+        The summarizer's updates plus 'cascade'
+    """
+    model_name = models[tier]
+    start = time.perf_counter()
+    updates = summarizer(
+        state,
+        model_name=model_name,
+        provider=provider,
+        sentiment_strategy=sentiment_strategy,
+        preset=preset,
+    )
+    seconds = time.perf_counter() - start
+
+    text = state.get("condensed_text") or state.get("input_text", "")
+    if updates.get("degraded"):
+        failures, outcome = [], "degraded"
+    else:
+        failures = check_quality(text, updates["summary"], updates["sentiment"])
+        if not failures:
+            outcome = "accepted"
+        else:
+            outcome = "exhausted" if tier == len(models) - 1 else "escalating"
+    for gate in failures:
+        CASCADE_GATE_FAILURES.inc(model=model_name, gate=gate)
+
+    # Earlier runs of a thread leave their cascade in the state
+    attempts = state["cascade"]["attempts"] if tier else []
+    attempts = attempts + [
+        {
+            "model": model_name,
+            "failures": failures,
+            "duration_ms": round(seconds * 1000, 1),
+        }
+    ]
+    cascade = {
+        "outcome": outcome,
+        "model": model_name,
+        "escalations": tier,
+        "attempts": attempts,
+    }
+    if outcome == "escalating":
+        CASCADE_ESCALATIONS.inc(model=model_name)
+        verbose(logger, "cascade: %s failed %s, escalating", model_name, failures)
+        return {**updates, "cascade": cascade}
+
+    CASCADE_RUNS.inc(model=model_name, outcome=outcome)
+    actual = sum(attempt["duration_ms"] for attempt in attempts) / 1000
+    record(cascade_model=model_name, cascade_escalations=tier)
+    largest = MODEL_PROFILES.get(models[-1])
+    if largest is not None:
+        baseline = estimate_seconds(largest, estimate_tokens(text))
+        CASCADE_SECONDS.inc(actual, kind="actual")
+        CASCADE_SECONDS.inc(baseline, kind="largest_model")
+        cascade["saved_ms"] = round((baseline - actual) * 1000, 1)
+        record(cascade_saved_ms=cascade["saved_ms"])
+    return {**updates, "cascade": cascade}
+
+
+def check_node_options(sentiment_strategy: str, preset: Optional[str] = None) -> None:
+    """Raise ValueError for an unknown sentiment strategy or preset"""
+    if sentiment_strategy not in SENTIMENT_STRATEGIES:
+        raise ValueError(
+            f"Unknown sentiment strategy: {sentiment_strategy}. "
+            f"Available strategies: {list(SENTIMENT_STRATEGIES)}"
+        )
+    if preset is not None and preset not in MODEL_PRESETS:
+        raise ValueError(
+            f"Unknown preset: {preset}. Available presets: {list(MODEL_PRESETS)}"
+        )
+
+
+def create_cascade_node(
+    models: List[str],
+    tier: int,
+    provider: Optional[str] = None,
+    sentiment_strategy: str = "llm",
+    preset: Optional[str] = None,
+):
+    """
+    Create the cascade step node of models[tier]
+
+    Args:
+        models: Cascade models, smallest first
+        tier: Index of the node's model
+        provider: Model provider name (defaults to LLM_PROVIDER or ollama)
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        preset: MODEL_PRESETS entry applied to every model
+
+    Returns:
+        Node function running cascade_step
+    """
+    check_node_options(sentiment_strategy, preset)
+
+    def node(state: TextAnalysisState) -> Dict[str, Any]:
+        return cascade_step(
+            state,
+            models,
+            tier,
+            provider=provider,
+            sentiment_strategy=sentiment_strategy,
+            preset=preset,
+        )
+
+    return node
+
+
+def create_summarizer_node(
+    model_name: str = "llama3.2",
+    provider: Optional[str] = None,
+    sentiment_strategy: str = "llm",
+    chat_model=None,
+    preset: Optional[str] = None,
+):
     """
     Create a summarizer node with a specific model
 
     This is a factory function that returns a node function
-    configured with a specific model name.
+    configured with a specific model name and provider.
 
     Args:
         model_name: Name of the Ollama model to use
+        provider: Model provider name (defaults to LLM_PROVIDER or ollama)
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        chat_model: Model instance shared by every run (default: created
+            per run with get_model)
+        preset: MODEL_PRESETS entry configuring the model (sampling and
+            per-task generation profiles)
 
     Returns:
         Node function configured with the model
     """
+    check_node_options(sentiment_strategy, preset)
 
     def node(state: TextAnalysisState) -> Dict[str, Any]:
-        return summarizer(state, model_name=model_name)
+        return summarizer(
+            state,
+            model_name=model_name,
+            provider=provider,
+            sentiment_strategy=sentiment_strategy,
+            chat_model=chat_model,
+            preset=preset,
+        )
 
     return node
@@ -0,0 +1,169 @@
+"""
+Analysis sessions: one thread, many runs
+
+A session belongs to one conversation thread (thread_id) and keeps what
+a single /api/analyze request builds and throws away: the compiled
+workflow, with its checkpointer holding the thread's history, and the
+chat model with its HTTP connection to the model server. Successive
+analyses in the session only run the graph.
+
+Runs report their progress through a callback, as events:
+
+- ``{"type": "node", "node": ..., "update": {...}}`` when a node finishes
+  (large text fields are replaced by their length)
+- ``{"type": "token", "task": "summary" | "sentiment", "text": ...}`` for
+  every chunk the model generates
+
+Several runs of a session may be in flight at once; each starts from the
+thread's last completed checkpoint.
+
+Used by the /api/session WebSocket endpoint.
+"""
+
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .nodes import listen_tokens
+from .state import AnalysisResult
+from .workflow import create_workflow
+from ..config.models import get_model, get_provider
+from ..utils.deadline import Deadline, deadline_scope
+from ..utils.log import record, request_context, timed
+from ..utils.metrics import gauge
+from ..utils.priority import priority_scope
+from ..utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+SESSIONS = gauge("analysis_sessions", "Open analysis sessions (WebSocket connections)")
+
+# Node update fields sent as their length instead of their text
+_TEXT_FIELDS = ("input_text", "condensed_text")
+
+
+class AnalysisSession:
+    """
+    Compiled workflow and model client shared by the runs of a thread
+
+    Args:
+        thread_id: Conversation thread the runs are checkpointed in
+        model_name: Model to use (defaults to llama3.2)
+        provider: Model provider ('ollama', 'mock', 'llamacpp')
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        extractive_ratio: Enable the extractive stage keeping this
+            fraction of input tokens
+        extractive_max_tokens: Enable the extractive stage with this budget
+
+    Example:
+        >>> session = AnalysisSession("notebook-1", provider="mock")
+        >>> result = session.run("First text...", print)
+        >>> result = session.run("Second text...", print)
+    """
+
+    def __init__(
+        self,
+        thread_id: str,
+        model_name: Optional[str] = None,
+        provider: Optional[str] = None,
+        sentiment_strategy: Optional[str] = None,
+        extractive_ratio: Optional[float] = None,
+        extractive_max_tokens: Optional[int] = None,
+    ):
+        self.thread_id = thread_id
+        self.model_name = model_name or "llama3.2"
+        self.provider = get_provider(provider).name
+        self._runs = itertools.count(1)
+        start = time.perf_counter()
+        self.model = get_model(
+            model_name=self.model_name, temperature=0.7, provider=self.provider
+        )
+        self.workflow = create_workflow(
+            model_name=self.model_name,
+            provider=self.provider,
+            extractive_ratio=extractive_ratio,
+            extractive_max_tokens=extractive_max_tokens,
+            sentiment_strategy=sentiment_strategy,
+            chat_model=self.model,
+        )
+        logger.debug(
+            "Session %s ready in %.1fms",
+            thread_id,
+            (time.perf_counter() - start) * 1000,
+        )
+
+    def run(
+        self,
+        input_text: str,
+        emit: Callable[[Dict[str, Any]], None],
+        deadline: Optional[Deadline] = None,
+        priority: Optional[str] = None,
+        request_id: Optional[str] = None,
+    ) -> AnalysisResult:
+        """
+        Analyze one text in the session's thread
+
+        Args:
+            input_text: Text to analyze
+            emit: Receives the node and token events (called from the
+                graph's threads)
+            deadline: Deadline for the run (e.g. cancelled by the client)
+            priority: Priority class of the model calls
+            request_id: Correlation ID for the run's log summary
+
+        Returns:
+            The analysis
+
+        Raises:
+            RequestCancelled: If the deadline expires or is cancelled
+        """
+        run = next(self._runs)
+        config = {"configurable": {"thread_id": self.thread_id}}
+        with (
+            request_context(
+                request_id=request_id, thread_id=self.thread_id, session=True
+            ) as request_log,
+            deadline_scope(deadline=deadline),
+            priority_scope(priority) as priority,
+            span("session analysis", priority=priority) as run_span,
+            listen_tokens(lambda task, text: emit(_token(task, text))),
+        ):
+            record(
+                priority=priority,
+                input_chars=len(input_text),
+                model=self.model_name,
+                session_run=run,
+            )
+            if run_span.trace_id:
+                record(trace_id=run_span.trace_id)
+            config["metadata"] = {"request_id": request_log.request_id}
+            state: Dict[str, Any] = {}
+            with timed("workflow"):
+                for update in self.workflow.stream(
+                    {"input_text": input_text}, config=config, stream_mode="updates"
+                ):
+                    for node, values in update.items():
+                        state.update(values or {})
+                        emit(
+                            {
+                                "type": "node",
+                                "node": node,
+                                "update": _compact(values or {}),
+                            }
+                        )
+        return AnalysisResult.from_state(state)
+
+
+def _token(task: str, text: str) -> Dict[str, Any]:
+    return {"type": "token", "task": task, "text": text}
+
+
+def _compact(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Node update with the large text fields replaced by their length"""
+    return {
+        (f"{key}_chars" if key in _TEXT_FIELDS else key): (
+            len(value) if key in _TEXT_FIELDS and isinstance(value, str) else value
+        )
+        for key, value in values.items()
+    }
@@ -3,10 +3,14 @@ State definition for the LangGraph workflow
 
 This module defines the state schema that will be shared across
 all nodes in the graph. The state persists throughout execution
-and nodes can read from and write to it.
+and nodes can read from and write to it. AnalysisResult is the compact
+record kept once a run has finished. DigestState is the state of the
+multi-document digest workflow.
 """
 
-from typing import TypedDict
+import operator
+from dataclasses import dataclass
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
 
 
 class TextAnalysisState(TypedDict):
@@ -18,8 +22,17 @@ class TextAnalysisState(TypedDict):
 
     - input_text: The original text provided by the user (set initially)
     - word_count: Number of words in the input (set by input_processor node)
+    - condensed_text: Extractive condensation of the input that is sent to
+      the LLM instead of input_text (set by the optional extractive node)
+    - prompt_stats: Prompt-size statistics of the extractive stage
     - summary: Generated summary of the text (set by summarizer node)
     - sentiment: Sentiment analysis result (set by summarizer node)
+    - sentiment_source: Who decided the sentiment ('lexicon' or 'llm')
+    - sentiment_confidence: Lexicon confidence, when the lexicon ran
+    - degraded: Why the result was produced without the LLM
+      ('circuit_open' or 'backend_error'), when degraded mode was used
+    - cascade: Outcome of the model cascade, when it ran (see
+      cascade_step in nodes.py)
     """
 
     # Input field - provided by user
@@ -28,6 +41,83 @@ class TextAnalysisState(TypedDict):
     # Metadata field - set by input_processor node
     word_count: int
 
+    # Optional fields - set by extractive node when enabled
+    condensed_text: str
+    prompt_stats: Dict[str, Any]
+
     # Output fields - set by summarizer node
     summary: str
     sentiment: str
+    sentiment_source: str
+    sentiment_confidence: Optional[float]
+    degraded: Optional[str]
+    cascade: Dict[str, Any]
+
+
+class DigestState(TypedDict):
+    """
+    State schema for the multi-document digest workflow
+
+    - documents: Input texts (set initially)
+    - document_results: One entry per document with its index, summary,
+      sentiment and whether it came from the cache (appended in parallel
+      by the analyze_document branches)
+    - clusters: Topic clusters with their document indices and top terms
+      (set by cluster_topics)
+    - cluster_summaries: Summary and sentiment distribution per cluster
+      (appended in parallel by the summarize_cluster branches)
+    - overall_summary: Digest over all clusters (set by overall_digest)
+    - sentiment_distribution: Count of document sentiments
+    - degraded: Set when the overall summary was built without the LLM
+    """
+
+    documents: List[str]
+    document_results: Annotated[List[Dict[str, Any]], operator.add]
+    clusters: List[Dict[str, Any]]
+    cluster_summaries: Annotated[List[Dict[str, Any]], operator.add]
+    overall_summary: str
+    sentiment_distribution: Dict[str, int]
+    degraded: Optional[str]
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """
+    Compact record of a finished analysis
+
+    Holds only the outputs of a workflow run, not the (possibly large)
+    input and condensed texts, so cached and in-flight results stay
+    small. Slots avoid a per-instance __dict__.
+    """
+
+    word_count: int
+    summary: str
+    sentiment: str
+    sentiment_source: str = "llm"
+    sentiment_confidence: Optional[float] = None
+    prompt_stats: Optional[Dict[str, Any]] = None
+    degraded: Optional[str] = None
+    cascade: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_state(cls, state: TextAnalysisState) -> "AnalysisResult":
+        """Build a record from the final workflow state"""
+        return cls(
+            word_count=state.get("word_count", 0),
+            summary=state.get("summary", ""),
+            sentiment=state.get("sentiment", "neutral"),
+            sentiment_source=state.get("sentiment_source", "llm"),
+            sentiment_confidence=state.get("sentiment_confidence"),
+            prompt_stats=state.get("prompt_stats"),
+            degraded=state.get("degraded"),
+            cascade=state.get("cascade"),
+        )
+
+    @property
+    def cacheable(self) -> bool:
+        """Whether the result may be cached (not an error or a fallback)"""
+        return self.sentiment != "error" and self.degraded is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow dictionary of the fields (cheaper than dataclasses.asdict)"""
+        return {name: getattr(self, name) for name in self.__slots__}
@@ -4,24 +4,74 @@ Workflow definition and graph construction
 This module defines the LangGraph workflow by connecting nodes
 with edges and compiling the graph with necessary features like
 checkpointing.
+
+Two graphs are defined: the single-document analysis workflow and the
+multi-document digest workflow, which fans out one analysis per document,
+clusters the documents by topic and summarizes each cluster.
 """
 
 import logging
-from typing import Optional
+import os
+import time
+from functools import partial, wraps
+from typing import Any, Callable, Dict, List, Optional
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-
-from .state import TextAnalysisState
-from .nodes import input_processor, create_summarizer_node
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+from langgraph.types import Send
+
+from .checkpoint import create_checkpointer
+from .state import DigestState, TextAnalysisState
+from .nodes import (
+    analyze_document,
+    cluster_topics,
+    create_cascade_node,
+    create_extractive_node,
+    create_summarizer_node,
+    input_processor,
+    overall_digest,
+    summarize_cluster,
 )
+from ..config.models import get_provider
+from ..utils.deadline import deadline_scope
+from ..utils.log import record, request_context, timed
+from ..utils.priority import priority_scope
+from ..utils.sentiment import SENTIMENT_STRATEGIES
+from ..utils.topics import DEFAULT_MAX_CLUSTERS, DEFAULT_SIMILARITY_THRESHOLD
+from ..utils.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
-def create_workflow(model_name: Optional[str] = None, use_checkpointer: bool = True):
+def traced(name: str, node: Callable) -> Callable:
+    """Node running as a 'node <name>' span (see src/utils/tracing.py)"""
+
+    @wraps(node)
+    def run(state):
+        with span(f"node {name}"):
+            return node(state)
+
+    return run
+
+
+def cascade_edge(next_node: str) -> Callable:
+    """Route to the next cascade step while the answers are escalated"""
+
+    def route(state: TextAnalysisState) -> str:
+        return next_node if state["cascade"]["outcome"] == "escalating" else END
+
+    return route
+
+
+def create_workflow(
+    model_name: Optional[str] = None,
+    use_checkpointer: bool = True,
+    provider: Optional[str] = None,
+    extractive_ratio: Optional[float] = None,
+    extractive_max_tokens: Optional[int] = None,
+    sentiment_strategy: Optional[str] = None,
+    chat_model=None,
+    cascade_models: Optional[List[str]] = None,
+    preset: Optional[str] = None,
+):
     """
     Create and compile the LangGraph workflow
 
@@ -34,9 +84,30 @@ def create_workflow(model_name: Optional[str] = None, use_checkpointer: bool = T
     The workflow follows this structure:
     START -> input_processor -> summarizer -> END
 
+    With the extractive stage enabled (extractive_ratio or
+    extractive_max_tokens set) it becomes:
+    START -> input_processor -> extractive -> summarizer -> END
+
+    With cascade_models the summarizer runs the smallest model, and each
+    answer failing a quality gate is escalated to the next model:
+    ... -> summarizer -> [escalation_1 -> [escalation_2 ...]] -> END
+
     Args:
         model_name: Name of the Ollama model to use (defaults to llama3.2)
         use_checkpointer: Whether to enable memory persistence
+        provider: Model provider ('ollama', 'mock', 'llamacpp')
+        extractive_ratio: Fraction of input tokens the extractive stage keeps
+            (lower is faster, higher preserves more content)
+        extractive_max_tokens: Absolute token budget for the extractive stage
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid' (defaults to the
+            SENTIMENT_STRATEGY env var or llm)
+        chat_model: Model instance the summarizer uses for every run,
+            instead of creating one per run
+        cascade_models: Run the model cascade over these models,
+            smallest first, instead of model_name
+        preset: MODEL_PRESETS entry ('creative', 'balanced', 'precise',
+            'deterministic') configuring the models' sampling and their
+            per-task generation profiles
 
     Returns:
         Compiled LangGraph workflow ready for execution
@@ -45,59 +116,92 @@ def create_workflow(model_name: Optional[str] = None, use_checkpointer: bool = T
         >>> workflow = create_workflow()
         >>> result = workflow.invoke({"input_text": "Sample text..."})
     """
-    logger.info("=" * 70)
-    logger.info("Building LangGraph Workflow")
-    logger.info("=" * 70)
+    start = time.perf_counter()
 
     # Use default model if not specified
     if model_name is None:
         model_name = "llama3.2"
 
-    logger.info(f"Model: {model_name}")
-    logger.info(f"Checkpointer: {'Enabled' if use_checkpointer else 'Disabled'}")
-
     # Initialize the graph with our state schema
-    logger.info("Initializing StateGraph with TextAnalysisState schema")
     builder = StateGraph(TextAnalysisState)
 
     # Add nodes to the graph
-    logger.info("Adding nodes:")
-    logger.info("  - input_processor: Calculates word count from input text")
-    builder.add_node("input_processor", input_processor)
-
-    logger.info(f"  - summarizer: Generates summary and sentiment using {model_name}")
-    summarizer_node = create_summarizer_node(model_name=model_name)
-    builder.add_node("summarizer", summarizer_node)
+    builder.add_node("input_processor", traced("input_processor", input_processor))
+    sentiment_strategy = sentiment_strategy or os.getenv("SENTIMENT_STRATEGY", "llm")
+    if cascade_models:
+        # Step 0 keeps the summarizer's name, so callers see the same nodes
+        steps = ["summarizer"] + [
+            f"escalation_{tier}" for tier in range(1, len(cascade_models))
+        ]
+        for tier, name in enumerate(steps):
+            step_node = create_cascade_node(
+                cascade_models, tier, provider, sentiment_strategy, preset
+            )
+            builder.add_node(name, traced(name, step_node))
+    else:
+        summarizer_node = create_summarizer_node(
+            model_name=model_name,
+            provider=provider,
+            sentiment_strategy=sentiment_strategy,
+            chat_model=chat_model,
+            preset=preset,
+        )
+        builder.add_node("summarizer", traced("summarizer", summarizer_node))
+
+    use_extractive = extractive_ratio is not None or extractive_max_tokens is not None
+    if use_extractive:
+        extractive_node = create_extractive_node(
+            ratio=1.0 if extractive_ratio is None else extractive_ratio,
+            max_tokens=extractive_max_tokens,
+            method=os.getenv("EXTRACTIVE_METHOD", "textrank"),
+        )
+        builder.add_node("extractive", traced("extractive", extractive_node))
 
     # Define the edges (control flow)
-    logger.info("Defining edges:")
-    logger.info("  START -> input_processor")
     builder.add_edge(START, "input_processor")
-
-    logger.info("  input_processor -> summarizer")
-    builder.add_edge("input_processor", "summarizer")
-
-    logger.info("  summarizer -> END")
-    builder.add_edge("summarizer", END)
+    if use_extractive:
+        builder.add_edge("input_processor", "extractive")
+        builder.add_edge("extractive", "summarizer")
+    else:
+        builder.add_edge("input_processor", "summarizer")
+    if cascade_models:
+        for name, next_name in zip(steps, steps[1:]):
+            builder.add_conditional_edges(
+                name, cascade_edge(next_name), [next_name, END]
+            )
+        builder.add_edge(steps[-1], END)
+    else:
+        builder.add_edge("summarizer", END)
 
     # Compile the graph with optional checkpointer
     if use_checkpointer:
-        logger.info("Compiling graph with MemorySaver checkpointer for persistence")
-        checkpointer = MemorySaver()
+        checkpointer = create_checkpointer()
         graph = builder.compile(checkpointer=checkpointer)
     else:
-        logger.info("Compiling graph without checkpointer")
         graph = builder.compile()
 
-    logger.info("=" * 70)
-    logger.info("Workflow created successfully!")
-    logger.info("=" * 70)
+    logger.debug(
+        "Compiled workflow (model=%s, checkpointer=%s) in %.1fms",
+        model_name,
+        use_checkpointer,
+        (time.perf_counter() - start) * 1000,
+    )
 
     return graph
 
 
 def run_workflow(
-    input_text: str, model_name: Optional[str] = None, thread_id: Optional[str] = None
+    input_text: str,
+    model_name: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    provider: Optional[str] = None,
+    extractive_ratio: Optional[float] = None,
+    extractive_max_tokens: Optional[int] = None,
+    sentiment_strategy: Optional[str] = None,
+    timeout: Optional[float] = None,
+    priority: Optional[str] = None,
+    cascade_models: Optional[List[str]] = None,
+    preset: Optional[str] = None,
 ) -> TextAnalysisState:
     """
     Convenience function to create and run the workflow
@@ -111,45 +215,77 @@ def run_workflow(
         input_text: The text to analyze
         model_name: Name of the Ollama model to use
         thread_id: Optional thread ID for persistent conversations
+        provider: Model provider ('ollama', 'mock', 'llamacpp')
+        extractive_ratio: Enable the extractive stage keeping this fraction
+            of input tokens
+        extractive_max_tokens: Enable the extractive stage with this budget
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        timeout: Seconds allowed for the run; also bounded by a deadline
+            already active in the caller's context (see deadline_scope)
+        priority: 'interactive', 'batch' or 'background' for the model
+            calls (defaults to the caller's class, see priority_scope)
+        cascade_models: Run the model cascade over these models (see
+            create_workflow)
+        preset: MODEL_PRESETS entry configuring the models (see
+            create_workflow)
 
     Returns:
         Final state with all fields populated
 
+    Raises:
+        RequestCancelled: If the deadline expires or the caller cancels
+            the deadline (e.g. on client disconnect) before the run ends
+
     Example:
         >>> result = run_workflow("Your text here...")
         >>> print(result["summary"])
         >>> print(result["sentiment"])
     """
-    logger.info("=" * 70)
-    logger.info("Running Workflow")
-    logger.info("=" * 70)
-    logger.info(f"Input text length: {len(input_text)} characters")
-
-    # Create the workflow - disable checkpointer if no thread_id provided
-    use_checkpointer = thread_id is not None
-    workflow = create_workflow(model_name=model_name, use_checkpointer=use_checkpointer)
-
-    # Prepare config if thread_id is provided
-    config = {}
-    if thread_id:
-        config = {"configurable": {"thread_id": thread_id}}
-        logger.info("Using thread_id: %s", thread_id)
-    else:
-        logger.info("No thread_id provided - running without checkpointer")
-
-    # Invoke the workflow
-    logger.info("Invoking workflow...")
-    result = workflow.invoke({"input_text": input_text}, config=config)
-
-    logger.info("=" * 70)
-    logger.info("Workflow completed successfully!")
-    logger.info("=" * 70)
+    with (
+        request_context(thread_id=thread_id) as request_log,
+        deadline_scope(timeout),
+        priority_scope(priority) as priority,
+        span("workflow", priority=priority) as run_span,
+    ):
+        record(priority=priority)
+        if run_span.trace_id:
+            record(trace_id=run_span.trace_id)
+        # Create the workflow - disable checkpointer if no thread_id provided
+        use_checkpointer = thread_id is not None
+        with timed("compile"):
+            workflow = create_workflow(
+                model_name=model_name,
+                use_checkpointer=use_checkpointer,
+                provider=provider,
+                extractive_ratio=extractive_ratio,
+                extractive_max_tokens=extractive_max_tokens,
+                sentiment_strategy=sentiment_strategy,
+                cascade_models=cascade_models,
+                preset=preset,
+            )
+
+        # Prepare config if thread_id is provided
+        config = {}
+        if thread_id:
+            config = {"configurable": {"thread_id": thread_id}}
+
+        # Tag the run with the request ID so graph callbacks and log records
+        # can be correlated
+        config["metadata"] = {"request_id": request_log.request_id}
+        with timed("workflow"):
+            result = workflow.invoke({"input_text": input_text}, config=config)
 
     return result
 
 
 def stream_workflow(
-    input_text: str, model_name: Optional[str] = None, thread_id: Optional[str] = None
+    input_text: str,
+    model_name: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    provider: Optional[str] = None,
+    extractive_ratio: Optional[float] = None,
+    extractive_max_tokens: Optional[int] = None,
+    sentiment_strategy: Optional[str] = None,
 ):
     """
     Stream workflow execution for real-time updates
@@ -161,6 +297,11 @@ def stream_workflow(
         input_text: The text to analyze
         model_name: Name of the Ollama model to use
         thread_id: Optional thread ID for persistent conversations
+        provider: Model provider ('ollama', 'mock', 'llamacpp')
+        extractive_ratio: Enable the extractive stage keeping this fraction
+            of input tokens
+        extractive_max_tokens: Enable the extractive stage with this budget
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
 
     Yields:
         State updates from each node
@@ -169,27 +310,216 @@ def stream_workflow(
         >>> for update in stream_workflow("Your text here..."):
         ...     print(update)
     """
-    logger.info("=" * 70)
-    logger.info("Streaming Workflow")
-    logger.info("=" * 70)
-
-    # Create the workflow - disable checkpointer if no thread_id provided
-    use_checkpointer = thread_id is not None
-    workflow = create_workflow(model_name=model_name, use_checkpointer=use_checkpointer)
-
-    # Prepare config
-    config = {}
-    if thread_id:
-        config = {"configurable": {"thread_id": thread_id}}
-        logger.info("Using thread_id: %s", thread_id)
-
-    # Stream the workflow
-    logger.info("Starting stream...")
-    for update in workflow.stream(
-        {"input_text": input_text}, config=config, stream_mode="updates"
-    ):
-        yield update
+    with request_context(thread_id=thread_id, stream=True) as request_log:
+        # Create the workflow - disable checkpointer if no thread_id provided
+        use_checkpointer = thread_id is not None
+        workflow = create_workflow(
+            model_name=model_name,
+            use_checkpointer=use_checkpointer,
+            provider=provider,
+            extractive_ratio=extractive_ratio,
+            extractive_max_tokens=extractive_max_tokens,
+            sentiment_strategy=sentiment_strategy,
+        )
+
+        # Prepare config
+        config = {}
+        if thread_id:
+            config = {"configurable": {"thread_id": thread_id}}
+        config["metadata"] = {"request_id": request_log.request_id}
+
+        # Stream the workflow
+        updates = 0
+        for update in workflow.stream(
+            {"input_text": input_text}, config=config, stream_mode="updates"
+        ):
+            updates += 1
+            yield update
+        record(updates=updates)
+
+
+def fan_out_documents(state: DigestState) -> List[Send]:
+    """Route each document to its own analyze_document branch"""
+    return [
+        Send("analyze_document", {"index": index, "text": text})
+        for index, text in enumerate(state["documents"])
+    ]
+
+
+def fan_out_clusters(state: DigestState) -> List[Send]:
+    """Route each topic cluster, with its document results, to a branch"""
+    results = {result["index"]: result for result in state["document_results"]}
+    return [
+        Send(
+            "summarize_cluster",
+            {
+                "cluster": cluster,
+                "results": [results[index] for index in cluster["documents"]],
+            },
+        )
+        for cluster in state["clusters"]
+    ]
+
+
+def create_digest_workflow(
+    model_name: Optional[str] = None,
+    provider: Optional[str] = None,
+    sentiment_strategy: Optional[str] = None,
+    extractive_ratio: Optional[float] = None,
+    extractive_max_tokens: Optional[int] = None,
+    similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    max_clusters: int = DEFAULT_MAX_CLUSTERS,
+):
+    """
+    Create and compile the multi-document digest workflow
+
+    The workflow follows this structure:
+    START -> analyze_document (one branch per document, in parallel)
+          -> cluster_topics
+          -> summarize_cluster (one branch per cluster, in parallel)
+          -> overall_digest -> END
+
+    Document analyses go through the result cache, so documents seen
+    before (alone or in an earlier digest) are not re-analyzed.
+
+    Args:
+        model_name: Name of the Ollama model to use (defaults to llama3.2)
+        provider: Model provider ('ollama', 'mock', 'llamacpp')
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid' (defaults to the
+            SENTIMENT_STRATEGY env var or llm)
+        extractive_ratio: Condense each document before its analysis
+        extractive_max_tokens: Token budget for the extractive stage
+        similarity_threshold: Average similarity needed to merge clusters
+        max_clusters: Upper bound on the number of topic clusters
+
+    Returns:
+        Compiled LangGraph workflow
 
-    logger.info("=" * 70)
-    logger.info("Stream completed!")
-    logger.info("=" * 70)
+    Example:
+        >>> workflow = create_digest_workflow(provider="mock")
+        >>> result = workflow.invoke({"documents": ["First...", "Second..."]})
+    """
+    model_name = model_name or "llama3.2"
+    # Resolved names keep cache keys identical to /api/analyze
+    provider = get_provider(provider).name
+    sentiment_strategy = sentiment_strategy or os.getenv("SENTIMENT_STRATEGY", "llm")
+    if sentiment_strategy not in SENTIMENT_STRATEGIES:
+        raise ValueError(
+            f"Unknown sentiment strategy: {sentiment_strategy}. "
+            f"Available strategies: {list(SENTIMENT_STRATEGIES)}"
+        )
+
+    builder = StateGraph(DigestState)
+    nodes = {
+        "analyze_document": partial(
+            analyze_document,
+            model_name=model_name,
+            provider=provider,
+            sentiment_strategy=sentiment_strategy,
+            extractive_ratio=extractive_ratio,
+            extractive_max_tokens=extractive_max_tokens,
+        ),
+        "cluster_topics": partial(
+            cluster_topics, threshold=similarity_threshold, max_clusters=max_clusters
+        ),
+        "summarize_cluster": partial(
+            summarize_cluster, model_name=model_name, provider=provider
+        ),
+        "overall_digest": partial(
+            overall_digest, model_name=model_name, provider=provider
+        ),
+    }
+    for name, node in nodes.items():
+        builder.add_node(name, traced(name, node))
+
+    builder.add_conditional_edges(START, fan_out_documents, ["analyze_document"])
+    builder.add_edge("analyze_document", "cluster_topics")
+    builder.add_conditional_edges(
+        "cluster_topics", fan_out_clusters, ["summarize_cluster"]
+    )
+    builder.add_edge("summarize_cluster", "overall_digest")
+    builder.add_edge("overall_digest", END)
+
+    return builder.compile()
+
+
+def run_digest(
+    documents: List[str],
+    model_name: Optional[str] = None,
+    provider: Optional[str] = None,
+    sentiment_strategy: Optional[str] = None,
+    extractive_ratio: Optional[float] = None,
+    extractive_max_tokens: Optional[int] = None,
+    similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    max_clusters: int = DEFAULT_MAX_CLUSTERS,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    priority: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build a digest over several documents
+
+    Args:
+        documents: Texts to digest
+        model_name: Name of the Ollama model to use
+        provider: Model provider ('ollama', 'mock', 'llamacpp')
+        sentiment_strategy: 'llm', 'lexicon' or 'hybrid'
+        extractive_ratio: Condense each document before its analysis
+        extractive_max_tokens: Token budget for the extractive stage
+        similarity_threshold: Average similarity needed to merge clusters
+        max_clusters: Upper bound on the number of topic clusters
+        max_concurrency: Parallel branches (defaults to the
+            DIGEST_CONCURRENCY env var or 4)
+        timeout: Seconds allowed for the whole digest
+        priority: Class for the model calls (defaults to the caller's)
+
+    Returns:
+        Dictionary with 'documents' (per-document results by index),
+        'clusters' (by id), 'overall_summary', 'sentiment_distribution' and
+        'degraded' (whether any part was produced without the LLM)
+
+    Example:
+        >>> digest = run_digest(["First report...", "Second report..."])
+        >>> print(digest["overall_summary"])
+        >>> print(digest["sentiment_distribution"])
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("DIGEST_CONCURRENCY", "4"))
+
+    with (
+        request_context(digest=True) as request_log,
+        deadline_scope(timeout),
+        priority_scope(priority) as priority,
+        span("digest", priority=priority, documents=len(documents)) as run_span,
+    ):
+        record(priority=priority)
+        if run_span.trace_id:
+            record(trace_id=run_span.trace_id)
+        with timed("compile"):
+            workflow = create_digest_workflow(
+                model_name=model_name,
+                provider=provider,
+                sentiment_strategy=sentiment_strategy,
+                extractive_ratio=extractive_ratio,
+                extractive_max_tokens=extractive_max_tokens,
+                similarity_threshold=similarity_threshold,
+                max_clusters=max_clusters,
+            )
+        config = {
+            "max_concurrency": max_concurrency,
+            "metadata": {"request_id": request_log.request_id},
+        }
+        with timed("digest_workflow"):
+            state = workflow.invoke({"documents": list(documents)}, config=config)
+
+        results = sorted(state.get("document_results", []), key=lambda r: r["index"])
+        record(cached_documents=sum(result["cached"] for result in results))
+
+    clusters = sorted(state.get("cluster_summaries", []), key=lambda c: c["id"])
+    return {
+        "documents": results,
+        "clusters": clusters,
+        "overall_summary": state.get("overall_summary", ""),
+        "sentiment_distribution": state.get("sentiment_distribution", {}),
+        "degraded": any(item.get("degraded") for item in [state, *results, *clusters]),
+    }
@@ -2,10 +2,17 @@
 Main entry point for the LangGraph Text Analysis Backend
 
 This module provides the main entry point for running the FastAPI server.
+
+With ``--workers N`` (or WEB_CONCURRENCY) uvicorn runs N worker
+processes. The result cache then defaults to the shared SQLite backend
+and metrics are aggregated across workers through METRICS_DIR, so
+caching, in-flight coalescing and /metrics behave as with one process.
 """
 
+import argparse
 import uvicorn
 import os
+import tempfile
 from pathlib import Path
 
 # Add the parent directory to the path so we can import api
@@ -13,26 +20,64 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from api import app
+from src.utils.metrics import reset_metrics_dir
+
+
+def configure_workers(workers: int) -> None:
+    """
+    Prepare the environment shared by worker processes
+
+    Worker processes inherit the environment, so the settings must be in
+    place before uvicorn spawns them.
+
+    Args:
+        workers: Number of worker processes
+    """
+    if workers <= 1:
+        return
+    os.environ.setdefault("RESULT_CACHE", "sqlite")
+    metrics_dir = os.environ.setdefault(
+        "METRICS_DIR", os.path.join(tempfile.gettempdir(), "text-analysis-metrics")
+    )
+    reset_metrics_dir(metrics_dir)
 
 
 def main():
     """
     Main entry point for running the FastAPI application
     """
-    port = int(os.environ.get("PORT", 8000))
-    host = os.environ.get("HOST", "0.0.0.0")
+    parser = argparse.ArgumentParser(description="Text Analysis API server")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        help="Worker processes (defaults to WEB_CONCURRENCY or 1)",
+    )
+    args = parser.parse_args()
+
+    reload = os.environ.get("RELOAD", "false").lower() == "true"
+    if reload and args.workers > 1:
+        parser.error("RELOAD=true cannot be combined with multiple workers")
+    configure_workers(args.workers)
 
-    print(f"Starting Text Analysis API server on {host}:{port}")
-    print("API Documentation: http://localhost:8000/docs")
-    print("Health Check: http://localhost:8000/health")
+    print(f"Starting Text Analysis API server on {args.host}:{args.port}")
+    if args.workers > 1:
+        print(
+            f"Workers: {args.workers} "
+            f"(cache={os.environ['RESULT_CACHE']}, metrics={os.environ['METRICS_DIR']})"
+        )
+    print(f"API Documentation: http://localhost:{args.port}/docs")
+    print(f"Health Check: http://localhost:{args.port}/health")
 
     uvicorn.run(
         "api:app",
-        host=host,
-        port=port,
-        reload=os.environ.get("RELOAD", "false").lower() == "true",
-        log_level=os.environ.get("LOG_LEVEL", "info"),
+        host=args.host,
+        port=args.port,
+        reload=reload,
+        workers=args.workers,
+        log_level=os.environ.get("LOG_LEVEL", "info").lower(),
     )
 
 
@@ -0,0 +1,185 @@
+"""
+Content-addressed blob store
+
+Blobs are keyed by the SHA-256 of their content, so storing the same
+bytes twice keeps one copy. They are compressed with zstd when the
+optional ``zstandard`` package is installed, zlib otherwise, and kept
+only compressed when that saves space.
+
+Blobs live in memory. With a spill directory, the least recently used
+ones move to files in a subdirectory of it once the in-memory total
+passes ``max_memory``; the subdirectory is removed with the store.
+Without a spill directory memory is not bounded.
+
+Used by the checkpoint serializer (src/graph/checkpoint.py) to keep large
+state fields out of LangGraph checkpoints.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is an optional speed-up
+    zstandard = None
+
+COMPRESSION = "zstd" if zstandard is not None else "zlib"
+
+# First byte of every stored blob
+_RAW, _ZLIB, _ZSTD = b"\x00", b"\x01", b"\x02"
+# Smaller blobs are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+
+class BlobStore:
+    """
+    Deduplicating, compressing blob store with optional disk spill
+
+    Args:
+        compression: 'zstd', 'zlib' or 'off' (defaults to zstd when
+            zstandard is installed, zlib otherwise)
+        max_memory: Compressed bytes kept in memory before spilling
+        spill_dir: Directory for spilled blobs (None keeps all in memory)
+
+    Example:
+        >>> store = BlobStore()
+        >>> key = store.put(text.encode())
+        >>> store.get(key).decode() == text
+        True
+    """
+
+    def __init__(
+        self,
+        compression: Optional[str] = None,
+        max_memory: int = 64 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+    ):
+        compression = compression or COMPRESSION
+        if compression not in ("zstd", "zlib", "off"):
+            raise ValueError(f"Unknown compression '{compression}'")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.compression = compression
+        self.max_memory = max_memory
+        self.spill_dir = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix="blobs-", dir=spill_dir)
+            weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._on_disk: Dict[str, int] = {}
+        self.memory_bytes = 0
+        self.raw_bytes = 0
+        self.puts = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes) -> str:
+        """Store data (once per content); returns its key"""
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.puts += 1
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return key
+            if key in self._on_disk:
+                return key
+        stored = self._encode(data)
+        with self._lock:
+            if key not in self._memory and key not in self._on_disk:
+                self._memory[key] = stored
+                self.memory_bytes += len(stored)
+                self.raw_bytes += len(data)
+                self._spill()
+        return key
+
+    def get(self, key: str) -> bytes:
+        """
+        Content stored under key
+
+        Raises:
+            KeyError: If the key is unknown
+        """
+        with self._lock:
+            stored = self._memory.get(key)
+            if stored is not None:
+                self._memory.move_to_end(key)
+            elif key not in self._on_disk:
+                raise KeyError(key)
+        if stored is None:
+            with open(self._path(key), "rb") as f:
+                stored = f.read()
+        return self._decode(stored)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._on_disk
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._memory) + len(self._on_disk)
+
+    def stats(self) -> Dict[str, Any]:
+        """Blob count, bytes before/after compression and in memory/on disk"""
+        with self._lock:
+            return {
+                "blobs": len(self._memory) + len(self._on_disk),
+                "puts": self.puts,
+                "raw_bytes": self.raw_bytes,
+                "memory_bytes": self.memory_bytes,
+                "disk_bytes": sum(self._on_disk.values()),
+                "compression": self.compression,
+            }
+
+    def _spill(self) -> None:
+        """Move least recently used blobs to disk (called under the lock)"""
+        if not self.spill_dir:
+            return
+        while self.memory_bytes > self.max_memory and len(self._memory) > 1:
+            key, stored = self._memory.popitem(last=False)
+            path = self._path(key)
+            # Write and rename, so a concurrent reader never sees half a blob
+            fd, tmp = tempfile.mkstemp(dir=self.spill_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(stored)
+            os.replace(tmp, path)
+            self._on_disk[key] = len(stored)
+            self.memory_bytes -= len(stored)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key)
+
+    def _encode(self, data: bytes) -> bytes:
+        if self.compression == "off" or len(data) < MIN_COMPRESS_SIZE:
+            return _RAW + data
+        if self.compression == "zstd":
+            compressed = _ZSTD + self._zstd("compressor").compress(data)
+        else:
+            compressed = _ZLIB + zlib.compress(data, 1)
+        return compressed if len(compressed) < len(data) + 1 else _RAW + data
+
+    def _decode(self, stored: bytes) -> bytes:
+        tag, body = stored[:1], stored[1:]
+        if tag == _ZSTD:
+            return self._zstd("decompressor").decompress(body)
+        if tag == _ZLIB:
+            return zlib.decompress(body)
+        return body
+
+    def _zstd(self, kind: str):
+        """Per-thread zstd (de)compressor; the objects are not thread-safe"""
+        codec = getattr(self._local, kind, None)
+        if codec is None:
+            if kind == "compressor":
+                codec = zstandard.ZstdCompressor(level=3)
+            else:
+                codec = zstandard.ZstdDecompressor()
+            setattr(self._local, kind, codec)
+        return codec
@@ -0,0 +1,244 @@
+"""
+Circuit breaker for the model backends
+
+When a model server is down, every call would otherwise wait for a
+connection error or a timeout. A ``CircuitBreaker`` per provider tracks
+consecutive backend failures and moves through three states:
+
+- closed:    calls go through; ``failure_threshold`` consecutive failures
+  open the breaker
+- open:      calls are rejected immediately with ``CircuitOpenError``
+  for ``recovery_timeout`` seconds
+- half-open: up to ``half_open_calls`` trial calls go through; a success
+  closes the breaker, a failure opens it again
+
+Only failures of the backend count (connection errors, timeouts, 5xx
+answers). A cancelled request (see src/utils/deadline.py) says nothing
+about the backend and leaves the state as it was.
+
+Thresholds come from BREAKER_FAILURE_THRESHOLD, BREAKER_RECOVERY_TIMEOUT
+and BREAKER_HALF_OPEN_CALLS.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from .deadline import RequestCancelled
+from .metrics import counter, gauge
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state per backend (0 closed, 1 half-open, 2 open)",
+    ["breaker"],
+)
+BREAKER_TRANSITIONS = counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes by the state entered",
+    ["breaker", "state"],
+)
+BREAKER_REJECTIONS = counter(
+    "circuit_breaker_rejections_total",
+    "Calls rejected without reaching the backend",
+    ["breaker"],
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            f"Model backend '{name}' is unavailable; retry in {retry_after:.0f}s"
+        )
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """
+    Whether an exception means the backend is failing
+
+    Connection problems, timeouts and server errors count; bad requests
+    (e.g. an unknown model, 4xx) and cancellations do not.
+    """
+    if isinstance(error, RequestCancelled):
+        return False
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(error, (ConnectionError, TimeoutError, OSError)):
+        return True
+    # httpx transport errors do not derive from the builtin ones
+    return type(error).__module__.split(".")[0] in ("httpx", "httpcore")
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker around calls to one backend
+
+    Args:
+        name: Backend label (provider name)
+        failure_threshold: Consecutive failures that open the breaker
+        recovery_timeout: Seconds the breaker stays open before trial calls
+        half_open_calls: Trial calls allowed at once while half-open
+
+    Example:
+        >>> breaker = get_breaker("ollama")
+        >>> with breaker.call():
+        ...     response = model.invoke(messages)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, breaker=name)
+
+    def _transition(self, state: str) -> None:
+        """Enter a state (called under the lock)"""
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self.trials = 0
+        BREAKER_STATE.set(STATE_VALUES[state], breaker=self.name)
+        BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+
+    def retry_after(self) -> float:
+        """Seconds until trial calls are allowed (0 unless open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def check(self) -> None:
+        """
+        Raise CircuitOpenError while open, without reserving a call
+
+        Lets callers skip setup work (creating clients, building prompts)
+        for a backend they would not be allowed to call anyway.
+        """
+        with self._lock:
+            retry_after = self.retry_after()
+        if retry_after > 0.0:
+            BREAKER_REJECTIONS.inc(breaker=self.name)
+            raise CircuitOpenError(self.name, retry_after)
+
+    def allow(self) -> bool:
+        """
+        Reserve permission for one call
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with
+                all trial calls taken
+
+        Returns:
+            True when the call is a half-open trial
+        """
+        with self._lock:
+            if self.state == OPEN and self.retry_after() == 0.0:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self.trials < self.half_open_calls:
+                self.trials += 1
+                return True
+            retry_after = self.retry_after() or 1.0
+        BREAKER_REJECTIONS.inc(breaker=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        """A call reached the backend and got an answer"""
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """A call failed because of the backend"""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.failures >= self.failure_threshold
+            ):
+                self._transition(OPEN)
+
+    def release_trial(self) -> None:
+        """A half-open trial ended without a verdict (e.g. cancelled)"""
+        with self._lock:
+            if self.state == HALF_OPEN and self.trials > 0:
+                self.trials -= 1
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        """Guard one backend call: reject fast when open, record the outcome"""
+        trial = self.allow()
+        try:
+            yield
+        except BaseException as e:
+            if is_backend_failure(e):
+                self.record_failure()
+            elif trial:
+                self.release_trial()
+            raise
+        self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state, for /health"""
+        with self._lock:
+            if self.state == OPEN and self.retry_after() == 0.0:
+                state = HALF_OPEN
+            else:
+                state = self.state
+            return {
+                "state": state,
+                "consecutive_failures": self.failures,
+                "retry_after": round(self.retry_after(), 1),
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker shared by every call to a backend, created on first use"""
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+                recovery_timeout=float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30")),
+                half_open_calls=int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1")),
+            )
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """State of every breaker in this process"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
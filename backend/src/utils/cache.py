@@ -0,0 +1,409 @@
+"""
+Analysis result cache with in-flight coalescing
+
+Identical analysis requests (same text, model and options) are answered
+from a cache, and concurrent identical requests run the workflow once.
+The backend is chosen with the RESULT_CACHE environment variable:
+
+- ``memory``: per-process LRU (default; fine for a single worker)
+- ``sqlite``: SQLite file (RESULT_CACHE_PATH) shared by every worker
+  process on the host, used by the multi-worker mode
+- ``off``:    no caching; in-process coalescing still applies
+
+Coalescing works at two levels. Inside a process, followers wait on the
+leader's future. Across processes (sqlite backend), the leader holds a
+lease row while it computes and the other workers poll for its result,
+taking over if the lease expires (e.g. the leader's process died).
+Followers also take over when the leader's request is cancelled (see
+src/utils/deadline.py), and stop waiting when their own request is.
+
+A follower never waits behind a less urgent leader (priority.py): it
+promotes the leader's remaining model calls to its own class. Background
+leaders take no cross-process lease, as a follower in another worker
+could not promote them; such a follower computes the value itself.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .deadline import RequestCancelled, check_deadline
+from .metrics import counter
+from .priority import BACKGROUND, Promotion, current_priority, promotable
+
+CACHE_REQUESTS = counter(
+    "result_cache_requests_total",
+    "Analysis requests by cache outcome (hit, miss or coalesced)",
+    ["outcome"],
+)
+CACHE_PROMOTIONS = counter(
+    "result_cache_promotions_total",
+    "In-flight computations raised to a joining request's priority class",
+    ["priority"],
+)
+
+DEFAULT_TTL = 3600.0
+DEFAULT_LEASE_SECONDS = 120.0
+POLL_INTERVAL = 0.05
+
+
+def cache_key(**params) -> str:
+    """
+    Stable key for a set of analysis parameters
+
+    Example:
+        >>> cache_key(text="Hello", model_name="llama3.2", provider="ollama")
+        '5d1c...'
+    """
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Base class for result stores
+
+    The default implementation stores nothing and grants every claim,
+    which is the ``off`` backend.
+    """
+
+    name = "off"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached value for a key, or None"""
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a value"""
+
+    def claim(self, key: str) -> bool:
+        """Try to become the process computing a key"""
+        return True
+
+    def release(self, key: str) -> None:
+        """Give up a claim taken with claim()"""
+
+    def clear(self) -> None:
+        """Drop every entry"""
+
+
+class MemoryResultCache(ResultCache):
+    """Per-process LRU with a time to live"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResultCache(ResultCache):
+    """
+    Result store shared between processes through a SQLite file
+
+    WAL mode lets readers proceed while a worker writes. Each thread gets
+    its own connection, as sqlite3 connections must not be shared across
+    threads.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        ttl: float = DEFAULT_TTL,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires REAL NOT NULL
+                );
+                """)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT value FROM results WHERE key = ? AND expires >= ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                # Amortized eviction: expired rows, then the oldest overflow
+                connection.execute("DELETE FROM results WHERE expires < ?", (now,))
+                connection.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results "
+                    "ORDER BY expires LIMIT max(0, (SELECT count(*) FROM results) - ?))",
+                    (self.max_entries,),
+                )
+
+    def claim(self, key: str) -> bool:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM leases WHERE key = ? AND expires < ?", (key, now)
+            )
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.lease_seconds),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key: str) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner)
+            )
+
+    def clear(self) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM results")
+            connection.execute("DELETE FROM leases")
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+# Key -> (leader's future, leader's promotion handle)
+_inflight: Dict[str, Tuple[Future, Promotion]] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Process-wide result cache configured from the environment
+
+    RESULT_CACHE selects the backend (memory, sqlite or off),
+    RESULT_CACHE_PATH the SQLite file and RESULT_CACHE_TTL the entry
+    lifetime in seconds.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = os.getenv("RESULT_CACHE", "memory").lower()
+            ttl = float(os.getenv("RESULT_CACHE_TTL", str(DEFAULT_TTL)))
+            if backend == "memory":
+                _cache = MemoryResultCache(ttl=ttl)
+            elif backend == "sqlite":
+                path = os.getenv("RESULT_CACHE_PATH") or os.path.join(
+                    tempfile.gettempdir(), "text-analysis-cache.sqlite3"
+                )
+                _cache = SQLiteResultCache(path, ttl=ttl)
+            elif backend == "off":
+                _cache = ResultCache()
+            else:
+                raise ValueError(
+                    f"Unknown RESULT_CACHE backend: {backend}. "
+                    "Available: ['memory', 'sqlite', 'off']"
+                )
+        return _cache
+
+
+def is_inflight(key: str) -> bool:
+    """Whether this process is computing a key right now"""
+    with _inflight_lock:
+        return key in _inflight
+
+
+def is_promoted(key: str) -> bool:
+    """Whether a request joined this process's computation of a key and raised it"""
+    with _inflight_lock:
+        entry = _inflight.get(key)
+    return entry is not None and entry[1].priority is not None
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Dict[str, Any]],
+    cacheable: Callable[[Dict[str, Any]], bool] = lambda value: True,
+    cache: Optional[ResultCache] = None,
+    wait_timeout: float = DEFAULT_LEASE_SECONDS,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Return the cached value for a key, computing it at most once
+
+    Args:
+        key: Cache key (see cache_key)
+        compute: Produces the value on a miss
+        cacheable: Whether a computed value may be stored (e.g. not errors)
+        cache: Store to use (defaults to get_result_cache())
+        wait_timeout: Longest time to wait for another worker's result
+            before computing it here
+
+    Returns:
+        Tuple of (value, outcome) with outcome 'hit', 'miss' or 'coalesced'
+
+    A request joining a less urgent computation in this process raises
+    that computation to its own priority class.
+    """
+    cache = cache or get_result_cache()
+    value = cache.get(key)
+    if value is not None:
+        CACHE_REQUESTS.inc(outcome="hit")
+        return value, "hit"
+
+    while True:
+        with _inflight_lock:
+            entry = _inflight.get(key)
+            leader = entry is None
+            if leader:
+                entry = _inflight[key] = (Future(), Promotion())
+        future, promotion = entry
+        if leader:
+            break
+        priority = current_priority()
+        if promotion.promote(priority):
+            CACHE_PROMOTIONS.inc(priority=priority)
+        try:
+            value = _wait(future, wait_timeout)
+        except RequestCancelled:
+            # The leader's request was cancelled, not this one: take over
+            check_deadline("cache_wait")
+            continue
+        if value is None:
+            # The leader is too slow: compute here without waiting
+            CACHE_REQUESTS.inc(outcome="miss")
+            return compute(), "miss"
+        CACHE_REQUESTS.inc(outcome="coalesced")
+        return value, "coalesced"
+
+    try:
+        with promotable(promotion):
+            if promotion.base == BACKGROUND:
+                value, outcome = _compute_unleased(compute, cacheable, cache, key)
+            else:
+                value, outcome = _compute_once(
+                    key, compute, cacheable, cache, wait_timeout
+                )
+        future.set_result(value)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+    CACHE_REQUESTS.inc(outcome=outcome)
+    return value, outcome
+
+
+def _wait(future: Future, timeout: float) -> Optional[Dict[str, Any]]:
+    """
+    Wait for the leader's result, giving up if this request is cancelled
+
+    Returns None when the leader has not finished within the timeout.
+    """
+    give_up = time.monotonic() + timeout
+    while True:
+        try:
+            return future.result(
+                timeout=min(0.25, max(0.0, give_up - time.monotonic()))
+            )
+        except FutureTimeout:
+            check_deadline("cache_wait")
+            if time.monotonic() >= give_up:
+                return None
+
+
+def _compute_unleased(compute, cacheable, cache, key):
+    """Compute without holding the cross-process lease (background leaders)"""
+    value = compute()
+    if cacheable(value):
+        cache.set(key, value)
+    return value, "miss"
+
+
+def _compute_once(key, compute, cacheable, cache, wait_timeout):
+    """Compute under a cross-process lease, or wait for the lease holder"""
+    deadline = time.monotonic() + wait_timeout
+    waited = False
+    while True:
+        if cache.claim(key):
+            try:
+                # The previous lease holder may have stored the result
+                value = cache.get(key) if waited else None
+                if value is not None:
+                    return value, "coalesced"
+                value = compute()
+                if cacheable(value):
+                    cache.set(key, value)
+            finally:
+                cache.release(key)
+            return value, "miss"
+
+        value = cache.get(key)
+        if value is not None:
+            return value, "coalesced"
+        if time.monotonic() >= deadline:
+            # The lease holder is too slow: compute here without waiting
+            return compute(), "miss"
+        check_deadline("cache_wait")
+        waited = True
+        time.sleep(POLL_INTERVAL)
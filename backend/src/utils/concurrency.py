@@ -0,0 +1,386 @@
+"""
+Adaptive per-model concurrency limits for LLM calls
+
+How many generations a model server handles well in parallel depends on
+the model size and the host, so the limit is learned instead of
+configured. Each model (provider and name) gets an ``AdaptiveLimiter``
+that follows the gradient algorithm of Netflix's concurrency-limits
+(Gradient2), with generation speed in place of round-trip time:
+
+- every finished call reports its speed: output tokens per second, or
+  characters per second for backends that do not report usage
+- a short-term average of the speed is compared with a long-term
+  baseline, which approximates the speed of an unloaded server: it rises
+  quickly with faster calls and sinks only slowly
+- while the short-term speed stays within ``tolerance`` of the long-term
+  one, the gradient is 1 and the limit grows by a small queue allowance;
+  when calls slow down, the gradient drops below 1 and the limit shrinks
+  in proportion
+- the limit only grows while it is actually used (at least half of it
+  in flight), so an idle server does not accumulate a limit it never
+  tested
+
+Callers above the limit wait (honouring the request deadline) in one
+queue per priority class (see priority.py). A freed slot goes to the
+class with the smallest virtual time, which advances by 1/weight for
+every call a class starts (stride scheduling), so with the default
+weights ``interactive=8,batch=2,background=1`` interactive calls get 8
+of every 11 slots while all classes wait, and a lone class gets them
+all. While interactive calls have been seen within the last
+LLM_RESERVE_WINDOW seconds (default 30), the last
+LLM_INTERACTIVE_RESERVE slots (default 2) are kept for them, so an
+arriving interactive call does not wait for a bulk generation to end;
+without interactive traffic, bulk work soaks up every slot.
+
+The mode is chosen with LLM_CONCURRENCY: ``adaptive`` (default), a fixed number, or
+``off``. Limits are per process; with several workers each one learns
+its share, and the gauges in /metrics add up to the total.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+from .deadline import check_deadline
+from .metrics import gauge, histogram
+from .priority import INTERACTIVE, PRIORITIES, current_priority
+
+LIMIT = gauge(
+    "llm_concurrency_limit",
+    "Current concurrency limit for LLM calls per model",
+    ["model"],
+)
+INFLIGHT = gauge(
+    "llm_inflight_requests",
+    "LLM calls currently running per model",
+    ["model"],
+)
+QUEUE_WAIT = histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM calls waited for a concurrency slot, by priority class",
+    ["model", "priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+
+QUEUED = gauge(
+    "llm_queued_requests",
+    "LLM calls waiting for a concurrency slot, by priority class",
+    ["model", "priority"],
+)
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MAX_LIMIT = 32
+DEFAULT_WEIGHTS = {"interactive": 8.0, "batch": 2.0, "background": 1.0}
+
+
+class AdaptiveLimiter:
+    """
+    Gradient concurrency limit driven by per-call generation speed
+
+    Args:
+        name: Model label for metrics
+        initial_limit: Starting limit
+        min_limit: Lowest limit (at least one call always runs)
+        max_limit: Highest limit
+        tolerance: Slowdown accepted before backing off (1.25 lets calls
+            run at 80% of the unloaded speed)
+        smoothing: Weight of each new limit estimate
+        long_window: Seconds over which the baseline sinks to slower
+            speeds (time based, so busy servers do not drift faster)
+        fixed: Keep the limit at initial_limit (no adaptation)
+        weights: Share of the slots per priority class while several wait
+        reserve: Slots only interactive calls may take (other classes
+            can always run at least one call)
+        reserve_window: Seconds the reserve is held after the last
+            interactive call
+
+    Example:
+        >>> limiter = AdaptiveLimiter("ollama:llama3.2")
+        >>> with limiter.acquire() as call:
+        ...     response = model.invoke(messages)
+        ...     call.observe(tokens=42)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        tolerance: float = 1.25,
+        smoothing: float = 0.2,
+        long_window: float = 300.0,
+        fixed: bool = False,
+        weights: Optional[Dict[str, float]] = None,
+        reserve: int = 2,
+        reserve_window: float = 30.0,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.fixed = fixed
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.inflight = 0
+        self.samples = 0
+        self.short_speed: Optional[float] = None
+        self.long_speed: Optional[float] = None
+        self.long_window = long_window
+        self._last_sample = time.monotonic()
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.reserve = reserve
+        self.reserve_window = reserve_window
+        self._interactive_seen = -math.inf
+        self._waiting: Dict[str, deque] = {p: deque() for p in PRIORITIES}
+        self._pass = {p: 0.0 for p in PRIORITIES}
+        self._clock = 0.0
+        self._condition = threading.Condition()
+        LIMIT.set(self.limit, model=name)
+
+    @contextmanager
+    def acquire(self) -> Iterator["LimiterCall"]:
+        """
+        Hold a concurrency slot for one call
+
+        Waits in the queue of the current priority class while the limit
+        is reached, checking the request deadline so a cancelled request
+        leaves the queue. A call whose computation is promoted while it
+        waits (see priority.promotable) moves to the promoted class's queue.
+
+        Raises:
+            RequestCancelled: If the request is cancelled while waiting
+        """
+        priority = current_priority()
+        start = time.perf_counter()
+        ticket = object()
+        with self._condition:
+            self._enqueue(priority, ticket)
+            try:
+                while not self._is_next(priority, ticket):
+                    check_deadline("llm_queue")
+                    self._condition.wait(timeout=0.1)
+                    promoted = current_priority()
+                    if promoted != priority:
+                        self._dequeue(priority, ticket)
+                        priority = promoted
+                        self._enqueue(priority, ticket)
+            finally:
+                self._dequeue(priority, ticket)
+                self._condition.notify_all()
+            self._clock = self._pass[priority]
+            self._pass[priority] += 1.0 / self.weights[priority]
+            self.inflight += 1
+            inflight = self.inflight
+        INFLIGHT.inc(model=self.name)
+        QUEUE_WAIT.observe(
+            time.perf_counter() - start, model=self.name, priority=priority
+        )
+
+        call = LimiterCall(self, inflight)
+        try:
+            yield call
+        finally:
+            with self._condition:
+                self.inflight -= 1
+                if call.speed is not None:
+                    self._update(call.speed, call.inflight)
+                self._condition.notify_all()
+            INFLIGHT.dec(model=self.name)
+
+    def _enqueue(self, priority: str, ticket: object) -> None:
+        """Queue a waiting call in its class (called under the lock)"""
+        waiting = self._waiting[priority]
+        if not waiting:
+            # A class that was idle starts at the current virtual time
+            # instead of spending the credit it did not use
+            self._pass[priority] = max(self._pass[priority], self._clock)
+        waiting.append(ticket)
+        if priority == INTERACTIVE:
+            self._interactive_seen = time.monotonic()
+        QUEUED.inc(model=self.name, priority=priority)
+
+    def _dequeue(self, priority: str, ticket: object) -> None:
+        """Remove a waiting call from its class (called under the lock)"""
+        self._waiting[priority].remove(ticket)
+        QUEUED.dec(model=self.name, priority=priority)
+
+    def _capacity(self, priority: str) -> int:
+        """Slots a priority class may fill (called under the lock)"""
+        limit = int(self.limit)
+        if (
+            priority == INTERACTIVE
+            or time.monotonic() - self._interactive_seen > self.reserve_window
+        ):
+            return limit
+        return max(1, limit - self.reserve)
+
+    def _is_next(self, priority: str, ticket: object) -> bool:
+        """
+        Whether the call holding ticket may start (called under the lock)
+
+        It must be first in its class, the class must be below its
+        capacity, and no other class that could start has a smaller
+        virtual time (ties go to the more urgent class).
+        """
+        if self._waiting[priority][0] is not ticket:
+            return False
+        if self.inflight >= self._capacity(priority):
+            return False
+        rank = (self._pass[priority], PRIORITIES.index(priority))
+        for other in PRIORITIES:
+            if (
+                other != priority
+                and self._waiting[other]
+                and self.inflight < self._capacity(other)
+                and (self._pass[other], PRIORITIES.index(other)) < rank
+            ):
+                return False
+        return True
+
+    def _update(self, speed: float, inflight: int) -> None:
+        """Fold one speed sample into the limit (called under the lock)"""
+        self.samples += 1
+        now = time.monotonic()
+        elapsed, self._last_sample = now - self._last_sample, now
+        if self.short_speed is None:
+            self.short_speed = self.long_speed = speed
+            return
+        self.short_speed += 0.3 * (speed - self.short_speed)
+        # The baseline follows faster calls quickly and slower ones only
+        # over the long window, so sustained overload does not become the
+        # new normal before the limit has reacted to it
+        if speed > self.long_speed:
+            self.long_speed += 0.1 * (speed - self.long_speed)
+        else:
+            decay = 1.0 - math.exp(-elapsed / self.long_window)
+            self.long_speed += decay * (speed - self.long_speed)
+        if self.fixed:
+            return
+        # Grow only when the limit is being used
+        if inflight < self.limit / 2:
+            return
+
+        gradient = min(
+            1.0, max(0.5, self.tolerance * self.short_speed / self.long_speed)
+        )
+        queue = max(1.0, math.log10(self.limit))
+        estimate = self.limit * gradient + queue
+        limit = self.limit * (1 - self.smoothing) + estimate * self.smoothing
+        self.limit = min(float(self.max_limit), max(float(self.min_limit), limit))
+        LIMIT.set(self.limit, model=self.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state, for /api/concurrency"""
+        with self._condition:
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "samples": self.samples,
+                "short_speed": self.short_speed and round(self.short_speed, 2),
+                "long_speed": self.long_speed and round(self.long_speed, 2),
+                "mode": "fixed" if self.fixed else "adaptive",
+                "waiting": {p: len(w) for p, w in self._waiting.items()},
+            }
+
+
+class LimiterCall:
+    """One call holding a slot; reports its speed with observe()"""
+
+    __slots__ = ("limiter", "inflight", "started", "speed")
+
+    def __init__(self, limiter: AdaptiveLimiter, inflight: int):
+        self.limiter = limiter
+        self.inflight = inflight
+        self.started = time.perf_counter()
+        self.speed: Optional[float] = None
+
+    def observe(self, tokens: float, seconds: Optional[float] = None) -> None:
+        """
+        Report the amount generated
+
+        Args:
+            tokens: Output tokens (or characters) produced
+            seconds: Generation time (defaults to the time since acquire)
+        """
+        if seconds is None:
+            seconds = time.perf_counter() - self.started
+        if tokens > 0 and seconds > 0:
+            self.speed = tokens / seconds
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: Optional[str], model_name: str) -> Optional[AdaptiveLimiter]:
+    """
+    Limiter shared by every call to a model, or None when disabled
+
+    Configured with LLM_CONCURRENCY ('adaptive', a fixed number or 'off'),
+    LLM_CONCURRENCY_INITIAL, LLM_CONCURRENCY_MAX, LLM_PRIORITY_WEIGHTS
+    ('interactive=8,batch=2,background=1'), LLM_INTERACTIVE_RESERVE and
+    LLM_RESERVE_WINDOW.
+    """
+    mode = os.getenv("LLM_CONCURRENCY", "adaptive").lower()
+    if mode == "off":
+        return None
+    name = f"{provider or 'default'}:{model_name}"
+    limiter = _limiters.get(name)
+    if limiter is not None:
+        return limiter
+
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            fixed = mode != "adaptive"
+            initial = int(
+                mode
+                if fixed
+                else os.getenv("LLM_CONCURRENCY_INITIAL", DEFAULT_INITIAL_LIMIT)
+            )
+            limiter = _limiters[name] = AdaptiveLimiter(
+                name,
+                initial_limit=initial,
+                max_limit=max(
+                    initial, int(os.getenv("LLM_CONCURRENCY_MAX", DEFAULT_MAX_LIMIT))
+                ),
+                fixed=fixed,
+                weights=priority_weights(),
+                reserve=int(os.getenv("LLM_INTERACTIVE_RESERVE", "2")),
+                reserve_window=float(os.getenv("LLM_RESERVE_WINDOW", "30")),
+            )
+    return limiter
+
+
+def priority_weights() -> Dict[str, float]:
+    """
+    Weights from LLM_PRIORITY_WEIGHTS, e.g. 'interactive=8,batch=2'
+
+    Classes not listed keep their default weight.
+
+    Raises:
+        ValueError: If an entry names an unknown class or a weight that
+            is not positive
+    """
+    weights = {}
+    for entry in os.getenv("LLM_PRIORITY_WEIGHTS", "").split(","):
+        if not entry.strip():
+            continue
+        name, _, value = entry.partition("=")
+        name = name.strip().lower()
+        if name not in PRIORITIES or float(value) <= 0:
+            raise ValueError(f"Invalid LLM_PRIORITY_WEIGHTS entry '{entry}'")
+        weights[name] = float(value)
+    return weights
+
+
+def limiter_snapshots() -> Dict[str, Dict[str, Any]]:
+    """State of every model's limiter in this process"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
@@ -0,0 +1,151 @@
+"""
+Request deadlines and cooperative cancellation
+
+A ``Deadline`` is attached to the current context with ``deadline_scope``
+and travels with it: contextvars are copied into the threadpool that runs
+the workflow and into the threads LangGraph runs nodes on, so nodes and
+LLM calls can find it with ``current_deadline()`` without it being passed
+through every signature.
+
+Work is cancelled cooperatively. Nothing is interrupted preemptively;
+instead:
+
+- nodes call ``check_deadline(stage)`` between steps
+- LLM generations are streamed and the deadline is checked after every
+  chunk; closing the stream closes the HTTP connection, which makes
+  Ollama stop generating
+
+Either raises ``RequestCancelled`` once the deadline has passed or the
+deadline was cancelled (e.g. the client disconnected). Each cancelled
+deadline is counted once in ``cancelled_requests_total``.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from .log import record
+from .metrics import counter
+
+CANCELLED_REQUESTS = counter(
+    "cancelled_requests_total",
+    "Requests whose remaining work was abandoned, by reason (deadline or "
+    "disconnect) and the stage that noticed",
+    ["reason", "stage"],
+)
+
+
+class RequestCancelled(Exception):
+    """Raised when the work for a request is no longer wanted"""
+
+    def __init__(self, reason: str, stage: str):
+        super().__init__(f"Request cancelled ({reason}) during {stage}")
+        self.reason = reason
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Expiry time plus an explicit cancellation flag
+
+    Args:
+        timeout: Seconds from now until expiry (None for no time limit)
+        parent: Enclosing deadline; cancelling or expiring it also
+            cancels this one
+    """
+
+    __slots__ = ("expires_at", "parent", "_reason", "_counted", "_lock")
+
+    def __init__(self, timeout: Optional[float] = None, parent: "Deadline" = None):
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+        self.parent = parent
+        self._reason: Optional[str] = None
+        self._counted = False
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a time limit"""
+        remaining = None
+        if self.expires_at is not None:
+            remaining = max(0.0, self.expires_at - time.monotonic())
+        if self.parent is not None:
+            outer = self.parent.remaining()
+            if outer is not None:
+                remaining = outer if remaining is None else min(remaining, outer)
+        return remaining
+
+    def cancel(self, reason: str = "disconnect") -> None:
+        """Cancel explicitly; the first reason given is kept"""
+        with self._lock:
+            if self._reason is None:
+                self._reason = reason
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why the work should stop ('deadline', 'disconnect'...) or None"""
+        if self._reason is not None:
+            return self._reason
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            return "deadline"
+        return self.parent.reason if self.parent is not None else None
+
+    def check(self, stage: str) -> None:
+        """
+        Raise RequestCancelled if the work should stop
+
+        Args:
+            stage: Where the check happens (reported in metrics and logs)
+        """
+        reason = self.reason
+        if reason is None:
+            return
+        with self._lock:
+            first = not self._counted
+            self._counted = True
+        if first:
+            CANCELLED_REQUESTS.inc(reason=reason, stage=stage)
+            record(cancelled=reason, cancelled_stage=stage)
+        raise RequestCancelled(reason, stage)
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being processed, if any"""
+    return _current.get()
+
+
+def check_deadline(stage: str) -> None:
+    """Raise RequestCancelled if the current request's work should stop"""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+@contextmanager
+def deadline_scope(
+    timeout: Optional[float] = None, deadline: Optional[Deadline] = None
+) -> Iterator[Deadline]:
+    """
+    Make a deadline current for the duration of the block
+
+    Args:
+        timeout: Seconds allowed; nested inside an active deadline the
+            earlier of the two applies
+        deadline: Use this deadline instead of creating one (e.g. one the
+            API cancels when the client disconnects)
+
+    Example:
+        >>> with deadline_scope(30):
+        ...     run_workflow(text)  # raises RequestCancelled after 30s
+    """
+    if deadline is None:
+        deadline = Deadline(timeout, parent=_current.get())
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
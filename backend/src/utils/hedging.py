@@ -0,0 +1,324 @@
+"""
+Hedged LLM requests across model server replicas
+
+On CPU-only Ollama hosts a single generation can stall (queued behind
+long prompts, a model reload, a busy host) and push the tail latency past
+the frontend's timeout. With LLM_HEDGING=on and several replicas in
+OLLAMA_REPLICAS, a call that has not produced its first token within a
+delay is duplicated to another replica:
+
+- the delay is the HEDGE_PERCENTILE (default 95th) percentile of recent
+  times to first token for the same model and task, so only the slowest
+  few percent of calls are hedged; until HEDGE_MIN_SAMPLES calls have
+  been seen, HEDGE_INITIAL_DELAY is used
+- the first attempt to produce a token wins and the other is abandoned:
+  its stream is closed at its next chunk, which closes the connection so
+  that replica stops generating
+- at most HEDGE_BUDGET (default 10%) of calls are hedged, so a cluster
+  where every call is slow (overload) does not get twice the load
+- an attempt that fails before producing a token is retried on another
+  replica at once, without waiting for the delay
+
+/metrics has the time to first token (llm_first_token_seconds), the calls
+eligible for hedging (llm_hedge_calls_total), the hedges sent by winner
+(llm_hedges_total), hedges refused by the budget
+(llm_hedges_skipped_total) and the time abandoned attempts ran
+(llm_hedge_wasted_seconds_total), i.e. the extra load.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextvars import copy_context
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .deadline import check_deadline
+from .metrics import counter, histogram
+
+FIRST_TOKEN_SECONDS = histogram(
+    "llm_first_token_seconds",
+    "Time until an LLM call produced its first token",
+    ["task"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
+HEDGE_CALLS = counter(
+    "llm_hedge_calls_total",
+    "LLM calls made with hedging enabled",
+    ["task"],
+)
+HEDGES = counter(
+    "llm_hedges_total",
+    "Duplicate LLM requests sent to another replica, by the attempt that won "
+    "(primary, hedge or none when both failed)",
+    ["task", "winner"],
+)
+HEDGES_SKIPPED = counter(
+    "llm_hedges_skipped_total",
+    "Hedges not sent because the hedge budget was used up",
+    ["task"],
+)
+HEDGE_WASTED_SECONDS = counter(
+    "llm_hedge_wasted_seconds_total",
+    "Seconds abandoned attempts ran before they were cancelled",
+    ["task"],
+)
+
+POLL_INTERVAL = 0.1
+# Hedges that may be sent in a burst after a quiet period
+MAX_BUDGET_CREDITS = 5.0
+
+
+def hedging_enabled() -> bool:
+    """Whether LLM_HEDGING is on (off by default)"""
+    return os.getenv("LLM_HEDGING", "off").lower() in ("on", "true", "1")
+
+
+class HedgePolicy:
+    """
+    When to hedge the calls of one model and task
+
+    Args:
+        percentile: Percentile of recent times to first token used as delay
+        initial_delay: Delay while fewer than min_samples calls were seen
+        min_delay: Lower bound on the delay
+        min_samples: Samples needed before the percentile is trusted
+        window: Recent samples kept
+        budget: Fraction of calls that may be hedged
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay: float = 5.0,
+        min_delay: float = 0.2,
+        min_samples: int = 20,
+        window: int = 200,
+        budget: float = 0.1,
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget = budget
+        self.samples: "deque[float]" = deque(maxlen=window)
+        self.credits = 1.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait for a first token before hedging"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def observe(self, seconds: float) -> None:
+        """Record the time to first token of a call"""
+        with self._lock:
+            self.samples.append(seconds)
+
+    def start_call(self) -> None:
+        """Earn the budget share of one call"""
+        with self._lock:
+            self.credits = min(MAX_BUDGET_CREDITS, self.credits + self.budget)
+
+    def take_hedge(self) -> bool:
+        """Spend budget for one hedge; False when it is used up"""
+        with self._lock:
+            if self.credits < 1.0:
+                return False
+            self.credits -= 1.0
+            return True
+
+
+class _Attempt:
+    """One generation running in a thread, reporting into a shared queue"""
+
+    def __init__(self, model, messages, events: "queue.Queue", kind: str):
+        self.kind = kind
+        self.abandon = threading.Event()
+        self.started = time.monotonic()
+        # Copy the context so logs keep the request ID
+        thread = threading.Thread(
+            target=copy_context().run,
+            args=(self._run, model, messages, events),
+            name=f"llm-{kind}",
+            daemon=True,
+        )
+        thread.start()
+
+    def _run(self, model, messages, events: "queue.Queue") -> None:
+        try:
+            stream = model.stream(messages)
+            try:
+                for chunk in stream:
+                    if self.abandon.is_set():
+                        return
+                    events.put((self, "chunk", chunk))
+            finally:
+                stream.close()
+            events.put((self, "done", None))
+        except Exception as e:  # pylint: disable=broad-except
+            events.put((self, "error", e))
+
+
+class HedgedChatModel:
+    """
+    Chat model that hedges slow calls to another replica
+
+    Wraps a model (carrying its task's generation profile) and factories
+    for the same model on other replicas, created only when a hedge is
+    sent.
+
+    Args:
+        primary: Model on the primary replica
+        replicas: Factories returning the model on each other replica
+        policy: The model and task's HedgePolicy
+        task: Generation profile name, for metrics
+
+    Example:
+        >>> model = HedgedChatModel(summary_model, replicas, policy, "summary")
+        >>> for chunk in model.stream(messages): ...
+    """
+
+    def __init__(
+        self,
+        primary,
+        replicas: List[Callable[[], Any]],
+        policy: HedgePolicy,
+        task: str,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.policy = policy
+        self.task = task
+        self._next_replica = 0
+
+    def _replica(self):
+        index = self._next_replica % len(self.replicas)
+        self._next_replica += 1
+        return self.replicas[index]()
+
+    def stream(self, messages) -> Iterator[Any]:
+        """
+        Stream the answer of whichever attempt produces a token first
+
+        Raises:
+            RequestCancelled: If the request is cancelled while no
+                attempt has produced a token
+            Exception: The error of the last attempt when all failed
+        """
+        HEDGE_CALLS.inc(task=self.task)
+        self.policy.start_call()
+        events: "queue.Queue" = queue.Queue()
+        attempts = [_Attempt(self.primary, messages, events, "primary")]
+        hedge_at = time.monotonic() + self.policy.delay()
+        winner: Optional[_Attempt] = None
+        failed = 0
+        try:
+            while True:
+                try:
+                    attempt, kind, payload = events.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    check_deadline("llm_hedge")
+                    if (
+                        winner is None
+                        and len(attempts) == 1
+                        and time.monotonic() >= hedge_at
+                    ):
+                        if self.policy.take_hedge():
+                            attempts.append(self._hedge(messages, events))
+                        else:
+                            HEDGES_SKIPPED.inc(task=self.task)
+                            hedge_at = float("inf")
+                    continue
+
+                if winner is not None and attempt is not winner:
+                    continue
+                if kind == "error":
+                    failed += 1
+                    if winner is not None or failed == len(attempts) == 2:
+                        if len(attempts) == 2:
+                            HEDGES.inc(task=self.task, winner="none")
+                        raise payload
+                    if len(attempts) == 1:
+                        # Fail over at once instead of waiting for the delay
+                        attempts.append(self._hedge(messages, events))
+                    continue
+                if winner is None:
+                    winner = self._win(attempt, attempts)
+                if kind == "done":
+                    return
+                yield payload
+        finally:
+            for attempt in attempts:
+                attempt.abandon.set()
+
+    def _hedge(self, messages, events: "queue.Queue") -> _Attempt:
+        return _Attempt(self._replica(), messages, events, "hedge")
+
+    def _win(self, winner: _Attempt, attempts: List[_Attempt]) -> _Attempt:
+        """Record the first token and abandon the other attempts"""
+        now = time.monotonic()
+        first_token = now - winner.started
+        self.policy.observe(first_token)
+        FIRST_TOKEN_SECONDS.observe(first_token, task=self.task)
+        if len(attempts) > 1:
+            HEDGES.inc(task=self.task, winner=winner.kind)
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.abandon.set()
+                HEDGE_WASTED_SECONDS.inc(now - attempt.started, task=self.task)
+        return winner
+
+    def invoke(self, messages):
+        """Hedged call returning the complete answer"""
+        response = None
+        for chunk in self.stream(messages):
+            response = chunk if response is None else response + chunk
+        return response
+
+
+_policies: Dict[str, HedgePolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_hedge_policy(name: str) -> HedgePolicy:
+    """
+    Policy shared by every call of a model and task, created on first use
+
+    Configured with HEDGE_PERCENTILE, HEDGE_INITIAL_DELAY, HEDGE_MIN_DELAY,
+    HEDGE_MIN_SAMPLES and HEDGE_BUDGET.
+    """
+    with _policies_lock:
+        policy = _policies.get(name)
+        if policy is None:
+            policy = _policies[name] = HedgePolicy(
+                percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+                initial_delay=float(os.getenv("HEDGE_INITIAL_DELAY", "5")),
+                min_delay=float(os.getenv("HEDGE_MIN_DELAY", "0.2")),
+                min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+                budget=float(os.getenv("HEDGE_BUDGET", "0.1")),
+            )
+        return policy
+
+
+def hedged(model, replicas: List[Callable[[], Any]], name: str, task: str):
+    """
+    Wrap a model for hedging, or return it unchanged
+
+    The model is returned as is when hedging is off, there is no other
+    replica or the model cannot stream.
+
+    Args:
+        model: Chat model carrying the task's generation profile
+        replicas: Factories for the model on the other replicas
+        name: Model label ('provider:model') for the policy
+        task: Generation profile name
+    """
+    if not hedging_enabled() or not replicas or not hasattr(model, "stream"):
+        return model
+    return HedgedChatModel(model, replicas, get_hedge_policy(f"{name}:{task}"), task)
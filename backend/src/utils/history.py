@@ -0,0 +1,441 @@
+"""
+Persistent history of finished analyses
+
+Every computed analysis (from /api/analyze, the digest and the CLI) is
+appended to a history store so it can be looked up later instead of
+being recomputed. The backend is chosen with HISTORY_STORE:
+
+- ``sqlite``: SQLite file (HISTORY_PATH) in WAL mode, shared by every
+  worker process on the host (default)
+- ``off``:    nothing is stored
+
+Writes are behind the request path: ``add()`` only puts the entry on a
+bounded queue, and a background thread commits queued entries in batches
+(up to HISTORY_BATCH_SIZE rows per transaction). When the queue is full
+the entry is dropped and counted rather than making the request wait.
+
+Queries page backwards through the rows by id (keyset pagination), so a
+page costs the same however deep it is. The content hash, model,
+sentiment and timestamp columns are indexed; SQLite indexes carry the
+row id, so a filter on any of them also serves the ordering.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .log import current_request_id
+from .metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+HISTORY_RECORDS = counter(
+    "history_records_total",
+    "Analyses sent to the history store by outcome (written, dropped, failed)",
+    ["outcome"],
+)
+HISTORY_BATCH_SECONDS = histogram(
+    "history_batch_seconds",
+    "Time to commit one batch of history records",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / "history.sqlite3"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 0.05
+MAX_PAGE_SIZE = 200
+
+# Columns returned with every entry; the analysis fields come from 'result'
+_COLUMNS = (
+    "id",
+    "created",
+    "content_hash",
+    "source",
+    "request_id",
+    "model",
+    "provider",
+    "sentiment",
+)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a text, the key for finding earlier analyses of it"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class HistoryStore:
+    """
+    Base class for history stores
+
+    The default implementation stores nothing, which is the ``off``
+    backend.
+    """
+
+    name = "off"
+
+    def add(self, entry: Dict[str, Any]) -> bool:
+        """Queue an entry for writing; False if it was dropped"""
+        return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued entries are written; False on timeout"""
+        return True
+
+    def query(
+        self,
+        model: Optional[str] = None,
+        sentiment: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        before: Optional[int] = None,
+        limit: int = 50,
+        include_text: bool = False,
+    ) -> Dict[str, Any]:
+        """Page of entries, newest first (see SQLiteHistoryStore.query)"""
+        return {"items": [], "next_cursor": None}
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """One entry with its input text, or None"""
+        return None
+
+    def close(self) -> None:
+        """Write what is queued and stop the writer"""
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    History in a SQLite file with batched write-behind
+
+    Args:
+        path: Database file
+        batch_size: Most rows committed per transaction
+        queue_size: Entries waiting to be written before new ones are dropped
+        flush_interval: Seconds the writer waits for a batch to fill up
+
+    Example:
+        >>> store = SQLiteHistoryStore("/tmp/history.sqlite3")
+        >>> store.add({"input_text": "...", "model": "llama3.2", ...})
+        >>> store.query(model="llama3.2", limit=20)["items"]
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(queue_size)
+        self._local = threading.local()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+        with self._connect() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY,
+                    created REAL NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    request_id TEXT,
+                    model TEXT,
+                    provider TEXT,
+                    sentiment TEXT,
+                    input_text TEXT NOT NULL,
+                    result TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS analyses_content_hash
+                    ON analyses (content_hash);
+                CREATE INDEX IF NOT EXISTS analyses_model ON analyses (model);
+                CREATE INDEX IF NOT EXISTS analyses_sentiment
+                    ON analyses (sentiment);
+                CREATE INDEX IF NOT EXISTS analyses_created ON analyses (created);
+                """)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _start_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="history-writer", daemon=True
+                )
+                self._writer.start()
+
+    def add(self, entry: Dict[str, Any]) -> bool:
+        """
+        Queue an analysis for writing
+
+        Args:
+            entry: 'input_text', 'model', 'provider', 'source' and the
+                AnalysisResult fields; 'request_id' and 'created' are
+                filled in when missing
+
+        Returns:
+            False if the queue was full or the store closed (the entry is
+            dropped)
+        """
+        if self._closed:
+            return False
+        if self._writer is None:
+            self._start_writer()
+        entry = dict(entry)
+        text = entry.pop("input_text")
+        row = (
+            entry.pop("created", None) or time.time(),
+            content_hash(text),
+            entry.pop("source", "api"),
+            entry.pop("request_id", None) or current_request_id(),
+            entry.pop("model", None),
+            entry.pop("provider", None),
+            entry.get("sentiment"),
+            text,
+            json.dumps(entry),
+        )
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._done(1)
+            HISTORY_RECORDS.inc(outcome="dropped")
+            return False
+        return True
+
+    def _done(self, count: int) -> None:
+        with self._idle:
+            self._pending -= count
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _write_loop(self) -> None:
+        """Commit queued rows in batches until close()"""
+        while True:
+            row = self._queue.get()
+            if row is None:
+                return
+            batch = [row]
+            # Give concurrent requests a moment to join the transaction
+            fill_until = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(
+                        timeout=max(0.0, fill_until - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._write(batch)
+                    return
+                batch.append(row)
+            self._write(batch)
+
+    def _write(self, batch: List[tuple]) -> None:
+        start = time.perf_counter()
+        try:
+            with self._connect() as connection:
+                connection.executemany(
+                    "INSERT INTO analyses (created, content_hash, source, "
+                    "request_id, model, provider, sentiment, input_text, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+            HISTORY_RECORDS.inc(len(batch), outcome="written")
+        except sqlite3.Error as e:
+            logger.error("Could not write %d history records: %s", len(batch), e)
+            HISTORY_RECORDS.inc(len(batch), outcome="failed")
+        finally:
+            HISTORY_BATCH_SECONDS.observe(time.perf_counter() - start)
+            self._done(len(batch))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def query(
+        self,
+        model: Optional[str] = None,
+        sentiment: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        before: Optional[int] = None,
+        limit: int = 50,
+        include_text: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Page of entries matching every given filter, newest first
+
+        Args:
+            model, sentiment, content_hash, source: Exact matches
+            since, until: Unix timestamps bounding 'created'
+            before: Cursor: only entries with a smaller id (the
+                'next_cursor' of the previous page)
+            limit: Page size (at most MAX_PAGE_SIZE)
+            include_text: Include each entry's input text
+
+        Returns:
+            Dictionary with 'items' and 'next_cursor' (None on the last
+            page)
+        """
+        clauses, args = [], []
+        for column, value in (
+            ("model", model),
+            ("sentiment", sentiment),
+            ("content_hash", content_hash),
+            ("source", source),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if since is not None:
+            clauses.append("created >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("created < ?")
+            args.append(until)
+        if before is not None:
+            clauses.append("id < ?")
+            args.append(before)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        columns = ", ".join(_COLUMNS) + ", result"
+        if include_text:
+            columns += ", input_text"
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        rows = (
+            self._connect()
+            .execute(
+                f"SELECT {columns} FROM analyses {where}ORDER BY id DESC LIMIT ?",
+                (*args, limit + 1),
+            )
+            .fetchall()
+        )
+        items = [_entry(row) for row in rows[:limit]]
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        row = (
+            self._connect()
+            .execute(
+                f"SELECT {', '.join(_COLUMNS)}, result, input_text "
+                "FROM analyses WHERE id = ?",
+                (entry_id,),
+            )
+            .fetchone()
+        )
+        return _entry(row) if row else None
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=10.0)
+
+
+def _entry(row: tuple) -> Dict[str, Any]:
+    """Dictionary for a row of _COLUMNS, result and optionally input_text"""
+    entry = dict(zip(_COLUMNS, row))
+    entry.update(json.loads(row[len(_COLUMNS)]))
+    if len(row) > len(_COLUMNS) + 1:
+        entry["input_text"] = row[-1]
+    return entry
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """
+    Process-wide history store configured from the environment
+
+    HISTORY_STORE selects the backend (sqlite or off), HISTORY_PATH the
+    SQLite file and HISTORY_BATCH_SIZE the rows per transaction. Queued
+    entries are written when the process exits.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = os.getenv("HISTORY_STORE", "sqlite").lower()
+            if backend == "sqlite":
+                _store = SQLiteHistoryStore(
+                    os.getenv("HISTORY_PATH") or DEFAULT_PATH,
+                    batch_size=int(
+                        os.getenv("HISTORY_BATCH_SIZE", str(DEFAULT_BATCH_SIZE))
+                    ),
+                )
+                atexit.register(_store.close)
+            elif backend == "off":
+                _store = HistoryStore()
+            else:
+                raise ValueError(
+                    f"Unknown HISTORY_STORE backend: {backend}. "
+                    "Available: ['sqlite', 'off']"
+                )
+        return _store
+
+
+def record_analysis(
+    input_text: str,
+    result: Dict[str, Any],
+    model: Optional[str],
+    provider: Optional[str],
+    source: str = "api",
+) -> bool:
+    """
+    Add a computed analysis to the history, without waiting for the write
+
+    Failed analyses (sentiment 'error') are not recorded.
+
+    Args:
+        input_text: The analyzed text
+        result: AnalysisResult fields
+        model: Model name used
+        provider: Provider name used
+        source: Where the analysis came from: 'api', 'digest', 'cli' or
+            'session'
+
+    Returns:
+        Whether the entry was queued
+    """
+    if result.get("sentiment") == "error":
+        return False
+    return get_history_store().add(
+        {
+            **result,
+            "input_text": input_text,
+            "model": model,
+            "provider": provider,
+            "source": source,
+        }
+    )
@@ -0,0 +1,235 @@
+"""
+Logging configuration and per-request structured logging
+
+Library modules only create loggers with ``logging.getLogger(__name__)``.
+Entry points (the API server, the CLI and the example scripts) call
+``configure_logging`` once, so importing a module never reconfigures
+logging as a side effect.
+
+The hot path follows three rules:
+
+- Every request gets a correlation ID (``request_id``) that is attached to
+  all records logged while it runs, including from worker threads.
+- Verbose per-step details go through ``verbose()``: DEBUG level, lazily
+  formatted, and only for the sampled fraction of requests
+  (``LOG_SAMPLE_RATE``).
+- Nodes ``record()`` facts (timings, sizes, labels) instead of logging them,
+  and ``request_context`` emits them as one INFO summary per request.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from .profiling import tracked
+
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+summary_logger = logging.getLogger("src.request")
+
+# Correlation IDs accepted from callers (X-Request-ID); others are replaced
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+def valid_request_id(value: Optional[str]) -> Optional[str]:
+    """
+    A caller-supplied correlation ID, or None when it is unsafe to log
+
+    Example:
+        >>> valid_request_id("abc-123"), valid_request_id("a\nb")
+        ('abc-123', None)
+    """
+    if value and REQUEST_ID_PATTERN.fullmatch(value):
+        return value
+    return None
+
+
+class RequestLog:
+    """Correlation ID, sampling decision and summary fields of one request"""
+
+    __slots__ = ("request_id", "sampled", "started", "fields")
+
+    def __init__(self, request_id: str, sampled: bool):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.fields: Dict[str, Any] = {}
+
+
+_current: ContextVar[Optional[RequestLog]] = ContextVar("request_log", default=None)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request ID to every record passing the handler"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        current = _current.get()
+        record.request_id = current.request_id if current else "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": getattr(record, "event", None) or record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    fmt: str = DEFAULT_FORMAT,
+    json_format: Optional[bool] = None,
+) -> None:
+    """
+    Configure the root logger for an entry point
+
+    Args:
+        level: Log level name (defaults to the LOG_LEVEL env var or INFO)
+        fmt: Log record format string for text output
+        json_format: Emit JSON lines (defaults to LOG_FORMAT=json)
+
+    Example:
+        >>> configure_logging()
+        >>> configure_logging("DEBUG", json_format=True)
+    """
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestContextFilter())
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(fmt))
+    logging.basicConfig(level=level, handlers=[handler])
+
+
+def get_sample_rate() -> float:
+    """Fraction of requests whose verbose events are logged (LOG_SAMPLE_RATE)"""
+    try:
+        return min(max(float(os.getenv("LOG_SAMPLE_RATE", "1.0")), 0.0), 1.0)
+    except ValueError:
+        return 1.0
+
+
+def current_request_id() -> Optional[str]:
+    """Correlation ID of the request being processed, if any"""
+    current = _current.get()
+    return current.request_id if current else None
+
+
+@contextmanager
+def request_context(
+    request_id: Optional[str] = None, **fields: Any
+) -> Iterator[RequestLog]:
+    """
+    Bind a correlation ID and emit one summary record when the request ends
+
+    Nested calls (e.g. run_workflow inside the API handler) join the
+    outer request instead of starting a new one, so there is exactly one
+    summary per request.
+
+    Args:
+        request_id: Correlation ID (generated when omitted)
+        **fields: Initial summary fields
+
+    Yields:
+        The RequestLog for this request
+
+    Example:
+        >>> with request_context(model="llama3.2"):
+        ...     record(word_count=42)
+    """
+    current = _current.get()
+    if current is not None:
+        current.fields.update(fields)
+        yield current
+        return
+
+    current = RequestLog(
+        request_id or os.urandom(8).hex(), random.random() < get_sample_rate()
+    )
+    current.fields.update(fields)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fields["error"] = type(e).__name__
+        raise
+    finally:
+        current.fields["duration_ms"] = round(
+            (time.perf_counter() - current.started) * 1000, 1
+        )
+        if summary_logger.isEnabledFor(logging.INFO):
+            summary_logger.info(
+                "request summary %s",
+                _FieldsText(current.fields),
+                extra={"fields": current.fields, "event": "request summary"},
+            )
+        _current.reset(token)
+
+
+def record(**fields: Any) -> None:
+    """Add fields to the current request's summary record (no-op outside one)"""
+    current = _current.get()
+    if current is not None:
+        current.fields.update(fields)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Record the duration of a block as ``<name>_ms`` in the request summary
+
+    When the request is being profiled, the thread is sampled during the
+    block (see profiling.py).
+    """
+    start = time.perf_counter()
+    try:
+        with tracked():
+            yield
+    finally:
+        record(**{f"{name}_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+
+def verbose(logger: logging.Logger, msg: str, *args: Any) -> None:
+    """
+    Log a verbose per-step event at DEBUG for sampled requests
+
+    Arguments are only formatted when the record is actually emitted.
+    Outside a request context the sampling rate is applied per call.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    current = _current.get()
+    sampled = current.sampled if current else random.random() < get_sample_rate()
+    if sampled:
+        logger.debug(msg, *args)
+
+
+class _FieldsText:
+    """Render summary fields as key=value pairs only when formatted"""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return " ".join(f"{key}={value}" for key, value in self.fields.items())
@@ -0,0 +1,367 @@
+"""
+In-process metrics with Prometheus text exposition
+
+A small, dependency-free registry of counters, gauges and histograms.
+Modules create metrics at import time and update them on the hot path;
+the API serves ``render()`` at ``/metrics``.
+
+With several worker processes, set METRICS_DIR to a directory shared by
+the workers. Each worker then writes a snapshot of its registry there
+(the API does so every second) and ``render()`` merges the snapshots of all
+workers: counters and histograms are summed, gauges are summed over the
+workers that are still alive.
+
+Example:
+    >>> REQUESTS = counter("analysis_requests_total", "Analyses run", ["model"])
+    >>> REQUESTS.inc(model="llama3.2")
+    >>> print(render())
+"""
+
+import glob
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """Base class holding per-label-set values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {list(self.labelnames)}, got {list(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: LabelValues, extra: str = "") -> str:
+        parts = [
+            f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)
+        ]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def samples(self) -> Iterable[str]:
+        """Exposition lines for the current values"""
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable description and values of the metric"""
+        with self._lock:
+            values = [[list(key), value] for key, value in self._values.items()]
+        return {
+            "kind": self.kind,
+            "documentation": self.documentation,
+            "labelnames": list(self.labelnames),
+            "values": values,
+        }
+
+    def merge(self, values: List[list]) -> None:
+        """Add snapshot values (from snapshot()["values"]) to this metric"""
+        with self._lock:
+            for key, value in values:
+                key = tuple(key)
+                current = self._values.get(key)
+                if current is None:
+                    self._values[key] = value
+                elif isinstance(current, list):
+                    self._values[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    self._values[key] = current + value
+
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the counter for a label set"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        """Current value for a label set"""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._format_labels(key)} {_number(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge for a label set"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """Decrease the gauge for a label set"""
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count of observations"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation"""
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield (
+                    f"{self.name}_bucket{self._format_labels(key, le)} "
+                    f"{_number(cumulative)}"
+                )
+            inf = self._format_labels(key, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf} {_number(state[-1])}"
+            yield f"{self.name}_sum{self._format_labels(key)} {_number(state[-2])}"
+            yield f"{self.name}_count{self._format_labels(key)} {_number(state[-1])}"
+
+
+class Registry:
+    """Collection of named metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, cls, name: str, documentation: str, **kwargs) -> Metric:
+        """Return the metric with this name, creating it on first use"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def metrics(self) -> List[Metric]:
+        """All registered metrics, sorted by name"""
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Snapshot of every metric, keyed by name"""
+        return {metric.name: metric.snapshot() for metric in self.metrics()}
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Iterable[Dict[str, Any]]) -> "Registry":
+        """Registry holding the sum of several snapshots"""
+        registry = cls()
+        kinds = {kind.kind: kind for kind in (Counter, Gauge, Histogram)}
+        for snapshot in snapshots:
+            for name, data in snapshot.items():
+                kwargs = {"labelnames": data["labelnames"]}
+                if "buckets" in data:
+                    kwargs["buckets"] = data["buckets"]
+                metric = registry.get_or_create(
+                    kinds[data["kind"]], name, data["documentation"], **kwargs
+                )
+                metric.merge(data["values"])
+        return registry
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Get or create a counter in the default registry"""
+    return REGISTRY.get_or_create(Counter, name, documentation, labelnames=labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Get or create a gauge in the default registry"""
+    return REGISTRY.get_or_create(Gauge, name, documentation, labelnames=labelnames)
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Optional[Sequence[float]] = None,
+) -> Histogram:
+    """Get or create a histogram in the default registry"""
+    return REGISTRY.get_or_create(
+        Histogram,
+        name,
+        documentation,
+        labelnames=labelnames,
+        buckets=buckets or DEFAULT_BUCKETS,
+    )
+
+
+_last_flush = 0.0
+
+
+def get_metrics_dir() -> Optional[str]:
+    """Directory shared by worker processes (METRICS_DIR), if configured"""
+    return os.getenv("METRICS_DIR") or None
+
+
+def flush(min_interval: float = 1.0) -> bool:
+    """
+    Write this process's snapshot to METRICS_DIR
+
+    The snapshot is written at most once per ``min_interval`` seconds;
+    other workers see values that are as old as the last write.
+
+    Returns:
+        Whether a snapshot was written
+    """
+    global _last_flush
+    directory = get_metrics_dir()
+    now = time.monotonic()
+    if directory is None or now - _last_flush < min_interval:
+        return False
+    _last_flush = now
+
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(REGISTRY.snapshot(), f)
+    # Atomic on POSIX and Windows: readers never see a partial file
+    os.replace(temporary, path)
+    return True
+
+
+def collect() -> Registry:
+    """
+    Registry merging the snapshots of all worker processes
+
+    Gauges of processes that are gone are dropped (they describe state
+    such as in-flight requests that died with the process); counters
+    and histograms are kept so totals never go backwards.
+    """
+    snapshots = []
+    for path in glob.glob(os.path.join(get_metrics_dir(), "*.json")):
+        pid = int(os.path.splitext(os.path.basename(path))[0])
+        if pid == os.getpid():
+            snapshots.append(REGISTRY.snapshot())
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not _process_alive(pid):
+            snapshot = {
+                name: data for name, data in snapshot.items() if data["kind"] != "gauge"
+            }
+        snapshots.append(snapshot)
+    return Registry.from_snapshots(snapshots)
+
+
+def render() -> str:
+    """
+    Render metrics in Prometheus text format
+
+    Covers this process only, or every worker when METRICS_DIR is set.
+    """
+    if get_metrics_dir() is None:
+        return REGISTRY.render()
+    flush(min_interval=0.0)
+    return collect().render()
+
+
+def reset_metrics_dir(directory: str) -> None:
+    """Create METRICS_DIR and remove snapshots left by a previous run"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json*")):
+        os.remove(path)
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
@@ -0,0 +1,154 @@
+"""
+Priority classes for model calls
+
+Every analysis runs in one of three classes:
+
+- ``interactive``: someone is waiting for the answer (the web UI; the
+  default for /api/analyze and for Python calls)
+- ``batch``: bulk work that should finish soon (/api/digest, imports)
+- ``background``: work nobody is waiting for (backfills, precomputation)
+
+The class is attached to the current context with ``priority_scope`` and
+travels like the request deadline (see deadline.py): contextvars are
+copied into the threadpool and the node threads, so the model
+concurrency limiter (concurrency.py) reads it with ``current_priority()``
+when it decides which waiting call gets the next free slot.
+
+A computation others may come to wait for (a result cache leader, see
+cache.py) runs in a ``promotable`` block. A more urgent request joining
+it calls ``Promotion.promote``, and the computation's remaining model
+calls, including those already queued, continue in the joining class.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BATCH, BACKGROUND)
+
+_current: ContextVar[str] = ContextVar("priority", default=INTERACTIVE)
+
+
+def more_urgent(priority: str, other: str) -> bool:
+    """Whether priority comes before other"""
+    return PRIORITIES.index(priority) < PRIORITIES.index(other)
+
+
+class Promotion:
+    """
+    Class a running computation was raised to by the requests joining it
+
+    Created in the computation's own context: it starts in the current
+    class and chains to an enclosing promotable block, so promoting a
+    computation also promotes the computations it is waiting for.
+    """
+
+    def __init__(self):
+        self.base = current_priority()
+        self.parent = _promotion.get()
+        self._promoted: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def priority(self) -> Optional[str]:
+        """Class promoted to, here or in an enclosing block (None if none)"""
+        promoted = self._promoted
+        inherited = self.parent.priority if self.parent is not None else None
+        if promoted is None or (inherited and more_urgent(inherited, promoted)):
+            return inherited
+        return promoted
+
+    def promote(self, priority: str) -> bool:
+        """
+        Raise the computation to priority
+
+        Returns:
+            Whether this made the computation more urgent
+        """
+        priority = parse_priority(priority)
+        with self._lock:
+            current = self.priority or self.base
+            if not more_urgent(priority, current):
+                return False
+            self._promoted = priority
+            return True
+
+
+_promotion: ContextVar[Optional[Promotion]] = ContextVar("promotion", default=None)
+
+
+def parse_priority(value: str) -> str:
+    """
+    Normalize a priority class name
+
+    Raises:
+        ValueError: If the name is not one of PRIORITIES
+    """
+    priority = value.strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError(
+            f"Unknown priority '{value}' (expected {', '.join(PRIORITIES)})"
+        )
+    return priority
+
+
+def current_priority() -> str:
+    """Priority class of the work being done, promotions included"""
+    priority = _current.get()
+    promotion = _promotion.get()
+    if promotion is not None:
+        promoted = promotion.priority
+        if promoted is not None and more_urgent(promoted, priority):
+            return promoted
+    return priority
+
+
+@contextmanager
+def priority_scope(priority: Optional[str]) -> Iterator[str]:
+    """
+    Run the block in a priority class
+
+    Args:
+        priority: Class name; None keeps the enclosing class
+
+    Raises:
+        ValueError: If the class name is unknown
+
+    Example:
+        >>> with priority_scope("batch"):
+        ...     run_workflow(text)  # waits behind interactive calls
+    """
+    if priority is None:
+        yield _current.get()
+        return
+    priority = parse_priority(priority)
+    token = _current.set(priority)
+    try:
+        yield priority
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def promotable(promotion: Optional[Promotion] = None) -> Iterator[Promotion]:
+    """
+    Run the block so that the requests joining it can raise its class
+
+    Args:
+        promotion: Handle to run under, created in this context
+            beforehand (default: a new one)
+
+    Example:
+        >>> with priority_scope("background"), promotable() as promotion:
+        ...     run_workflow(text)  # promotion.promote("interactive") elsewhere
+    """
+    promotion = promotion or Promotion()
+    token = _promotion.set(promotion)
+    try:
+        yield promotion
+    finally:
+        _promotion.reset(token)
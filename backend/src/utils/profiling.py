@@ -0,0 +1,336 @@
+"""
+Opt-in sampling profiler for single requests
+
+``profile_scope`` runs a block under a wall-clock sampling profiler: a
+background thread reads the stacks of the threads working for the block
+every PROFILE_INTERVAL_MS (default 5) milliseconds, so waiting (for the
+model server, a lock, a slot) shows up as well as computing.
+
+The threads are found through the context, like the request deadline:
+the active profiler travels in a contextvar into the threadpool and the
+node threads, and every ``timed()`` step (log.py) adds its thread to the
+profile for the duration of the step. The thread that opened the scope
+is sampled throughout; in the API that is the event loop thread, which
+other requests share.
+
+Finished profiles are written to PROFILE_DIR as speedscope JSON
+(https://www.speedscope.app) and can be rendered as collapsed stacks for
+flamegraph.pl. Only the newest PROFILE_RETAIN (default 20) are kept.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from types import CodeType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import counter
+
+PROFILES = counter(
+    "profiles_total",
+    "Requests run under the sampling profiler",
+)
+
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_RETAIN = 20
+_PROFILE_ID = re.compile(r"^[0-9a-f]{16}$")
+
+# (file, function, first line) of a frame
+FrameKey = Tuple[str, str, int]
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler of a changing set of threads
+
+    Args:
+        interval: Seconds between samples
+
+    Example:
+        >>> profiler = SamplingProfiler()
+        >>> profiler.start()
+        >>> with profiler.track():
+        ...     work()
+        >>> profiler.stop()
+        >>> profiler.speedscope("work")
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.frames: List[FrameKey] = []
+        # Keyed by code object, cheaper to hash than its FrameKey
+        self._frame_index: Dict[CodeType, int] = {}
+        # Per thread name: stacks (frame indexes, root first) and weights
+        self.samples: Dict[str, List[Tuple[Tuple[int, ...], float]]] = {}
+        # Tracked thread ident -> [nesting depth, thread name]
+        self._threads: Dict[int, list] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Sample the current thread while the block runs"""
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self._threads.setdefault(
+                ident, [0, threading.current_thread().name]
+            )
+            entry[0] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                entry[0] -= 1
+                if not entry[0]:
+                    del self._threads[ident]
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            # Weigh each sample by the time it stands for, which is more
+            # than the interval when the sampler waited for the GIL
+            self._sample(now - last)
+            last = now
+
+    def _sample(self, weight: float) -> None:
+        with self._lock:
+            threads = [(ident, entry[1]) for ident, entry in self._threads.items()]
+        if not threads:
+            return
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        index = self._frame_index
+        for ident, name in threads:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                position = index.get(code)
+                if position is None:
+                    position = index[code] = len(self.frames)
+                    self.frames.append(
+                        (code.co_filename, code.co_qualname, code.co_firstlineno)
+                    )
+                stack.append(position)
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.setdefault(name, []).append((tuple(stack), weight))
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """The profile in speedscope's file format, one profile per thread"""
+        profiles = []
+        for thread, samples in sorted(self.samples.items()):
+            weights = [round(weight * 1000, 3) for _, weight in samples]
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": round(sum(weights), 3),
+                    "samples": [list(stack) for stack, _ in samples],
+                    "weights": weights,
+                }
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "text-analysis-backend",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [
+                    {"name": function, "file": file, "line": line}
+                    for file, function, line in self.frames
+                ]
+            },
+            "profiles": profiles,
+        }
+
+
+def collapsed_stacks(profile: Dict[str, Any]) -> str:
+    """
+    Render a speedscope profile as collapsed stacks for flamegraph.pl
+
+    Each line is 'thread;outer;...;inner <milliseconds>'.
+    """
+    frames = profile["shared"]["frames"]
+    totals: Dict[str, float] = {}
+    for thread in profile["profiles"]:
+        for stack, weight in zip(thread["samples"], thread["weights"]):
+            names = [thread["name"]] + [frames[i]["name"] for i in stack]
+            key = ";".join(name.replace(";", ":") for name in names)
+            totals[key] = totals.get(key, 0.0) + weight
+    return "".join(f"{key} {round(value)}\n" for key, value in totals.items())
+
+
+class ProfileStore:
+    """
+    Profiles as files in a directory, keeping only the newest
+
+    Args:
+        directory: Where the speedscope files go
+        retain: Profiles kept; older ones are deleted
+    """
+
+    def __init__(self, directory: str, retain: int = DEFAULT_RETAIN):
+        self.directory = Path(directory)
+        self.retain = retain
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def save(self, profile_id: str, profile: Dict[str, Any]) -> Path:
+        path = self.directory / f"{profile_id}.speedscope.json"
+        with self._lock:
+            # Write and rename, so readers never see a partial file
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(profile), encoding="utf-8")
+            os.replace(tmp, path)
+            for old in self._paths()[self.retain :]:
+                old.unlink(missing_ok=True)
+        return path
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """The profile, or None if unknown or already deleted"""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            text = (self.directory / f"{profile_id}.speedscope.json").read_text(
+                encoding="utf-8"
+            )
+        except FileNotFoundError:
+            return None
+        return json.loads(text)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Retained profiles, newest first"""
+        entries = []
+        for path in self._paths():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append(
+                {
+                    "id": path.name.split(".", 1)[0],
+                    "created": stat.st_mtime,
+                    "bytes": stat.st_size,
+                }
+            )
+        return entries
+
+    def _paths(self) -> List[Path]:
+        stamped = []
+        for path in self.directory.glob("*.speedscope.json"):
+            try:
+                stamped.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                # Removed by another worker's retention since the glob
+                continue
+        return [path for _, path in sorted(stamped, reverse=True)]
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    """
+    Store shared by the process, configured with PROFILE_DIR (defaults to
+    a directory in the system temp dir, shared by the workers) and
+    PROFILE_RETAIN
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore(
+                os.getenv("PROFILE_DIR")
+                or os.path.join(tempfile.gettempdir(), "text-analysis-profiles"),
+                int(os.getenv("PROFILE_RETAIN", str(DEFAULT_RETAIN))),
+            )
+        return _store
+
+
+_active: ContextVar[Optional[SamplingProfiler]] = ContextVar("profiler", default=None)
+
+
+@contextmanager
+def tracked() -> Iterator[None]:
+    """Add the current thread to the active profile, if any, for the block"""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.track():
+        yield
+
+
+class ProfileResult:
+    """ID and path of a profile, filled in when its scope ends"""
+
+    __slots__ = ("profile_id", "path", "duration")
+
+    def __init__(self, profile_id: str):
+        self.profile_id = profile_id
+        self.path: Optional[Path] = None
+        self.duration = 0.0
+
+
+@contextmanager
+def profile_scope(
+    name: str, profile_id: Optional[str] = None
+) -> Iterator[ProfileResult]:
+    """
+    Profile the block and save the result in the profile store
+
+    Args:
+        name: Label stored in the profile (e.g. 'POST /api/analyze')
+        profile_id: 16 hex characters (random when omitted)
+
+    Yields:
+        ProfileResult whose path is set once the block has ended
+
+    Example:
+        >>> with profile_scope("cli") as result:
+        ...     run_workflow(text)
+        >>> print(result.path)
+    """
+    result = ProfileResult(profile_id or os.urandom(8).hex())
+    profiler = SamplingProfiler(
+        float(os.getenv("PROFILE_INTERVAL_MS", str(DEFAULT_INTERVAL_MS))) / 1000
+    )
+    token = _active.set(profiler)
+    profiler.start()
+    try:
+        with profiler.track():
+            yield result
+    finally:
+        profiler.stop()
+        _active.reset(token)
+        PROFILES.inc()
+        result.duration = profiler.duration
+        result.path = get_profile_store().save(
+            result.profile_id, profiler.speedscope(name)
+        )
@@ -0,0 +1,107 @@
+"""
+Cheap quality gates for model answers
+
+Checks run on a summary and sentiment label in well under a millisecond,
+without a model, so the model cascade (see create_cascade_node) can
+accept a small model's answer or escalate to a larger one:
+
+- ``sentiment_label``: the sentiment is one of SENTIMENT_LABELS
+- ``summary_length``: the summary has between SUMMARY_MIN_WORDS and
+  SUMMARY_MAX_WORDS words, and is not longer than the text
+- ``key_terms``: the summary mentions at least KEY_TERM_COVERAGE of the
+  text's most frequent content words
+- ``source_overlap``: at least SOURCE_OVERLAP of the summary's content
+  words occur in the text (an answer about something else fails)
+- ``repetition``: at most REPETITION_MAX of the summary's word trigrams
+  are repeats (small models tend to loop)
+
+Words are compared after stripping common suffixes, so 'customers' in
+the text counts for 'customer' in the summary.
+"""
+
+import re
+from collections import Counter
+from typing import List, Optional
+
+from .extractive import STOPWORDS
+from .sentiment import SENTIMENT_LABELS
+
+SUMMARY_MIN_WORDS = 5
+SUMMARY_MAX_WORDS = 120
+KEY_TERMS = 8
+KEY_TERM_COVERAGE = 0.25
+SOURCE_OVERLAP = 0.5
+REPETITION_MAX = 0.25
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'-]*")
+_SUFFIXES = ("ing", "ed", "es", "s", "ly")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def content_words(text: str) -> List[str]:
+    """Stemmed words of a text, without stopwords and single letters"""
+    return [
+        _stem(word)
+        for word in _WORD_RE.findall(text.lower())
+        if word not in STOPWORDS and len(word) > 1
+    ]
+
+
+def key_terms(text: str, count: int = KEY_TERMS) -> List[str]:
+    """Most frequent content words of a text (first occurrence breaks ties)"""
+    return [word for word, _ in Counter(content_words(text)).most_common(count)]
+
+
+def repetition(summary: str) -> float:
+    """Fraction of the word trigrams that already occurred earlier"""
+    words = summary.lower().split()
+    trigrams = list(zip(words, words[1:], words[2:]))
+    if not trigrams:
+        return 0.0
+    return 1.0 - len(set(trigrams)) / len(trigrams)
+
+
+def check_quality(text: str, summary: str, sentiment: Optional[str]) -> List[str]:
+    """
+    Names of the gates an analysis fails (empty when it passes)
+
+    Args:
+        text: Text the model was given
+        summary: The model's summary
+        sentiment: The sentiment label
+
+    Example:
+        >>> check_quality(report, "Mock response", "neutral")
+        ['summary_length', 'key_terms', 'source_overlap']
+    """
+    failures = []
+    if sentiment not in SENTIMENT_LABELS:
+        failures.append("sentiment_label")
+
+    summary_words = len(summary.split())
+    max_words = min(SUMMARY_MAX_WORDS, max(SUMMARY_MIN_WORDS, len(text.split())))
+    if not SUMMARY_MIN_WORDS <= summary_words <= max_words:
+        failures.append("summary_length")
+
+    source = set(content_words(text))
+    summary_terms = content_words(summary)
+    terms = key_terms(text)
+    # Texts of a few words have no terms worth checking
+    if len(terms) >= KEY_TERMS // 2:
+        covered = sum(1 for term in terms if term in summary_terms)
+        if covered / len(terms) < KEY_TERM_COVERAGE:
+            failures.append("key_terms")
+    if summary_terms:
+        overlap = sum(1 for word in summary_terms if word in source)
+        if overlap / len(summary_terms) < SOURCE_OVERLAP:
+            failures.append("source_overlap")
+
+    if repetition(summary) > REPETITION_MAX:
+        failures.append("repetition")
+    return failures
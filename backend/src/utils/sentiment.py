@@ -0,0 +1,168 @@
+"""
+Fast lexicon-based sentiment classification
+
+Scores text against a weighted word lexicon with negation and intensity
+handling, in a single pass over the tokens (tens of microseconds for a
+typical input). The result carries a confidence so callers can escalate
+uncertain cases to the LLM:
+
+- ``lexicon``: always use the lexicon label
+- ``llm``:     always ask the LLM (previous behaviour)
+- ``hybrid``:  use the lexicon, escalate to the LLM when the confidence is
+               below the threshold or the label is ``mixed``
+"""
+
+import math
+import os
+import re
+from typing import Dict, Tuple
+
+SENTIMENT_LABELS = ("positive", "negative", "neutral", "mixed")
+SENTIMENT_STRATEGIES = ("llm", "lexicon", "hybrid")
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+POSITIVE_WORDS: Dict[str, float] = {
+    **dict.fromkeys(
+        """good nice fine happy glad pleased like liked likes enjoy enjoyed enjoyable
+        helpful useful easy fast quick clean comfortable friendly polite fair calm
+        safe stable reliable recommend recommended worth improve improved improves
+        improvement gain gains growth grew rise rose win won success successful
+        benefit benefits positive hope hopeful optimistic progress solved fixed
+        smooth efficient effective profitable support supported thanks thank
+        appreciate appreciated beauty peaceful relief relieved welcome""".split(),
+        1.0,
+    ),
+    **dict.fromkeys(
+        """great excellent amazing awesome fantastic wonderful love loved loves
+        lovely beautiful brilliant outstanding superb perfect delighted delightful
+        impressive impressed exceptional remarkable thrilled excited exciting
+        groundbreaking revolutionary revolutionize breakthrough best incredible
+        stunning vibrant joy joyful""".split(),
+        2.0,
+    ),
+}
+
+NEGATIVE_WORDS: Dict[str, float] = {
+    **dict.fromkeys(
+        """bad poor slow late wrong problem problems issue issues difficult hard
+        confusing confused unhappy sad disappointed disappointing disappointment
+        annoying annoyed expensive overpriced broken break broke fail failed fails
+        failure lose lost loss losses drop dropped drops decline declined fell fall
+        falls weak concern concerns concerned worried worry worries risk risks
+        caution uncertain uncertainty unfortunately complaint complain complained
+        crash crashed bug bugs error errors delay delayed missing rude noisy dirty
+        cold unreliable unstable shortage short damage damaged harm hurt pain
+        angry upset frustrating frustrated crisis""".split(),
+        1.0,
+    ),
+    **dict.fromkeys(
+        """terrible awful horrible worst hate hated hates disgusting useless
+        unacceptable disaster disastrous catastrophic furious dreadful pathetic
+        nightmare scam appalling outrageous devastating devastated tragic""".split(),
+        2.0,
+    ),
+}
+
+NEGATORS = frozenset(
+    "not no never none nothing neither nor without hardly barely isn't wasn't "
+    "aren't weren't don't doesn't didn't can't cannot couldn't won't wouldn't "
+    "shouldn't haven't hasn't hadn't".split()
+)
+
+INTENSIFIERS: Dict[str, float] = {
+    **dict.fromkeys(
+        "very really extremely incredibly so too highly truly".split(), 1.5
+    ),
+    **dict.fromkeys("slightly somewhat fairly bit little".split(), 0.6),
+}
+
+CONTRAST_WORDS = frozenset("but however although though yet whereas".split())
+
+# Tokens after a negator whose polarity is flipped
+NEGATION_WINDOW = 3
+
+
+def get_confidence_threshold() -> float:
+    """Confidence below which the hybrid strategy escalates to the LLM"""
+    return float(os.getenv("SENTIMENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+
+def lexicon_scores(text: str) -> Tuple[float, float, int]:
+    """
+    Sum positive and negative evidence in a text
+
+    Negators flip the polarity of the next few tokens and intensifiers
+    scale the next sentiment word. Words after a contrast word ("but",
+    "however") weigh more, as they usually carry the writer's verdict.
+
+    Returns:
+        Tuple of (positive_score, negative_score, token_count)
+    """
+    positive = negative = 0.0
+    negate_left = 0
+    boost = 1.0
+    contrast = 1.0
+    tokens = _TOKEN_RE.findall(text.lower())
+    for token in tokens:
+        if token in NEGATORS:
+            negate_left = NEGATION_WINDOW
+            continue
+        if token in INTENSIFIERS:
+            boost = INTENSIFIERS[token]
+            continue
+        if token in CONTRAST_WORDS:
+            contrast = 1.2
+            continue
+
+        weight = POSITIVE_WORDS.get(token, 0.0) - NEGATIVE_WORDS.get(token, 0.0)
+        if weight:
+            weight *= boost * contrast
+            if negate_left:
+                # "not good" is weaker than "bad"
+                weight = -weight * 0.75
+            if weight > 0:
+                positive += weight
+            else:
+                negative -= weight
+            boost = 1.0
+        if negate_left:
+            negate_left -= 1
+    return positive, negative, len(tokens)
+
+
+def classify_sentiment(text: str) -> Tuple[str, float]:
+    """
+    Classify sentiment with the lexicon
+
+    Args:
+        text: Text to classify
+
+    Returns:
+        Tuple of (label, confidence) with label in SENTIMENT_LABELS and
+        confidence between 0 and 1
+
+    Example:
+        >>> classify_sentiment("The food was great and the staff were lovely.")
+        ('positive', 0.92)
+    """
+    positive, negative, token_count = lexicon_scores(text)
+    total = positive + negative
+    if token_count == 0:
+        return "neutral", 0.0
+
+    if total == 0:
+        # No sentiment words at all: neutral, more certain for longer texts
+        return "neutral", round(min(0.9, 0.5 + token_count / 100), 2)
+
+    polarity = (positive - negative) / total
+    # Evidence grows with the amount of sentiment relative to text length
+    strength = 1.0 - math.exp(-total / max(1.0, math.sqrt(token_count) / 2))
+
+    if min(positive, negative) / total >= 0.25 and total >= 2:
+        return "mixed", round(0.4 + 0.2 * strength, 2)
+    if abs(polarity) < 0.2:
+        return "neutral", round(0.4 + 0.2 * (1 - strength), 2)
+
+    label = "positive" if polarity > 0 else "negative"
+    return label, round(0.5 + 0.45 * abs(polarity) * strength, 2)
@@ -0,0 +1,32 @@
+"""
+Fast JSON serialization
+
+Uses orjson when it is installed (several times faster than the stdlib
+encoder and produces bytes directly) and falls back to the json module
+otherwise. Both produce compact output without extra whitespace.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes
+
+    Example:
+        >>> dumps({"sentiment": "positive"})
+        b'{"sentiment":"positive"}'
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
@@ -0,0 +1,168 @@
+"""
+Speculative analyses started while the user is still typing
+
+The web UI sends the current text to /api/speculate a moment after the
+user stops typing. The API starts the analysis in the background, at
+the lowest priority class, into the result cache (src/utils/cache.py),
+so that when the user clicks Analyze, /api/analyze finds the result
+ready or joins the run that is computing it.
+
+Each browser tab identifies itself with a speculation ID. A tab has at
+most one speculation running: when its text changes, the speculation of
+the old text is cancelled through its deadline (reason 'superseded'),
+which stops its model calls like any abandoned request.
+
+An /api/analyze request joining a running speculation raises it to the
+request's priority class (see get_or_compute), so clicking Analyze never
+waits behind background work. From then on someone is waiting for the
+result: superseding or cancelling the speculation only detaches it from
+the tab, and the analysis runs to completion.
+
+SPECULATION_MAX_INFLIGHT (default 8) bounds the speculations running in
+a process, and SPECULATION_TIMEOUT (default 60) how long each may run.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .cache import is_promoted
+from .deadline import Deadline
+from .metrics import counter
+
+SPECULATIONS = counter(
+    "speculations_total",
+    "Speculative analysis requests by outcome (started, cached, in_flight "
+    "or skipped when SPECULATION_MAX_INFLIGHT were running)",
+    ["outcome"],
+)
+SPECULATION_RESULTS = counter(
+    "speculation_results_total",
+    "Speculative analyses that ended, by result (completed, cancelled or "
+    "failed), and those detached from their tab while a request waited",
+    ["result"],
+)
+SPECULATION_HITS = counter(
+    "speculation_hits_total",
+    "Analysis requests answered by a speculative run, finished (hit) or "
+    "still running (coalesced)",
+    ["outcome"],
+)
+
+# Cache keys remembered as speculated, to count the hits
+DEFAULT_MAX_KEYS = 1024
+
+
+class SpeculationRegistry:
+    """
+    Running speculation of each client, and the keys speculated recently
+
+    Args:
+        max_inflight: Speculations allowed to run at once
+        max_keys: Speculated keys remembered for hit counting
+    """
+
+    def __init__(self, max_inflight: int = 8, max_keys: int = DEFAULT_MAX_KEYS):
+        self.max_inflight = max_inflight
+        self.max_keys = max_keys
+        # Client ID -> (cache key, deadline) of its running speculation
+        self._running: Dict[str, Tuple[str, Deadline]] = {}
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def supersede(self, client_id: str, key: str) -> bool:
+        """
+        Cancel the client's speculation unless it is for key
+
+        Returns:
+            Whether the client is already speculating key
+        """
+        with self._lock:
+            running = self._running.get(client_id)
+            if running is None:
+                return False
+            if running[0] == key:
+                return True
+            del self._running[client_id]
+        _stop(running, "superseded")
+        return False
+
+    def begin(
+        self, client_id: str, key: str, timeout: Optional[float] = None
+    ) -> Optional[Deadline]:
+        """
+        Register a speculation of key for the client
+
+        Returns:
+            The deadline to run it under, or None when max_inflight
+            speculations are already running
+        """
+        with self._lock:
+            if len(self._running) >= self.max_inflight:
+                return None
+            deadline = Deadline(timeout)
+            self._running[client_id] = (key, deadline)
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+            return deadline
+
+    def end(self, client_id: str, deadline: Deadline) -> None:
+        """Forget a finished speculation (unless superseded already)"""
+        with self._lock:
+            running = self._running.get(client_id)
+            if running is not None and running[1] is deadline:
+                del self._running[client_id]
+
+    def cancel(self, client_id: str, reason: str = "cancelled") -> bool:
+        """Cancel the client's speculation; False if none was running"""
+        with self._lock:
+            running = self._running.pop(client_id, None)
+        if running is None:
+            return False
+        _stop(running, reason)
+        return True
+
+    def take(self, key: str) -> bool:
+        """
+        Whether a recent speculation computed (or is computing) key
+
+        True only once per speculation, for the request that used it.
+        """
+        with self._lock:
+            return self._keys.pop(key, False) is None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._running)
+
+
+def _stop(running: Tuple[str, Deadline], reason: str) -> None:
+    """Cancel a speculation nobody has joined yet"""
+    key, deadline = running
+    if is_promoted(key):
+        SPECULATION_RESULTS.inc(result="detached")
+        return
+    deadline.cancel(reason)
+
+
+_registry: Optional[SpeculationRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_speculations() -> SpeculationRegistry:
+    """Registry of this process, configured with SPECULATION_MAX_INFLIGHT"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SpeculationRegistry(
+                int(os.getenv("SPECULATION_MAX_INFLIGHT", "8"))
+            )
+        return _registry
+
+
+def speculation_timeout() -> float:
+    """Seconds a speculation may run (SPECULATION_TIMEOUT, default 60)"""
+    return float(os.getenv("SPECULATION_TIMEOUT", "60"))
@@ -0,0 +1,342 @@
+"""
+Distributed tracing with W3C trace context
+
+Spans cover the API request, each graph node and each model call. They
+join the trace of the caller through the ``traceparent`` header
+(https://www.w3.org/TR/trace-context/), which the frontend proxy sends,
+so one trace shows where the time of a page request went: proxy,
+FastAPI, nodes, model server.
+
+The current span travels in a contextvar, like the request deadline, so
+spans opened in the threadpool and in node threads get the right parent.
+
+Finished spans go to the exporter chosen with TRACING:
+
+- ``off`` (default): spans are not recorded and ``span()`` returns a
+  shared no-op span
+- ``console``: one line per span on stderr
+- ``file``: OTLP/JSON lines appended to TRACE_FILE, one
+  ExportTraceServiceRequest per line. The frontend appends to the same
+  default file. An OpenTelemetry collector reads the file with its
+  ``otlpjsonfile`` receiver, so no collector is needed to record traces.
+
+TRACE_SAMPLE_RATE (0.0-1.0) samples new traces; traces started by the
+caller follow the caller's sampled flag.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+INTERNAL, SERVER, CLIENT = "internal", "server", "client"
+# OTLP SpanKind values
+_KINDS = {INTERNAL: 1, SERVER: 2, CLIENT: 3}
+
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "text-analysis-api")
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """
+    One timed operation in a trace
+
+    Attributes are OpenTelemetry semantic convention names where one
+    exists (e.g. 'gen_ai.usage.output_tokens').
+    """
+
+    __slots__ = (
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "sampled",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        """traceparent header value for calls made within this span"""
+        flags = "01" if self.sampled else "00"
+        return f"00-{self.trace_id}-{self.span_id}-{flags}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.error = message
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": (
+                {"code": 2, "message": self.error}
+                if self.error is not None
+                else {"code": 1}
+            ),
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _DisabledSpan:
+    """Stand-in yielded while tracing is off, so callers need no checks"""
+
+    traceparent = None
+    trace_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+
+DISABLED = _DisabledSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # 64-bit integers are strings in OTLP/JSON
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_request(spans: List[Span]) -> Dict[str, Any]:
+    """ExportTraceServiceRequest holding spans of this service"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {"stringValue": SERVICE_NAME},
+                        }
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "src.utils.tracing"},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class FileExporter:
+    """
+    Appends each span as one OTLP/JSON line
+
+    Every line is written with a single append, so the API workers and
+    the frontend can share the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(otlp_request([span]), separators=(",", ":")) + "\n"
+        os.write(self._fd, line.encode("utf-8"))
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class ConsoleExporter:
+    """Writes one readable line per span to stderr"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        duration = (span.end_ns - span.start_ns) / 1e6
+        attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        status = f" error={span.error!r}" if span.error is not None else ""
+        line = (
+            f"span trace={span.trace_id} id={span.span_id} "
+            f"parent={span.parent_id or '-'} {span.name} "
+            f"{duration:.1f}ms {attributes}{status}\n"
+        )
+        with self._lock:
+            self.stream.write(line)
+
+
+_exporter: Optional[Union[FileExporter, ConsoleExporter]] = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_tracing(
+    exporter: Optional[str] = None, path: Optional[str] = None
+) -> Optional[Union[FileExporter, ConsoleExporter]]:
+    """
+    Choose the span exporter (defaults to the TRACING and TRACE_FILE env)
+
+    Args:
+        exporter: 'off', 'console' or 'file'
+        path: Span file for the file exporter
+
+    Raises:
+        ValueError: If the exporter name is unknown
+    """
+    global _exporter, _configured
+    exporter = (exporter or os.getenv("TRACING", "off")).lower()
+    with _configure_lock:
+        if isinstance(_exporter, FileExporter):
+            _exporter.close()
+        if exporter == "off":
+            _exporter = None
+        elif exporter == "console":
+            _exporter = ConsoleExporter()
+        elif exporter == "file":
+            _exporter = FileExporter(
+                path
+                or os.getenv("TRACE_FILE")
+                or os.path.join(tempfile.gettempdir(), "text-analysis-traces.jsonl")
+            )
+        else:
+            raise ValueError(
+                f"Unknown TRACING exporter '{exporter}' (expected off, console or file)"
+            )
+        _configured = True
+        return _exporter
+
+
+def _get_exporter():
+    if not _configured:
+        configure_tracing()
+    return _exporter
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Innermost open span, None outside any span or with tracing off"""
+    return _current.get()
+
+
+def parse_traceparent(header: Optional[str]):
+    """
+    (trace_id, parent span ID, sampled) from a traceparent header
+
+    Returns None for a missing or malformed header, or all-zero IDs.
+    """
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+@contextmanager
+def span(
+    name: str,
+    kind: str = INTERNAL,
+    traceparent: Optional[str] = None,
+    **attributes: Any,
+) -> Iterator[Union[Span, _DisabledSpan]]:
+    """
+    Run the block as a span of the current trace
+
+    The span's parent is the caller's traceparent when given (server
+    spans), else the current span; without either a new trace starts.
+    Exceptions leaving the block mark the span as failed.
+
+    Args:
+        name: Span name (e.g. 'POST /api/analyze', 'node summarizer')
+        kind: INTERNAL, SERVER or CLIENT
+        traceparent: Incoming traceparent header
+        **attributes: Initial span attributes (dots are written as '_'
+            in keywords and may be set with set_attribute instead)
+
+    Yields:
+        The span, to add attributes to (a no-op object with tracing off)
+
+    Example:
+        >>> with span("node summarizer") as s:
+        ...     s.set_attribute("gen_ai.request.model", "llama3.2")
+    """
+    exporter = _get_exporter()
+    if exporter is None:
+        yield DISABLED
+        return
+
+    remote = parse_traceparent(traceparent)
+    parent = _current.get()
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+    elif parent is not None:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = random.random() < rate
+
+    current = Span(name, kind, trace_id, parent_id, sampled)
+    for key, value in attributes.items():
+        current.set_attribute(key, value)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        if current.sampled:
+            exporter.export(current)
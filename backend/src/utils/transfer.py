@@ -0,0 +1,191 @@
+"""
+HTTP transfer helpers: response compression and entity tags
+
+CompressionMiddleware compresses complete responses above a size
+threshold with brotli (when the optional ``brotli`` package is
+installed) or gzip, following the client's Accept-Encoding. Streaming
+responses are passed through untouched.
+
+ETags identify the content of an analysis so clients repeating a
+request can send If-None-Match and receive a 304 without a body.
+"""
+
+import gzip
+import hashlib
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is an optional speed-up
+    brotli = None
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Bodies smaller than this gain little and cost CPU to compress
+DEFAULT_MINIMUM_SIZE = 500
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "text/",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported encoding the client accepts
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+
+    Returns:
+        'br', 'gzip' or None for identity
+
+    Example:
+        >>> choose_encoding("gzip, deflate, br")
+        'br'  # 'gzip' without the brotli package
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a body with 'br' or 'gzip'
+
+    Levels favour speed (brotli 4, gzip 6): responses are compressed
+    once per request, not once per deployment like static assets.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def is_compressible(content_type: str) -> bool:
+    """Whether a content type benefits from compression"""
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def make_etag(*parts: bytes) -> str:
+    """
+    Strong entity tag from a content hash
+
+    Example:
+        >>> make_etag(b'{"summary": "..."}')
+        '"3f2c...e1"'
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an entity tag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match (RFC 9110 13.1.2)
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete responses
+
+    Args:
+        app: ASGI application
+        minimum_size: Smallest body (bytes) worth compressing
+    """
+
+    def __init__(self, app, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(
+            headers.get(b"accept-encoding", b"").decode("latin-1")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk shows whether it streams
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            response_headers = _header_dict(start["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or b"content-encoding" in response_headers
+                or not is_compressible(
+                    response_headers.get(b"content-type", b"").decode("latin-1")
+                )
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            start["headers"] = _replace_headers(
+                start["headers"],
+                {
+                    b"content-encoding": encoding.encode("latin-1"),
+                    b"content-length": str(len(compressed)).encode("latin-1"),
+                    b"vary": _add_vary(response_headers.get(b"vary")),
+                },
+            )
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _header_dict(headers: Iterable) -> dict:
+    return {name.lower(): value for name, value in headers}
+
+
+def _replace_headers(headers: Iterable, updates: dict) -> list:
+    kept = [(name, value) for name, value in headers if name.lower() not in updates]
+    return kept + list(updates.items())
+
+
+def _add_vary(vary: Optional[bytes]) -> bytes:
+    if not vary:
+        return b"Accept-Encoding"
+    if b"accept-encoding" in vary.lower():
+        return vary
+    return vary + b", Accept-Encoding"
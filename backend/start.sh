@@ -3,8 +3,10 @@ set -e
 
 # Use the PORT environment variable provided by Railway, or default to 8000
 PORT="${PORT:-8000}"
+# Worker processes; more than one enables the shared cache and metrics
+WORKERS="${WEB_CONCURRENCY:-1}"
 
-echo "Starting uvicorn on port $PORT"
+echo "Starting uvicorn on port $PORT with $WORKERS worker(s)"
 
 # Start uvicorn
-exec uvicorn api:app --host 0.0.0.0 --port "$PORT" --log-level info
+exec python src/main.py --host 0.0.0.0 --port "$PORT" --workers "$WORKERS"
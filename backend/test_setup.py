@@ -4,12 +4,16 @@ Simple test script to verify the LangGraph setup
 This script tests basic functionality without requiring Ollama to be running.
 """
 
+import os
 import sys
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
+# Keep test analyses out of the analysis history
+os.environ.setdefault("HISTORY_STORE", "off")
+
 
 def test_imports():
     """Test that all modules can be imported"""
@@ -58,6 +62,26 @@ def test_imports():
     return True
 
 
+def test_lazy_imports():
+    """Test that lightweight modules do not pull in langgraph/langchain"""
+    print("\nTesting lazy imports...")
+
+    import subprocess
+
+    code = (
+        "import sys, src.utils.helpers, src.config.models; "
+        "heavy = [m for m in ('langgraph', 'langchain_ollama') if m in sys.modules]; "
+        "sys.exit(1 if heavy else 0)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).parent, check=False
+    )
+    assert proc.returncode == 0
+    print("  ✅ helpers and model config import without langgraph")
+
+    return True
+
+
 def test_state_definition():
     """Test state definition"""
     print("\nTesting state definition...")
@@ -95,6 +119,914 @@ def test_input_processor():
     return True
 
 
+def test_extractive_condenser():
+    """Test the extractive pre-summarization stage"""
+    print("\nTesting extractive condenser...")
+
+    from src.utils.extractive import condense
+
+    text = " ".join(
+        [
+            "Solar panels convert sunlight into electricity for homes.",
+            "The new solar panel design is far more efficient than older panels.",
+            "My cat likes to sleep on the sofa.",
+            "Efficient solar panels could lower electricity bills for homes.",
+        ]
+    )
+    result = condense(text, ratio=0.5)
+    assert result["condensed_tokens"] < result["original_tokens"]
+    assert "Efficient solar panels" in result["text"]
+    print(
+        f"  ✅ {result['original_tokens']} -> {result['condensed_tokens']} tokens, "
+        f"{result['sentences_kept']}/{result['sentences_total']} sentences kept"
+    )
+
+    result = condense("Too short to condense.", ratio=0.1)
+    assert result["text"] == "Too short to condense."
+    print("  ✅ Single-sentence input left unchanged")
+
+    return True
+
+
+def test_lexicon_sentiment():
+    """Test the fast lexicon sentiment classifier"""
+    print("\nTesting lexicon sentiment...")
+
+    from src.utils.sentiment import classify_sentiment
+
+    label, confidence = classify_sentiment(
+        "The staff were wonderful and the food was excellent."
+    )
+    assert label == "positive" and confidence >= 0.7
+    print(f"  ✅ Positive text: {label} ({confidence})")
+
+    label, _ = classify_sentiment("The product is not good and support was rude.")
+    assert label == "negative"
+    print(f"  ✅ Negated praise: {label}")
+
+    label, _ = classify_sentiment("The meeting is on Tuesday in room B.")
+    assert label == "neutral"
+    print(f"  ✅ Factual text: {label}")
+
+    return True
+
+
+def test_result_cache():
+    """Test the shared result cache, coalescing and metric aggregation"""
+    print("\nTesting result cache...")
+
+    import os
+    import tempfile
+    import threading
+    import time
+
+    from src.utils.cache import SQLiteResultCache, cache_key, get_or_compute
+    from src.utils.metrics import Counter, Registry
+
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    worker_a = SQLiteResultCache(path)
+    worker_b = SQLiteResultCache(path)
+    key = cache_key(input_text="Hello", model_name="llama3.2")
+
+    assert worker_a.claim(key) and not worker_b.claim(key)
+    worker_a.set(key, {"summary": "hi"})
+    worker_a.release(key)
+    assert worker_b.get(key) == {"summary": "hi"}
+    print("  ✅ SQLite cache shared between instances, leases exclusive")
+
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"summary": "computed"}
+
+    outcomes = []
+    key = cache_key(input_text="Coalesce me")
+    threads = [
+        threading.Thread(
+            target=lambda: outcomes.append(
+                get_or_compute(key, compute, cache=worker_a)[1]
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and sorted(outcomes) == ["coalesced"] * 3 + ["miss"]
+    assert get_or_compute(key, compute, cache=worker_b)[1] == "hit"
+    print("  ✅ Concurrent identical requests computed once")
+
+    stuck = threading.Event()
+    key = cache_key(input_text="Stuck leader")
+    leader = threading.Thread(
+        target=lambda: get_or_compute(
+            key, lambda: stuck.wait() and {"summary": "late"}, cache=worker_a
+        )
+    )
+    leader.start()
+    time.sleep(0.05)
+    value, outcome = get_or_compute(
+        key, lambda: {"summary": "local"}, cache=worker_a, wait_timeout=0.3
+    )
+    assert (value, outcome) == ({"summary": "local"}, "miss")
+    stuck.set()
+    leader.join()
+    print("  ✅ Follower computes locally when the leader never finishes")
+
+    snapshots = []
+    for amount in (1, 2):
+        registry = Registry()
+        registry.get_or_create(Counter, "requests_total", "Requests").inc(amount)
+        snapshots.append(registry.snapshot())
+    merged = Registry.from_snapshots(snapshots).render()
+    assert "requests_total 3" in merged
+    print("  ✅ Metric snapshots of several workers are summed")
+
+    return True
+
+
+def test_analysis_result():
+    """Test the compact result record and JSON serialization"""
+    print("\nTesting analysis result record...")
+
+    import json
+
+    from src.graph.state import AnalysisResult
+    from src.utils.serialization import dumps
+
+    state = {
+        "input_text": "A long input " * 100,
+        "condensed_text": "A long input",
+        "word_count": 300,
+        "summary": "Short.",
+        "sentiment": "positive",
+    }
+    result = AnalysisResult.from_state(state)
+    assert not hasattr(result, "__dict__")
+    assert "input_text" not in result.to_dict()
+    assert AnalysisResult(**result.to_dict()) == result
+    print("  ✅ Record keeps only the outputs")
+
+    assert json.loads(dumps(result.to_dict()))["sentiment"] == "positive"
+    print("  ✅ Serializes to compact JSON")
+
+    return True
+
+
+def test_transfer_helpers():
+    """Test content negotiation and entity tags"""
+    print("\nTesting transfer helpers...")
+
+    import gzip
+
+    from src.utils.transfer import choose_encoding, compress, etag_matches, make_etag
+
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+    body = b'{"summary": "repeated text"}' * 50
+    assert gzip.decompress(compress(body, "gzip")) == body
+    print("  ✅ Encoding negotiated and body compressed")
+
+    etag = make_etag(b"analysis")
+    assert etag_matches(etag, etag) and etag_matches(f'"other", W/{etag}', etag)
+    assert not etag_matches('"other"', etag) and not etag_matches(None, etag)
+    print("  ✅ If-None-Match compared against the ETag")
+
+    return True
+
+
+def test_history_store():
+    """Test write-behind batching, filters and pagination of the history"""
+    print("\nTesting history store...")
+
+    import os
+    import tempfile
+    import time
+
+    from src.utils.history import SQLiteHistoryStore, content_hash
+
+    path = os.path.join(tempfile.mkdtemp(), "history.sqlite3")
+    store = SQLiteHistoryStore(path, batch_size=16)
+    start = time.perf_counter()
+    for i in range(45):
+        assert store.add(
+            {
+                "input_text": f"Document number {i % 5}",
+                "model": "llama3.2" if i % 3 else "mistral",
+                "provider": "mock",
+                "source": "api",
+                "summary": f"Summary {i}",
+                "sentiment": "positive" if i % 2 else "negative",
+                "word_count": 3,
+            }
+        )
+    queued = time.perf_counter() - start
+    assert store.flush(timeout=5.0)
+    print(f"  ✅ 45 analyses queued in {queued * 1e3:.1f}ms and written behind")
+
+    page = store.query(model="llama3.2", limit=10)
+    seen = [entry["id"] for entry in page["items"]]
+    while page["next_cursor"] is not None:
+        page = store.query(model="llama3.2", limit=10, before=page["next_cursor"])
+        seen += [entry["id"] for entry in page["items"]]
+    assert len(seen) == 30 and seen == sorted(seen, reverse=True)
+    print("  ✅ Cursor pagination returns every match once, newest first")
+
+    matches = store.query(
+        content_hash=content_hash("Document number 2"), sentiment="negative"
+    )["items"]
+    assert len(matches) == 5
+    assert all(entry["summary"].startswith("Summary") for entry in matches)
+    assert "input_text" not in matches[0]
+    entry = store.get(matches[0]["id"])
+    assert entry["input_text"] == "Document number 2"
+    assert store.query(since=time.time() + 60)["items"] == []
+    print("  ✅ Filters on content hash, sentiment and time")
+
+    plan = " ".join(
+        str(row[-1])
+        for row in store._connect().execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM analyses "
+            "WHERE sentiment = ? ORDER BY id DESC LIMIT 10",
+            ("positive",),
+        )
+    )
+    assert "analyses_sentiment" in plan and "TEMP B-TREE" not in plan, plan
+    store.close()
+    assert not store.add({"input_text": "late", "sentiment": "neutral"})
+    print("  ✅ Filtered pages use the indexes without sorting")
+
+    return True
+
+
+def test_deadline():
+    """Test deadline propagation and cancellation of a streamed generation"""
+    print("\nTesting deadlines...")
+
+    import time
+
+    from langchain_core.messages import AIMessageChunk
+
+    from src.graph.nodes import generate
+    from src.utils.deadline import (
+        Deadline,
+        RequestCancelled,
+        check_deadline,
+        deadline_scope,
+    )
+
+    with deadline_scope(60) as outer:
+        check_deadline("start")
+        with deadline_scope(0.01) as inner:
+            time.sleep(0.02)
+            assert inner.reason == "deadline" and outer.reason is None
+        outer.cancel("disconnect")
+        try:
+            check_deadline("after")
+            assert False, "cancelled deadline should raise"
+        except RequestCancelled as e:
+            assert e.reason == "disconnect"
+    assert Deadline(parent=outer).reason == "disconnect"
+    print("  ✅ Deadlines expire, cancel and nest")
+
+    closed = []
+
+    class StreamingModel:
+        def stream(self, messages):
+            try:
+                for index in range(100):
+                    if index == 3:
+                        deadline.cancel("disconnect")
+                    yield AIMessageChunk(content=f"token{index} ")
+            finally:
+                closed.append(index)
+
+    with deadline_scope() as deadline:
+        try:
+            generate(StreamingModel(), [], "summary")
+            assert False, "generation should be cancelled"
+        except RequestCancelled:
+            pass
+    assert closed == [3]
+    print("  ✅ Cancelled generation stops streaming")
+
+    return True
+
+
+def test_adaptive_concurrency():
+    """Test the adaptive limiter against a simulated saturating server"""
+    print("\nTesting adaptive concurrency...")
+
+    import threading
+    import time
+
+    from langchain_core.messages import AIMessage
+
+    from src.graph.nodes import generate
+    from src.utils.concurrency import AdaptiveLimiter
+
+    class SaturatingModel:
+        """20 tokens at 2000 tok/s each, shared beyond 3 parallel calls"""
+
+        active = 0
+        lock = threading.Lock()
+
+        def invoke(self, messages):
+            with self.lock:
+                self.active += 1
+            generated = 0.0
+            while generated < 20:
+                time.sleep(0.002)
+                generated += 2000 * min(1.0, 3 / self.active) * 0.002
+            with self.lock:
+                self.active -= 1
+            return AIMessage(
+                content="x",
+                usage_metadata={
+                    "input_tokens": 0,
+                    "output_tokens": 20,
+                    "total_tokens": 20,
+                },
+            )
+
+    model = SaturatingModel()
+    limiter = AdaptiveLimiter("test:saturating", initial_limit=2)
+    stop = time.monotonic() + 3.0
+
+    def client():
+        while time.monotonic() < stop:
+            generate(model, [], "summary", limiter)
+
+    threads = [threading.Thread(target=client) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = limiter.snapshot()
+    assert snapshot["samples"] > 50 and snapshot["inflight"] == 0
+    assert 2 <= snapshot["limit"] <= 9, snapshot
+    print(f"  ✅ Limit settled at {snapshot['limit']} for saturation 3 (16 clients)")
+
+    fixed = AdaptiveLimiter("test:fixed", initial_limit=3, fixed=True)
+    for _ in range(20):
+        generate(model, [], "summary", fixed)
+    assert fixed.limit == 3
+    print("  ✅ Fixed limits do not adapt")
+
+    return True
+
+
+def test_priority_scheduling():
+    """Test priority classes at the model concurrency limiter"""
+    print("\nTesting priority scheduling...")
+
+    import threading
+    import time
+
+    from src.utils.concurrency import AdaptiveLimiter
+    from src.utils.priority import current_priority, priority_scope
+
+    with priority_scope("batch"):
+        assert current_priority() == "batch"
+        with priority_scope(None):
+            assert current_priority() == "batch"
+    assert current_priority() == "interactive"
+    try:
+        with priority_scope("urgent"):
+            pass
+        assert False, "unknown class accepted"
+    except ValueError:
+        pass
+    print("  ✅ Priority scope nests and rejects unknown classes")
+
+    def start_call(limiter, priority, release, started):
+        def run():
+            with priority_scope(priority), limiter.acquire():
+                started.append(priority)
+                release.wait()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 2
+        while not condition():
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.01)
+
+    # Without interactive traffic bulk work takes every slot
+    limiter = AdaptiveLimiter("test:reserve", initial_limit=2, fixed=True)
+    release, started = threading.Event(), []
+    threads = [start_call(limiter, "background", release, started) for _ in range(2)]
+    wait_for(lambda: len(started) == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # After an interactive call, one of the two slots is kept for the next
+    with limiter.acquire():
+        pass
+    release, started = threading.Event(), []
+    threads = [start_call(limiter, "background", release, started) for _ in range(2)]
+    wait_for(lambda: limiter.snapshot()["waiting"]["background"] == 1)
+    threads.append(start_call(limiter, "interactive", release, started))
+    wait_for(lambda: len(started) == 2)
+    assert started == ["background", "interactive"], started
+    release.set()
+    for thread in threads:
+        thread.join()
+    print("  ✅ Bulk work uses idle slots, but leaves one free for interactive calls")
+
+    # One slot: interactive calls get most of the freed slots
+    limiter = AdaptiveLimiter("test:weights", initial_limit=1, fixed=True, reserve=0)
+    hold, started = threading.Event(), []
+    threads = [start_call(limiter, "batch", hold, started)]
+    wait_for(lambda: started)
+    release, order = threading.Event(), []
+    release.set()
+    for priority in ["batch"] * 4 + ["interactive"] * 4:
+        threads.append(start_call(limiter, priority, release, order))
+    wait_for(lambda: sum(limiter.snapshot()["waiting"].values()) == 8)
+    hold.set()
+    for thread in threads:
+        thread.join()
+    assert order[:5].count("interactive") == 4, order
+    print(f"  ✅ Weighted order of freed slots: {' '.join(p[0] for p in order)}")
+
+    return True
+
+
+def test_circuit_breaker():
+    """Test breaker transitions and the degraded analysis"""
+    print("\nTesting circuit breaker...")
+
+    import time
+
+    from src.graph.nodes import degraded_analysis
+    from src.utils.breaker import CircuitBreaker, CircuitOpenError
+    from src.utils.deadline import RequestCancelled
+
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.2)
+
+    def fail(error):
+        try:
+            with breaker.call():
+                raise error
+        except type(error):
+            pass
+
+    fail(RequestCancelled("disconnect", "llm_stream"))
+    fail(ValueError("model not found"))
+    assert breaker.state == "closed" and breaker.failures == 0
+    print("  ✅ Cancellations and bad requests do not count")
+
+    fail(ConnectionError("refused"))
+    fail(ConnectionError("refused"))
+    assert breaker.state == "open"
+    start = time.perf_counter()
+    for call in (breaker.check, breaker.allow):
+        try:
+            call()
+            assert False, "open breaker let a call through"
+        except CircuitOpenError as e:
+            assert 0 < e.retry_after <= 0.2
+    assert time.perf_counter() - start < 0.01
+    print("  ✅ Opens after the threshold and rejects fast")
+
+    time.sleep(0.25)
+    assert breaker.snapshot()["state"] == "half_open"
+    fail(ConnectionError("still down"))
+    assert breaker.state == "open"
+    time.sleep(0.25)
+    with breaker.call():
+        try:
+            breaker.allow()
+            assert False, "second trial allowed"
+        except CircuitOpenError:
+            pass
+    assert breaker.state == "closed" and breaker.failures == 0
+    print("  ✅ Half-open trial reopens on failure and closes on success")
+
+    text = (
+        "The new library is fast and reliable. Users love the clean design. "
+        "Setup took only minutes. Support answered quickly and helpfully."
+    )
+    result = degraded_analysis({"input_text": text}, "circuit_open")
+    assert result["degraded"] == "circuit_open"
+    assert result["summary"] and result["sentiment_source"] == "lexicon"
+    assert result["sentiment"] == "positive"
+    print("  ✅ Degraded analysis uses extractive summary and lexicon sentiment")
+
+    return True
+
+
+def test_digest_workflow():
+    """Test topic clustering and the multi-document digest (mock provider)"""
+    print("\nTesting digest workflow...")
+
+    from src.graph.workflow import run_digest
+    from src.utils.topics import cluster_documents
+
+    documents = [
+        "Solar panels and wind turbines produce clean renewable energy.",
+        "The new solar farm supplies renewable energy to the region.",
+        "Stock markets fell sharply as investors worried about earnings.",
+        "Investors sold shares after weak earnings sent stock markets lower.",
+    ]
+    clusters = cluster_documents(documents)
+    assert sorted(c["documents"] for c in clusters) == [[0, 1], [2, 3]]
+    assert len(cluster_documents(documents, threshold=1.0, max_clusters=3)) == 3
+    print("  ✅ Documents grouped by topic")
+
+    digest = run_digest(documents, provider="mock", sentiment_strategy="lexicon")
+    assert [r["index"] for r in digest["documents"]] == [0, 1, 2, 3]
+    assert len(digest["clusters"]) == 2
+    assert all(c["summary"] for c in digest["clusters"])
+    assert digest["overall_summary"]
+    assert sum(digest["sentiment_distribution"].values()) == len(documents)
+    print("  ✅ Per-cluster and overall summaries produced")
+
+    again = run_digest(documents, provider="mock", sentiment_strategy="lexicon")
+    assert all(r["cached"] for r in again["documents"])
+    print("  ✅ Document analyses reused from the result cache")
+
+    return True
+
+
+def test_hedging():
+    """Test hedged calls: slow primary, failover and the hedge budget"""
+    print("\nTesting hedged requests...")
+
+    import time
+
+    from langchain_core.messages import AIMessageChunk
+
+    from src.utils.hedging import HEDGES, HEDGES_SKIPPED, HedgedChatModel, HedgePolicy
+
+    class FakeModel:
+        def __init__(self, delay=0.0, error=None):
+            self.delay = delay
+            self.error = error
+            self.closed = False
+
+        def stream(self, messages):
+            try:
+                time.sleep(self.delay)
+                if self.error:
+                    raise self.error
+                for word in ("fast ", "answer"):
+                    yield AIMessageChunk(content=word)
+            finally:
+                self.closed = True
+
+    def policy(**kwargs):
+        return HedgePolicy(initial_delay=0.05, min_delay=0.05, **kwargs)
+
+    slow, fast = FakeModel(delay=0.5), FakeModel()
+    won = HEDGES.get(task="hedge-test", winner="hedge")
+    model = HedgedChatModel(slow, [lambda: fast], policy(), "hedge-test")
+    start = time.perf_counter()
+    assert model.invoke([]).content == "fast answer"
+    assert time.perf_counter() - start < 0.4
+    assert HEDGES.get(task="hedge-test", winner="hedge") == won + 1
+    time.sleep(0.6)
+    assert slow.closed, "abandoned attempt still running"
+    print("  ✅ Hedge wins over a slow primary, which is abandoned")
+
+    broken = FakeModel(error=ConnectionError("refused"))
+    model = HedgedChatModel(broken, [FakeModel], policy(), "hedge-test")
+    assert model.invoke([]).content == "fast answer"
+    model = HedgedChatModel(broken, [lambda: broken], policy(), "hedge-test")
+    try:
+        model.invoke([])
+        assert False, "both attempts failed but no error raised"
+    except ConnectionError:
+        pass
+    print("  ✅ Fails over at once and raises when every replica fails")
+
+    skipped = HEDGES_SKIPPED.get(task="hedge-budget")
+    model = HedgedChatModel(
+        FakeModel(delay=0.2), [FakeModel], policy(budget=0.0), "hedge-budget"
+    )
+    model.invoke([])  # the initial credit
+    start = time.perf_counter()
+    model.invoke([])
+    assert time.perf_counter() - start >= 0.2
+    assert HEDGES_SKIPPED.get(task="hedge-budget") == skipped + 1
+    print("  ✅ Budget caps the hedges sent")
+
+    hedge_policy = HedgePolicy(percentile=90, min_samples=10, initial_delay=3)
+    assert hedge_policy.delay() == 3
+    for i in range(1, 11):
+        hedge_policy.observe(i / 10)
+    assert hedge_policy.delay() == 1.0
+    print("  ✅ Delay follows the time-to-first-token percentile")
+    return True
+
+
+def test_profiling():
+    """Test request profiles: tracked threads, output formats, retention"""
+    print("\nTesting profiling...")
+
+    import contextvars
+    import tempfile
+    import threading
+    import time
+
+    from src.utils import profiling
+    from src.utils.log import timed
+
+    def busy_step():
+        with timed("busy"):
+            end = time.perf_counter() + 0.1
+            while time.perf_counter() < end:
+                pass
+
+    def untracked():
+        time.sleep(0.1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        saved = profiling._store
+        profiling._store = profiling.ProfileStore(directory, retain=2)
+        try:
+            with profiling.profile_scope("test") as result:
+                workers = [
+                    threading.Thread(
+                        target=contextvars.copy_context().run,
+                        args=(busy_step,),
+                        name="step",
+                    ),
+                    threading.Thread(target=untracked, name="other"),
+                ]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+            profile = profiling.get_profile_store().get(result.profile_id)
+            threads = {thread["name"]: thread for thread in profile["profiles"]}
+            assert set(threads) == {"MainThread", "step"}, set(threads)
+            assert 50 < threads["step"]["endValue"] < 250, threads["step"]
+            collapsed = profiling.collapsed_stacks(profile)
+            assert any(
+                line.startswith("step;") and "busy_step" in line
+                for line in collapsed.splitlines()
+            ), collapsed
+            print("  ✅ Threads in timed() steps are sampled, others are not")
+
+            for _ in range(2):
+                with profiling.profile_scope("test"):
+                    pass
+            ids = [entry["id"] for entry in profiling.get_profile_store().list()]
+            assert len(ids) == 2 and result.profile_id not in ids, ids
+            assert profiling.get_profile_store().get(result.profile_id) is None
+            assert profiling.get_profile_store().get("../etc/passwd") is None
+            print("  ✅ Only the newest profiles are retained")
+
+            # A file that vanishes between listing and stat is skipped
+            os.symlink(
+                os.path.join(directory, "gone"),
+                os.path.join(directory, "gone.speedscope.json"),
+            )
+            ids = [entry["id"] for entry in profiling.get_profile_store().list()]
+            assert len(ids) == 2 and "gone" not in ids, ids
+            print("  ✅ Vanished profile files are skipped")
+        finally:
+            profiling._store = saved
+
+    return True
+
+
+def test_tracing():
+    """Test trace context parsing and spans of a workflow run"""
+    print("\nTesting tracing...")
+
+    import json
+    import tempfile
+
+    from src.graph.workflow import run_workflow
+    from src.utils import tracing
+
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    header = f"00-{trace_id}-{parent_id}-01"
+    assert tracing.parse_traceparent(header) == (trace_id, parent_id, True)
+    for invalid in (None, "garbage", f"00-{'0' * 32}-{parent_id}-01"):
+        assert tracing.parse_traceparent(invalid) is None, invalid
+    tracing.configure_tracing("off")
+    with tracing.span("off") as disabled:
+        assert disabled is tracing.DISABLED
+    print("  ✅ traceparent headers parsed, spans are no-ops when off")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = f"{directory}/traces.jsonl"
+        tracing.configure_tracing("file", path)
+        try:
+            with tracing.span("POST /api/analyze", tracing.SERVER, header):
+                run_workflow(
+                    "The team shipped the release on time. Customers were pleased.",
+                    provider="mock",
+                    sentiment_strategy="llm",
+                )
+        finally:
+            tracing.configure_tracing("off")
+        with open(path, encoding="utf-8") as f:
+            spans = [
+                span
+                for line in f
+                for resource in json.loads(line)["resourceSpans"]
+                for scope in resource["scopeSpans"]
+                for span in scope["spans"]
+            ]
+    by_name = {span["name"]: span for span in spans}
+    assert {span["traceId"] for span in spans} == {trace_id}
+    assert by_name["POST /api/analyze"]["parentSpanId"] == parent_id
+    chain = ["chat summary", "node summarizer", "workflow", "POST /api/analyze"]
+    for child, parent in zip(chain, chain[1:]):
+        assert by_name[child]["parentSpanId"] == by_name[parent]["spanId"], child
+    assert "node input_processor" in by_name and "chat sentiment" in by_name
+    print(f"  ✅ {len(spans)} spans in the caller's trace, nested by node and call")
+
+    return True
+
+
+def test_analysis_session():
+    """Test a WebSocket analysis session with two analyses in flight"""
+    print("\nTesting analysis sessions...")
+
+    from fastapi.testclient import TestClient
+
+    import api
+
+    texts = {
+        "a": "The team shipped the release on time. Customers were pleased.",
+        "b": "The outage lasted all night. Support was slow and users were angry.",
+    }
+    client = TestClient(api.app)
+    with client.websocket_connect("/api/session/test-session?provider=mock") as ws:
+        ready = ws.receive_json()
+        assert ready["type"] == "ready" and ready["provider"] == "mock", ready
+        for run_id, text in texts.items():
+            ws.send_json({"type": "analyze", "id": run_id, "text": text})
+        ws.send_json({"type": "analyze", "id": "c", "text": "Short"})
+        events = {"a": [], "b": [], "c": []}
+        while not all(
+            events[run_id] and events[run_id][-1]["type"] == "result"
+            for run_id in texts
+        ):
+            event = ws.receive_json()
+            events[event["id"]].append(event)
+        assert [e["type"] for e in events["c"]] == ["error"]
+        assert events["c"][0]["status"] == 400
+        for run_id in texts:
+            kinds = {e["type"] for e in events[run_id]}
+            nodes = [e["node"] for e in events[run_id] if e["type"] == "node"]
+            tokens = {e["task"] for e in events[run_id] if e["type"] == "token"}
+            assert kinds == {"node", "token", "result"}, kinds
+            assert nodes[0] == "input_processor" and "summarizer" in nodes, nodes
+            assert tokens == {"summary", "sentiment"}, tokens
+            result = events[run_id][-1]
+            assert result["summary"] and result["sentiment"] in (
+                "positive",
+                "negative",
+                "neutral",
+            ), result
+        print("  ✅ Two analyses multiplexed with node and token events")
+
+        ws.send_json({"type": "analyze", "id": "a", "text": texts["a"] + " Again."})
+        ws.send_json({"type": "cancel", "id": "a"})
+        event = ws.receive_json()
+        while event["type"] in ("node", "token"):
+            event = ws.receive_json()
+        assert event["id"] == "a" and event["type"] in ("cancelled", "result"), event
+        ws.send_text("not json")
+        assert ws.receive_json()["status"] == 400
+        print(f"  ✅ Cancel answered with '{event['type']}', bad messages rejected")
+
+    with client.websocket_connect("/api/session/x?provider=nope") as ws:
+        assert ws.receive_json()["status"] == 400
+    print("  ✅ Unknown provider refused")
+
+    return True
+
+
+def test_speculation():
+    """Test speculative analyses feeding the result cache"""
+    print("\nTesting speculative analysis...")
+
+    import time
+
+    from fastapi.testclient import TestClient
+
+    import api
+    from src.utils.speculation import SpeculationRegistry
+
+    registry = SpeculationRegistry(max_inflight=2)
+    first = registry.begin("tab-1", "key-a")
+    assert registry.supersede("tab-1", "key-a") is True
+    assert registry.supersede("tab-1", "key-b") is False
+    assert first.reason == "superseded"
+    second = registry.begin("tab-1", "key-b")
+    assert registry.cancel("tab-1") and second.reason == "cancelled"
+    assert not registry.cancel("tab-1")
+    registry.begin("tab-2", "key-c")
+    registry.begin("tab-3", "key-d")
+    assert registry.begin("tab-4", "key-e") is None
+    assert registry.take("key-c") and not registry.take("key-c")
+    print("  ✅ A new text supersedes the tab's speculation, running ones are capped")
+
+    text = "Speculation test: the launch went well and the team celebrated it."
+    body = {"text": text, "provider": "mock", "speculation_id": "test-tab"}
+    with TestClient(api.app) as client:
+        response = client.post("/api/speculate", json=body)
+        assert response.status_code == 202, response.text
+        assert response.json()["status"] in ("started", "in_flight", "cached")
+        for _ in range(100):
+            status = client.post("/api/speculate", json=body).json()["status"]
+            if status == "cached":
+                break
+            time.sleep(0.05)
+        assert status == "cached", status
+        result = client.post(
+            "/api/analyze", json={"text": text, "provider": "mock"}
+        ).json()
+        assert result["cached"] is True, result
+        metrics = client.get("/metrics").text
+        assert "speculation_hits_total" in metrics
+        invalid = client.post("/api/speculate", json={**body, "text": "short"})
+        assert invalid.status_code == 400
+        assert client.delete("/api/speculate/test-tab").json() == {"cancelled": False}
+        preflight = client.options(
+            "/api/speculate/test-tab",
+            headers={
+                "Origin": "http://localhost:5000",
+                "Access-Control-Request-Method": "DELETE",
+            },
+        )
+        assert preflight.status_code == 200, preflight.text
+    print("  ✅ /api/analyze is answered from the speculative result")
+
+    import threading
+
+    from src.utils.cache import ResultCache, get_or_compute
+    from src.utils.concurrency import AdaptiveLimiter
+    from src.utils.priority import BACKGROUND, BATCH, INTERACTIVE, priority_scope
+
+    # Three slots, two of them reserved for interactive calls (seen just
+    # now); a batch call holds the one bulk work may use
+    limiter = AdaptiveLimiter("test:promotion", initial_limit=3, fixed=True, reserve=2)
+    with priority_scope(INTERACTIVE), limiter.acquire():
+        pass
+    started, release, order, results = threading.Event(), threading.Event(), [], {}
+
+    def until(condition):
+        for _ in range(200):
+            if condition():
+                return
+            time.sleep(0.01)
+        raise AssertionError("timed out")
+
+    def occupy():
+        with priority_scope(BATCH), limiter.acquire():
+            started.set()
+            release.wait(5)
+
+    def analysis(name, priority):
+        def model_call():
+            with limiter.acquire():
+                order.append(name)
+            return {"summary": name}
+
+        with priority_scope(priority):
+            results[name] = get_or_compute(
+                "promotion-key", model_call, cache=ResultCache()
+            )
+
+    occupant = threading.Thread(target=occupy)
+    occupant.start()
+    started.wait(5)
+    speculation = threading.Thread(target=analysis, args=("speculation", BACKGROUND))
+    speculation.start()
+    until(lambda: limiter.snapshot()["waiting"][BACKGROUND] == 1)
+    # The joining request moves the queued speculative call to its class,
+    # which may use the reserved slots
+    analyze = threading.Thread(target=analysis, args=("analyze", INTERACTIVE))
+    analyze.start()
+    until(lambda: "analyze" in results)
+    assert order == ["speculation"] and occupant.is_alive(), order
+    release.set()
+    for thread in (occupant, speculation, analyze):
+        thread.join(5)
+    assert results["analyze"] == ({"summary": "speculation"}, "coalesced")
+    print("  ✅ A request joining a speculation raises it to an interactive slot")
+
+    return True
+
+
 def test_validation():
     """Test input validation"""
     print("\nTesting input validation...")
@@ -112,6 +1044,24 @@ def test_validation():
     assert error is not None
     print(f"  ✅ Invalid input rejected: {error}")
 
+    from src.utils.log import valid_request_id
+
+    assert valid_request_id("req-1.a_B") == "req-1.a_B"
+    assert valid_request_id("a\nb") is None
+    assert valid_request_id("x" * 65) is None
+    assert valid_request_id(None) is None
+
+    from fastapi.testclient import TestClient
+    from api import app
+
+    client = TestClient(app)
+    response = client.get("/api/models", headers={"X-Request-ID": "forged\tline"})
+    assert response.headers["x-request-id"] != "forged\tline"
+    assert valid_request_id(response.headers["x-request-id"])
+    response = client.get("/api/models", headers={"X-Request-ID": "caller-42"})
+    assert response.headers["x-request-id"] == "caller-42"
+    print("  ✅ Unsafe X-Request-ID values replaced, valid ones echoed")
+
     return True
 
 
@@ -167,6 +1117,213 @@ def test_model_config():
     return True
 
 
+def test_model_providers():
+    """Test provider selection"""
+    print("\nTesting model providers...")
+
+    from src.config.models import get_model, get_provider, list_providers
+
+    assert "mock" in list_providers()
+    model = get_model("llama3.2", provider="mock")
+    response = model.invoke(
+        [{"role": "system", "content": ""}, type("M", (), {"content": "Summarize"})()]
+    )
+    assert "summary" in response.content
+    print("  ✅ Mock provider returns canned responses")
+
+    try:
+        get_provider("does-not-exist")
+        raise AssertionError("Unknown provider accepted")
+    except ValueError:
+        print("  ✅ Unknown provider rejected")
+
+    return True
+
+
+def test_generation_profiles():
+    """Test per-task generation limits"""
+    print("\nTesting generation profiles...")
+
+    from src.config.models import ModelConfig, SENTIMENT_SCHEMA, get_provider
+    from src.graph.nodes import parse_sentiment
+
+    config = ModelConfig("llama3.2", provider="ollama").for_task("sentiment")
+    assert config.num_predict == 8 and config.output_format == SENTIMENT_SCHEMA
+    model = get_provider("ollama").create(config)
+    assert model.num_predict == 8 and model.stop == ["\n"]
+    print("  ✅ Sentiment profile caps output and constrains the format")
+
+    summary = get_provider("ollama").configure(model, config.for_task("summary"))
+    assert summary.num_predict == 200 and summary.format == ""
+    print("  ✅ Per-task models derived without a new client")
+
+    assert parse_sentiment('"positive"') == "positive"
+    assert parse_sentiment("Mixed. The text praises...") == "mixed"
+    print("  ✅ Sentiment answers normalized")
+
+    from src.config.models import get_model_from_preset
+    from src.graph.workflow import create_workflow, run_workflow
+
+    creative = get_model_from_preset("creative", provider="ollama", task="summary")
+    assert creative.num_predict == 320 and creative.temperature == 0.9
+    strict = get_model_from_preset("deterministic", provider="ollama", task="summary")
+    assert strict.num_predict == 160 and strict.stop == ["\n\n"]
+    print("  ✅ Preset profiles applied per task")
+
+    result = run_workflow(
+        "The team shipped the release on time.", provider="mock", preset="creative"
+    )
+    assert result["summary"].startswith("This is a mock summary"), result
+    try:
+        create_workflow(provider="mock", preset="does-not-exist")
+        raise AssertionError("Unknown preset accepted")
+    except ValueError:
+        print("  ✅ Workflow runs with a preset and rejects unknown ones")
+
+    return True
+
+
+def test_model_routing():
+    """Test model_name=auto routing by length, quality and measured latency"""
+    print("\nTesting model routing...")
+
+    import time
+
+    from fastapi.testclient import TestClient
+
+    import api
+    from src.config import routing
+
+    short = "Lunch moved to noon. Everyone liked the new place."
+    long = " ".join(["The quarterly report covers revenue and hiring."] * 60)
+    assert routing.route(short)["model"] == "qwen2.5-coder:0.5b"
+    assert routing.route(short, "standard")["model"] == "llama3.2:1b"
+    decision = routing.route(long)
+    assert decision["model"] == "llama3.2:1b", decision
+    assert decision["reason"] == "smallest_adequate"
+    print("  ✅ Short notes and long reports routed to different models")
+
+    tracker = routing.LATENCY
+    try:
+        routing.LATENCY = routing.LatencyTracker(alpha=1.0)
+        # The 1b model answering 10x slower than declared misses the budget
+        routing.observe_call(
+            "llama3.2:1b", 40.0, {"input_tokens": 500, "output_tokens": 100}
+        )
+        decision = routing.route(long, timeout=20)
+        assert decision["model"] == "llama3.2", decision
+        assert decision["budget_seconds"] == 20
+
+        usage = {"input_tokens": 100, "output_tokens": 60}
+        # A cold load is not counted against the model
+        routing.LATENCY = routing.LatencyTracker()
+        routing.observe_call(
+            "qwen2.5-coder:0.5b", 40.0, usage, {"load_duration": 39_500_000_000}
+        )
+        assert routing.LATENCY.slowdown("qwen2.5-coder:0.5b") < 1.0
+
+        # One slow call is blended with the prior, and fades while unused
+        routing.LATENCY = routing.LatencyTracker(half_life=0.05)
+        routing.observe_call("qwen2.5-coder:0.5b", 40.0, usage)
+        assert routing.route(short, timeout=5)["model"] != "qwen2.5-coder:0.5b"
+        time.sleep(0.5)
+        assert routing.route(short, timeout=5)["model"] == "qwen2.5-coder:0.5b"
+    finally:
+        routing.LATENCY = tracker
+    try:
+        routing.route(short, "premium")
+        assert False, "unknown tier accepted"
+    except ValueError:
+        pass
+    print("  ✅ Measured slowdown moves routing to a faster model, then fades")
+
+    import os
+
+    saved = os.environ.get("ROUTER_MODELS")
+    try:
+        os.environ["ROUTER_MODELS"] = "llama3.2:1b, "
+        assert [p.name for p in routing.routable_models()] == ["llama3.2:1b"]
+        os.environ["ROUTER_MODELS"] = " "
+        assert routing.route(short)["model"] == "qwen2.5-coder:0.5b"
+    finally:
+        if saved is None:
+            os.environ.pop("ROUTER_MODELS", None)
+        else:
+            os.environ["ROUTER_MODELS"] = saved
+    print("  ✅ Blank ROUTER_MODELS entries ignored")
+
+    client = TestClient(api.app)
+    response = client.post(
+        "/api/analyze",
+        json={"text": short, "model_name": "auto", "provider": "mock"},
+    )
+    body = response.json()
+    assert response.status_code == 200, body
+    assert body["model_used"] == "qwen2.5-coder:0.5b"
+    assert body["routing"]["reason"] == "smallest_adequate"
+    assert "model_routes_total" in client.get("/metrics").text
+    print("  ✅ /api/analyze reports the routing decision")
+
+    return True
+
+
+def test_model_cascade():
+    """Test the quality gates and the small-to-large model cascade"""
+    print("\nTesting model cascade...")
+
+    from fastapi.testclient import TestClient
+
+    import api
+    from src.graph.workflow import run_workflow
+    from src.utils.quality import check_quality
+
+    text = (
+        "The team shipped the release on time. Customers were pleased with "
+        "the new dashboard and the faster reports. Support tickets dropped "
+        "by a third after the release."
+    )
+    good = "The team shipped the release on time and customers liked the dashboard."
+    assert check_quality(text, good, "positive") == []
+    assert check_quality(text, good, "Positive!") == ["sentiment_label"]
+    assert "summary_length" in check_quality(text, "Release.", "positive")
+    assert "source_overlap" in check_quality(
+        text, "The weather in the mountains was cold and windy.", "neutral"
+    )
+    looping = "the release was on time " * 6
+    assert "repetition" in check_quality(text, looping, "positive")
+    print("  ✅ Gates catch bad labels, lengths, off-topic and looping summaries")
+
+    models = ["qwen2.5-coder:0.5b", "llama3.2:1b", "llama3.2"]
+    # The mock's canned summary fits a text about summaries only
+    fitting = (
+        "The summary captures the main points of the provided text and gives a "
+        "concise overview. The text is provided for the summary."
+    )
+    cascade = run_workflow(fitting, provider="mock", cascade_models=models)["cascade"]
+    assert cascade["outcome"] == "accepted" and cascade["model"] == models[0]
+    assert cascade["escalations"] == 0 and "saved_ms" in cascade
+    cascade = run_workflow(text, provider="mock", cascade_models=models)["cascade"]
+    assert cascade["outcome"] == "exhausted" and cascade["model"] == models[-1]
+    assert [a["model"] for a in cascade["attempts"]] == models
+    assert all(a["failures"] for a in cascade["attempts"])
+    print("  ✅ Passing answers stop the cascade, failing ones escalate")
+
+    client = TestClient(api.app)
+    response = client.post(
+        "/api/analyze", json={"text": fitting, "provider": "mock", "cascade": True}
+    )
+    body = response.json()
+    assert response.status_code == 200, body
+    assert body["model_used"] == models[0] and body["cascade"]["escalations"] == 0
+    metrics = client.get("/metrics").text
+    for name in ("cascade_runs_total", "cascade_escalations_total"):
+        assert name in metrics, name
+    assert 'cascade_seconds_total{kind="largest_model"}' in metrics
+    print("  ✅ /api/analyze reports the cascade; escalations and time in /metrics")
+
+    return True
+
+
 def test_workflow_creation():
     """Test workflow creation (without execution)"""
     print("\nTesting workflow creation...")
@@ -188,6 +1345,70 @@ def test_workflow_creation():
         return True  # Don't fail the test if Ollama isn't available
 
 
+def test_workflow_run():
+    """Test a complete run with the mock provider and LLM sentiment"""
+    print("\nTesting workflow run...")
+
+    from src.graph.workflow import run_workflow
+
+    result = run_workflow(
+        "The team shipped the release on time. Customers were pleased.",
+        model_name="llama3.2",
+        provider="mock",
+        sentiment_strategy="llm",
+    )
+    assert result["summary"].startswith("This is a mock summary"), result
+    assert result["sentiment"] == "neutral" and result["sentiment_source"] == "llm"
+    print("  ✅ Summary and LLM sentiment produced")
+
+    return True
+
+
+def test_checkpoint_blobs():
+    """Test the blob store and checkpoints holding references to it"""
+    print("\nTesting checkpoint blobs...")
+
+    import tempfile
+
+    from src.graph.workflow import create_workflow
+    from src.utils.blobs import BlobStore
+
+    text = "The quarterly report shows steady growth in every region. " * 100
+    sizes = {}
+    for compression in ("zlib", "off"):
+        store = BlobStore(compression=compression)
+        key = store.put(text.encode())
+        assert store.put(text.encode()) == key and len(store) == 1
+        assert store.get(key).decode() == text
+        sizes[compression] = store.stats()["memory_bytes"]
+    assert sizes["zlib"] < sizes["off"] / 10, sizes
+    print("  ✅ Blobs are stored once per content and compressed")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = BlobStore(max_memory=100, spill_dir=directory)
+        keys = [store.put(f"{i} {text}".encode()) for i in range(5)]
+        stats = store.stats()
+        assert stats["disk_bytes"] > 0 and stats["memory_bytes"] <= 100, stats
+        assert all(store.get(k).decode() == f"{i} {text}" for i, k in enumerate(keys))
+    print("  ✅ Least recently used blobs spill to disk")
+
+    workflow = create_workflow(
+        model_name="llama3.2", provider="mock", extractive_ratio=0.3
+    )
+    config = {"configurable": {"thread_id": "blobs"}}
+    for _ in range(2):
+        workflow.invoke({"input_text": text}, config=config)
+    assert workflow.get_state(config).values["input_text"] == text
+    history = list(workflow.get_state_history(config))
+    condensed = workflow.get_state(config).values["condensed_text"]
+    store = workflow.checkpointer.serde.store
+    # The input (and a long condensed text), however many checkpoints hold it
+    assert len(store) == 1 + (len(condensed) >= 1024), store.stats()
+    print(f"  ✅ {len(history)} checkpoints share {len(store)} blob(s)")
+
+    return True
+
+
 def run_all_tests():
     """Run all tests"""
     print("=" * 70)
@@ -196,12 +1417,35 @@ def run_all_tests():
 
     tests = [
         ("Imports", test_imports),
+        ("Lazy Imports", test_lazy_imports),
         ("State Definition", test_state_definition),
         ("Input Processor", test_input_processor),
+        ("Extractive Condenser", test_extractive_condenser),
+        ("Lexicon Sentiment", test_lexicon_sentiment),
+        ("Result Cache", test_result_cache),
+        ("Analysis Result", test_analysis_result),
+        ("Transfer Helpers", test_transfer_helpers),
+        ("Digest Workflow", test_digest_workflow),
+        ("History Store", test_history_store),
+        ("Deadlines", test_deadline),
+        ("Adaptive Concurrency", test_adaptive_concurrency),
+        ("Priority Scheduling", test_priority_scheduling),
+        ("Circuit Breaker", test_circuit_breaker),
+        ("Hedged Requests", test_hedging),
+        ("Profiling", test_profiling),
+        ("Tracing", test_tracing),
+        ("Analysis Sessions", test_analysis_session),
+        ("Speculative Analysis", test_speculation),
         ("Validation", test_validation),
         ("Formatting", test_formatting),
         ("Model Config", test_model_config),
+        ("Model Providers", test_model_providers),
+        ("Generation Profiles", test_generation_profiles),
+        ("Model Routing", test_model_routing),
+        ("Model Cascade", test_model_cascade),
         ("Workflow Creation", test_workflow_creation),
+        ("Workflow Run", test_workflow_run),
+        ("Checkpoint Blobs", test_checkpoint_blobs),
     ]
 
     results = []
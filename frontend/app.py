@@ -6,10 +6,38 @@ LangGraph text analysis backend. It communicates with the FastAPI
 backend via REST API calls.
 """
 
-from flask import Flask, render_template, request, jsonify, flash
+from collections import OrderedDict
+from flask import (
+    Flask,
+    render_template,
+    request,
+    jsonify,
+    flash,
+    g,
+    send_from_directory,
+    url_for,
+)
+import gzip
+import hashlib
+import json
+import random
+import re
 import requests
 import os
 import logging
+import mimetypes
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from build_assets import is_current
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is used without it
+    brotli = None
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +57,274 @@ API_BASE_URL = os.environ.get(
 
 logger.info(f"Frontend initialized. Backend API: {API_BASE_URL}")
 
+# Seconds to wait for an analysis. The backend is asked to give up a little
+# earlier, so it stops the LLM work and answers 504 before this fires.
+BACKEND_TIMEOUT = float(os.environ.get("BACKEND_TIMEOUT", "60"))
+BACKEND_DEADLINE_MARGIN = 5.0
+# The backend answers speculation requests without waiting for the analysis
+SPECULATE_TIMEOUT = 5.0
+
+# Correlation IDs accepted from the browser; the backend applies the same rule
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "500"))
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+# Last analysis per (text, model) with its backend ETag, so repeated
+# requests are revalidated with If-None-Match instead of re-transferred
+ANALYSIS_ETAG_CACHE_SIZE = 256
+_analysis_etags = OrderedDict()
+_analysis_etags_lock = threading.Lock()
+
+# Fingerprinted build of the static files (python build_assets.py). Their
+# URLs change with their content, so browsers may cache them for good.
+ASSET_DIST_DIR = os.path.join(app.static_folder, "dist")
+ASSET_MAX_AGE = 365 * 24 * 3600
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def load_asset_manifest():
+    """
+    Source path -> built path, or {} without a build (plain URLs)
+
+    Files edited since the build are left out, so their current version
+    is served from its plain URL rather than the stale build.
+    """
+    try:
+        with open(os.path.join(ASSET_DIST_DIR, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        logger.info("No asset build found; serving unfingerprinted static files")
+        return {}
+    static_dir = Path(app.static_folder)
+    for source, built in list(manifest.items()):
+        if not is_current(static_dir / source, built):
+            logger.warning(
+                "%s changed since the asset build; serving it unfingerprinted "
+                "(run python build_assets.py)",
+                source,
+            )
+            del manifest[source]
+    return manifest
+
+
+ASSET_MANIFEST = load_asset_manifest()
+
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static file, fingerprinted when the asset build has it"""
+    return url_for("static", filename=ASSET_MANIFEST.get(filename, filename))
+
+
+@app.route("/static/dist/<path:filename>")
+def built_asset(filename):
+    """
+    Serve the asset build: immutable, and precompressed when the client
+    accepts an encoding a variant was built for
+    """
+    accepted = request.headers.get("Accept-Encoding", "").lower()
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in PRECOMPRESSED:
+        variant = filename + suffix
+        if encoding in accepted and os.path.isfile(
+            os.path.join(ASSET_DIST_DIR, variant)
+        ):
+            response = send_from_directory(
+                ASSET_DIST_DIR, variant, mimetype=mimetype, max_age=ASSET_MAX_AGE
+            )
+            response.headers["Content-Encoding"] = encoding
+            # Saved under the built name, not the .gz/.br file's
+            del response.headers["Content-Disposition"]
+            break
+    else:
+        response = send_from_directory(ASSET_DIST_DIR, filename, max_age=ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+# Tracing: off, console or file. The file exporter appends OTLP/JSON lines
+# to the same default file as the backend (see backend/src/utils/tracing.py)
+TRACING = os.environ.get("TRACING", "off").lower()
+TRACE_FILE = os.environ.get("TRACE_FILE") or os.path.join(
+    tempfile.gettempdir(), "text-analysis-traces.jsonl"
+)
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "text-analysis-frontend")
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One span of a W3C trace, exported when it ends"""
+
+    KINDS = {"server": 2, "client": 3}
+
+    def __init__(self, name, kind, trace_id, parent_id, sampled):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.attributes = {}
+        self.error = None
+
+    @classmethod
+    def from_headers(cls, name, headers):
+        """Server span continuing the caller's traceparent, if valid"""
+        match = _TRACEPARENT.match(headers.get("traceparent", "").strip().lower())
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            return cls(name, "server", trace_id, parent_id, int(flags, 16) & 1 == 1)
+        sampled = random.random() < TRACE_SAMPLE_RATE
+        return cls(name, "server", os.urandom(16).hex(), None, sampled)
+
+    def child(self, name, kind="client"):
+        return Span(name, kind, self.trace_id, self.span_id, self.sampled)
+
+    @property
+    def traceparent(self):
+        flags = "01" if self.sampled else "00"
+        return f"00-{self.trace_id}-{self.span_id}-{flags}"
+
+    def end(self):
+        if not self.sampled:
+            return
+        end_ns = time.time_ns()
+        if TRACING == "console":
+            attributes = " ".join(f"{k}={v}" for k, v in self.attributes.items())
+            logger.info(
+                "span trace=%s id=%s parent=%s %s %.1fms %s",
+                self.trace_id,
+                self.span_id,
+                self.parent_id or "-",
+                self.name,
+                (end_ns - self.start_ns) / 1e6,
+                attributes,
+            )
+            return
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [
+                {
+                    "key": key,
+                    "value": (
+                        {"intValue": str(value)}
+                        if isinstance(value, int)
+                        else {"stringValue": str(value)}
+                    ),
+                }
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {
+                                    "key": "service.name",
+                                    "value": {"stringValue": SERVICE_NAME},
+                                }
+                            ]
+                        },
+                        "scopeSpans": [
+                            {"scope": {"name": "frontend"}, "spans": [span]}
+                        ],
+                    }
+                ]
+            },
+            separators=(",", ":"),
+        )
+        # One append per line, so the backend can write to the same file
+        fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (line + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+
+
+@app.before_request
+def start_request_span():
+    """Trace API requests when TRACING is on, joining the browser's trace"""
+    if TRACING != "off" and request.path.startswith("/api/"):
+        g.span = Span.from_headers(f"{request.method} {request.path}", request.headers)
+        g.span.attributes["http.request.method"] = request.method
+
+
+@app.after_request
+def record_response_status(response):
+    span = g.get("span")
+    if span is not None:
+        span.attributes["http.response.status_code"] = response.status_code
+        if response.status_code >= 500:
+            span.error = f"HTTP {response.status_code}"
+    return response
+
+
+@app.teardown_request
+def end_request_span(error=None):
+    span = g.pop("span", None)
+    if span is not None:
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        span.end()
+
+
+def _choose_encoding(accept_encoding):
+    """Preferred encoding the client accepts: br (if available), gzip or None"""
+    accepted = accept_encoding.lower()
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress text responses above COMPRESSION_MIN_SIZE
+
+    Uses brotli when the brotli package is installed, otherwise gzip.
+    """
+    if (
+        response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code >= 300
+        or "Content-Encoding" in response.headers
+        or not response.content_type.startswith(COMPRESSIBLE_TYPES)
+    ):
+        return response
+
+    encoding = _choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=4))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=6, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
 
 @app.route("/")
 def index():
@@ -79,23 +375,78 @@ def analyze():
                 400,
             )
 
-        logger.info(f"Received request to analyze {len(text)} characters")
+        # Correlation ID shared with the backend's request summary log
+        request_id = request.headers.get("X-Request-ID", "")
+        if not REQUEST_ID_PATTERN.fullmatch(request_id):
+            # Unsafe caller IDs (too long, or breaking log lines) are replaced
+            request_id = uuid.uuid4().hex[:16]
+        logger.info("[%s] Forwarding %d characters to backend", request_id, len(text))
 
         # Forward request to backend API
         backend_url = f"{API_BASE_URL}/api/analyze"
-        logger.info(f"Forwarding to backend: {backend_url}")
 
-        response = requests.post(
-            backend_url,
-            json={"text": text, "model_name": model_name},
-            timeout=60,  # 60 second timeout for LLM processing
-        )
-
-        # Check if request was successful
-        if response.status_code == 200:
+        # Revalidate a previous result for the same input instead of
+        # transferring it again
+        cache_key = hashlib.sha256(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+        with _analysis_etags_lock:
+            previous = _analysis_etags.get(cache_key)
+        headers = {
+            "X-Request-ID": request_id,
+            # Someone is waiting on the page, ahead of batch work
+            "X-Priority": "interactive",
+            "X-Request-Timeout": str(
+                max(1.0, BACKEND_TIMEOUT - BACKEND_DEADLINE_MARGIN)
+            ),
+        }
+        if previous:
+            headers["If-None-Match"] = previous[0]
+
+        # The backend's spans join this request's trace
+        span = g.get("span")
+        client_span = span.child(f"POST {backend_url}") if span else None
+        if client_span is not None:
+            headers["traceparent"] = client_span.traceparent
+        try:
+            response = requests.post(
+                backend_url,
+                # The page already has the text, so skip echoing it back
+                json={"text": text, "model_name": model_name, "echo_input": False},
+                headers=headers,
+                timeout=BACKEND_TIMEOUT,
+            )
+            if client_span is not None:
+                client_span.attributes["http.response.status_code"] = (
+                    response.status_code
+                )
+        except requests.exceptions.RequestException as e:
+            if client_span is not None:
+                client_span.error = type(e).__name__
+            raise
+        finally:
+            if client_span is not None:
+                client_span.end()
+
+        if response.status_code == 304 and previous:
+            etag, result = previous
+            logger.info("[%s] Analysis unchanged (304)", request_id)
+        elif response.status_code == 200:
             result = response.json()
-            logger.info("Analysis completed successfully")
-            return jsonify(result), 200
+            etag = response.headers.get("ETag")
+            if etag:
+                with _analysis_etags_lock:
+                    _analysis_etags[cache_key] = (etag, result)
+                    _analysis_etags.move_to_end(cache_key)
+                    while len(_analysis_etags) > ANALYSIS_ETAG_CACHE_SIZE:
+                        _analysis_etags.popitem(last=False)
+            logger.info("[%s] Analysis completed successfully", request_id)
+        else:
+            result = None
+
+        if result is not None:
+            # The browser revalidates the same way against this proxy
+            if etag and request.if_none_match.contains(etag.strip('"')):
+                return "", 304, {"ETag": etag}
+            return jsonify(result), 200, {"ETag": etag} if etag else {}
         else:
             error_detail = response.json().get("detail", "Unknown error")
             logger.error(f"Backend error: {error_detail}")
@@ -138,6 +489,82 @@ def analyze():
         )
 
 
+def forward_speculation(method, path, payload=None):
+    """Send a speculation request to the backend, traced as a client span"""
+    backend_url = f"{API_BASE_URL}{path}"
+    headers = {"X-Priority": "background"}
+    span = g.get("span")
+    client_span = span.child(f"{method} {backend_url}") if span else None
+    if client_span is not None:
+        headers["traceparent"] = client_span.traceparent
+    try:
+        response = requests.request(
+            method,
+            backend_url,
+            json=payload,
+            headers=headers,
+            timeout=SPECULATE_TIMEOUT,
+        )
+        if client_span is not None:
+            client_span.attributes["http.response.status_code"] = response.status_code
+        return response
+    except requests.exceptions.RequestException as e:
+        if client_span is not None:
+            client_span.error = type(e).__name__
+        raise
+    finally:
+        if client_span is not None:
+            client_span.end()
+
+
+def relay_speculation(response, fallback):
+    """
+    The backend's answer, or fallback when its body is not JSON (e.g. an
+    error page from a proxy in front of a failing backend)
+    """
+    try:
+        return jsonify(response.json()), response.status_code
+    except ValueError:
+        logger.warning(
+            "Speculation answered %s without a JSON body", response.status_code
+        )
+        return jsonify(fallback), response.status_code if not response.ok else 502
+
+
+@app.route("/api/speculate", methods=["POST"])
+def speculate():
+    """
+    Proxy for speculative analyses sent while the user is typing
+
+    Forwards exactly the fields /api/analyze forwards, so the backend
+    caches the result under the key the later analysis will look up.
+    Failures are not shown to the user; the page only logs them.
+    """
+    data = request.get_json(silent=True) or {}
+    payload = {
+        "text": data.get("text", "").strip(),
+        "model_name": data.get("model_name", "qwen2.5-coder:0.5b"),
+        "speculation_id": data.get("speculation_id", ""),
+    }
+    try:
+        response = forward_speculation("POST", "/api/speculate", payload)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Speculation not forwarded: %s", e)
+        return jsonify({"status": "unavailable"}), 503
+    return relay_speculation(response, {"status": "unavailable"})
+
+
+@app.route("/api/speculate/<speculation_id>", methods=["DELETE"])
+def cancel_speculation(speculation_id):
+    """Proxy cancelling the speculation of a page (its text was cleared)"""
+    try:
+        response = forward_speculation("DELETE", f"/api/speculate/{speculation_id}")
+    except requests.exceptions.RequestException as e:
+        logger.warning("Speculation cancel not forwarded: %s", e)
+        return jsonify({"cancelled": False}), 503
+    return relay_speculation(response, {"cancelled": False})
+
+
 @app.route("/api/models", methods=["GET"])
 def get_models():
     """
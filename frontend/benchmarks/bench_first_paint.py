@@ -0,0 +1,120 @@
+"""
+Simulated first paint of the analysis page
+
+Loads the page through the Flask test client the way a browser would:
+the HTML, then its render-blocking stylesheets (first paint) and its
+script (interactive). The bytes and cache headers of every response are
+measured, and the load time is simulated on a network profile, as
+Lighthouse's simulated throttling does:
+
+- cold: empty cache. Each round of requests costs one round trip, and
+  the bytes of the round are sent at the profile's bandwidth
+- repeat: a later visit. Files whose Cache-Control allows it come from
+  the cache. The others are revalidated with a conditional request,
+  which is another round trip
+
+The Google Fonts stylesheet is left out; it is the same in every build.
+
+Usage:
+    python benchmarks/bench_first_paint.py
+    python benchmarks/bench_first_paint.py --rtt 40 --kbps 10240   # desktop
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as frontend  # noqa: E402
+
+ACCEPT = {"Accept-Encoding": "gzip, br"}
+_STYLESHEET = re.compile(r'<link rel="stylesheet" href="(/static/[^"]+)"')
+_SCRIPT = re.compile(r'<script src="(/static/[^"]+)"')
+
+
+def fetch(client, url, headers=None):
+    """(bytes sent, server seconds, response)"""
+    start = time.perf_counter()
+    response = client.get(url, headers={**ACCEPT, **(headers or {})})
+    elapsed = time.perf_counter() - start
+    body = response.get_data()
+    response.close()
+    return len(body), elapsed, response
+
+
+def cached(response) -> bool:
+    """Whether a browser reuses the response without asking the server"""
+    control = response.cache_control
+    return bool(control.max_age) and not control.no_cache
+
+
+def load(client, repeat: bool, rtt: float, bandwidth: float):
+    """(first paint, interactive) seconds, bytes transferred and requests"""
+    size, server, _ = fetch(client, "/")
+    html = client.get("/").get_data(as_text=True)
+    transferred, requests = size, 1
+    first_round = rtt + size / bandwidth + server
+
+    # Stylesheets block rendering; the script at the end of the body is
+    # requested in the same round but only needed to be interactive
+    styles = _STYLESHEET.findall(html)
+    scripts = _SCRIPT.findall(html)
+    style_bytes = script_bytes = 0
+    style_server = script_server = 0.0
+    for url in styles + scripts:
+        size, server, response = fetch(client, url)
+        if repeat:
+            if cached(response):
+                continue
+            validators = {}
+            if response.headers.get("ETag"):
+                validators["If-None-Match"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                validators["If-Modified-Since"] = response.headers["Last-Modified"]
+            size, server, response = fetch(client, url, validators)
+        requests += 1
+        transferred += size
+        if url in styles:
+            style_bytes += size
+            style_server = max(style_server, server)
+        else:
+            script_bytes += size
+            script_server = max(script_server, server)
+
+    def second_round(size, server):
+        return rtt + size / bandwidth + server if size or server else 0.0
+
+    paint = first_round + second_round(style_bytes, style_server)
+    interactive = first_round + second_round(
+        style_bytes + script_bytes, max(style_server, script_server)
+    )
+    return paint, interactive, transferred, requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="First paint benchmark")
+    # Lighthouse's mobile profile: slow 4G
+    parser.add_argument("--rtt", type=float, default=150, help="milliseconds")
+    parser.add_argument("--kbps", type=float, default=1638.4, help="download")
+    args = parser.parse_args()
+    rtt, bandwidth = args.rtt / 1000, args.kbps * 1024 / 8
+
+    client = frontend.app.test_client()
+    fetch(client, "/")  # templates compiled before timing
+    print(f"RTT {args.rtt:.0f}ms, {args.kbps:.0f} Kbps")
+    print(
+        f"{'visit':>7} {'first paint':>12} {'interactive':>12} {'bytes':>8} {'requests':>9}"
+    )
+    for repeat in (False, True):
+        paint, interactive, transferred, requests = load(client, repeat, rtt, bandwidth)
+        print(
+            f"{'repeat' if repeat else 'cold':>7} {paint * 1000:10.0f}ms "
+            f"{interactive * 1000:10.0f}ms {transferred:8d} {requests:9d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
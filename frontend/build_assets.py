@@ -0,0 +1,184 @@
+"""
+Build fingerprinted, precompressed static assets
+
+Minifies static/css/*.css, copies static/js/*.js, names each output after
+a hash of its content and writes it with gzip and (when the brotli
+package is installed) brotli variants:
+
+    static/dist/css/style.3f9c2a1b7d.css
+    static/dist/css/style.3f9c2a1b7d.css.gz
+    static/dist/css/style.3f9c2a1b7d.css.br
+    static/dist/manifest.json   {"css/style.css": "dist/css/style.3f9c2a1b7d.css"}
+
+The app's ``asset_url()`` template helper reads the manifest, so pages
+link the current build and browsers can cache each file forever: a new
+build changes the URL. Without a manifest the plain files are linked, and
+so is any file edited since the build (see is_current).
+
+The build is committed, so deployments that only copy the repository
+(Vercel's git integration) serve it. Rebuild after editing the assets;
+--check fails while the build is out of date.
+
+Usage:
+    python build_assets.py
+    python build_assets.py --check
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are written without it
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+HASH_LENGTH = 10
+
+_CSS_STRING = r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+_CSS_COMMENT = re.compile(_CSS_STRING + r"|/\*.*?\*/", re.S)
+# Spaces next to these are never needed ('+'/'-' are kept for calc())
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def _squeeze_css(text: str) -> str:
+    text = _CSS_PUNCTUATION.sub(r"\1", re.sub(r"\s+", " ", text))
+    return re.sub(r":\s+", ":", text).replace(";}", "}")
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and whitespace, leaving strings untouched"""
+    # Comments first, so their text cannot be taken for a string
+    source = _CSS_COMMENT.sub(lambda m: m.group(1) or " ", source)
+    parts = re.split(_CSS_STRING, source)
+    # re.split puts the strings at the odd indexes
+    return "".join(
+        part if index % 2 else _squeeze_css(part) for index, part in enumerate(parts)
+    ).strip()
+
+
+def copy_js(source: str) -> str:
+    """
+    JavaScript is shipped as written
+
+    Telling a regular expression from a division needs a real parser;
+    gzip and brotli already remove most of what a minifier would.
+    """
+    return source
+
+
+MINIFIERS = {".css": minify_css, ".js": copy_js}
+
+
+def fingerprint(data: bytes) -> str:
+    """Hash of a built file's content, part of its name"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def built_data(source: Path) -> bytes:
+    """What the build writes for a source file"""
+    return MINIFIERS[source.suffix](source.read_text(encoding="utf-8")).encode("utf-8")
+
+
+def is_current(source: Path, built: str) -> bool:
+    """
+    Whether a built path (from the manifest) matches its source file
+
+    Example:
+        >>> is_current(STATIC_DIR / "js/main.js", manifest["js/main.js"])
+        True
+    """
+    try:
+        data = built_data(source)
+    except (FileNotFoundError, KeyError):
+        return False
+    return Path(built).suffixes[-2:-1] == [f".{fingerprint(data)}"]
+
+
+def stale_entries(static_dir: Path = STATIC_DIR) -> list:
+    """Sources that are missing from the build or changed since it was made"""
+    try:
+        manifest = json.loads(
+            (static_dir / "dist" / "manifest.json").read_text(encoding="utf-8")
+        )
+    except FileNotFoundError:
+        manifest = {}
+    stale = []
+    for source in sorted(static_dir.rglob("*")):
+        if source.suffix not in MINIFIERS or static_dir / "dist" in source.parents:
+            continue
+        relative = source.relative_to(static_dir).as_posix()
+        if relative not in manifest or not is_current(source, manifest[relative]):
+            stale.append(relative)
+    return stale
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict:
+    """
+    Write the dist directory and its manifest
+
+    Returns:
+        The manifest (source path -> built path, relative to static_dir)
+    """
+    dist_dir = static_dir / "dist"
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    manifest = {}
+    for source in sorted(static_dir.rglob("*")):
+        if source.suffix not in MINIFIERS or dist_dir in source.parents:
+            continue
+        data = built_data(source)
+        digest = fingerprint(data)
+        relative = source.relative_to(static_dir)
+        target = dist_dir / relative.with_name(
+            f"{relative.stem}.{digest}{relative.suffix}"
+        )
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        target.with_name(target.name + ".gz").write_bytes(
+            gzip.compress(data, compresslevel=9, mtime=0)
+        )
+        if brotli is not None:
+            target.with_name(target.name + ".br").write_bytes(
+                brotli.compress(data, quality=11)
+            )
+        manifest[relative.as_posix()] = target.relative_to(static_dir).as_posix()
+    (dist_dir / "manifest.json").write_text(
+        json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+    )
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the static assets")
+    parser.add_argument(
+        "--check", action="store_true", help="fail if the build is out of date"
+    )
+    args = parser.parse_args()
+    if args.check:
+        stale = stale_entries()
+        for source in stale:
+            print(f"{source} changed since the build; run python build_assets.py")
+        sys.exit(1 if stale else 0)
+
+    manifest = build()
+    for source, built in manifest.items():
+        original = (STATIC_DIR / source).stat().st_size
+        sizes = [f"{(STATIC_DIR / built).stat().st_size:>6}"]
+        for suffix in (".gz", ".br"):
+            variant = STATIC_DIR / (built + suffix)
+            if variant.exists():
+                sizes.append(f"{suffix[1:]} {variant.stat().st_size:>5}")
+        print(f"{source:<16} {original:>6} -> {built}  {'  '.join(sizes)}")
+    if brotli is None:
+        print("brotli is not installed: only gzip variants were written")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,21 @@ const errorAlert = document.getElementById('errorAlert');
 const charCount = document.getElementById('charCount');
 const wordCountDisplay = document.getElementById('wordCount');
 
+// Last result per (model, text) with its ETag, so re-analyzing the same
+// text is revalidated (304, no body) instead of transferred again
+const analysisCache = new Map();
+const ANALYSIS_CACHE_SIZE = 20;
+
+// Speculative analysis: shortly after the user stops typing (or picks
+// another model), the current text is sent to /api/speculate so the
+// backend analyzes it in the background and Analyze finds it ready.
+// A new text replaces this page's previous speculation on the backend.
+const SPECULATE_DELAY_MS = 800;
+const SPECULATE_MIN_LENGTH = 10;
+const speculationId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+let speculateTimer = null;
+let lastSpeculation = null;
+
 // Character counter
 if (textInput && charCount) {
     textInput.addEventListener('input', () => {
@@ -31,6 +46,55 @@ if (textInput && charCount) {
     });
 }
 
+// Debounce: only the text present once typing pauses is speculated
+function scheduleSpeculation() {
+    clearTimeout(speculateTimer);
+    speculateTimer = setTimeout(speculate, SPECULATE_DELAY_MS);
+}
+
+async function speculate() {
+    if (!textInput) return;
+    const text = textInput.value.trim();
+    const model = modelSelect ? modelSelect.value : 'qwen2.5-coder:0.5b';
+
+    if (text.length < SPECULATE_MIN_LENGTH || text.length > 10000) {
+        // Nothing worth analyzing any more: stop the running speculation
+        if (lastSpeculation) {
+            lastSpeculation = null;
+            fetch(`/api/speculate/${speculationId}`, { method: 'DELETE' })
+                .catch(() => {});
+        }
+        return;
+    }
+
+    // Same request as last time (the backend would ignore it anyway), or
+    // a result this page already has
+    const key = `${model}\n${text}`;
+    if (key === lastSpeculation || analysisCache.has(key)) return;
+    lastSpeculation = key;
+
+    try {
+        await fetch('/api/speculate', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                text: text,
+                model_name: model,
+                speculation_id: speculationId
+            })
+        });
+    } catch (error) {
+        console.debug('Speculative analysis not sent:', error);
+    }
+}
+
+if (textInput) {
+    textInput.addEventListener('input', scheduleSpeculation);
+}
+if (modelSelect) {
+    modelSelect.addEventListener('change', scheduleSpeculation);
+}
+
 // Load available models on page load
 async function loadModels() {
     try {
@@ -147,6 +211,9 @@ function displayResults(data) {
 if (analyzeForm) {
     analyzeForm.addEventListener('submit', async (e) => {
         e.preventDefault();
+        // The analysis itself is on its way; a pending speculation of the
+        // same text would only be a duplicate
+        clearTimeout(speculateTimer);
 
         const text = textInput.value.trim();
         const model = modelSelect ? modelSelect.value : 'qwen2.5-coder:0.5b';
@@ -166,21 +233,41 @@ if (analyzeForm) {
         showLoading();
 
         try {
+            const cacheKey = `${model}\n${text}`;
+            const previous = analysisCache.get(cacheKey);
+            const headers = {
+                'Content-Type': 'application/json',
+            };
+            if (previous) {
+                headers['If-None-Match'] = previous.etag;
+            }
+
             // Make API request
             const response = await fetch('/api/analyze', {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
+                headers: headers,
                 body: JSON.stringify({
                     text: text,
                     model_name: model
                 })
             });
 
+            if (response.status === 304 && previous) {
+                displayResults(previous.data);
+                return;
+            }
+
             const data = await response.json();
 
             if (response.ok && data.success !== false) {
+                const etag = response.headers.get('ETag');
+                if (etag) {
+                    analysisCache.delete(cacheKey);
+                    analysisCache.set(cacheKey, { etag: etag, data: data });
+                    if (analysisCache.size > ANALYSIS_CACHE_SIZE) {
+                        analysisCache.delete(analysisCache.keys().next().value);
+                    }
+                }
                 // Display results
                 displayResults(data);
             } else {